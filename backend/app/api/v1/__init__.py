@@ -1,9 +1,17 @@
 from fastapi import APIRouter
-from app.api.v1 import routes_products, routes_offers, routes_billing, routes_stock
+from app.core.config import settings
+from app.api.v1 import routes_products, routes_offers, routes_billing, routes_stock, routes_admin, routes_reports
 
 api_router = APIRouter()
 
 api_router.include_router(routes_products.router)
 api_router.include_router(routes_offers.router)
 api_router.include_router(routes_billing.router)
-api_router.include_router(routes_stock.router)
\ No newline at end of file
+api_router.include_router(routes_stock.router)
+api_router.include_router(routes_admin.router)
+api_router.include_router(routes_reports.router)
+
+# Offline till endpoints only exist on an outlet instance
+if settings.POS_CENTRAL_URL:
+    from app.api.v1 import routes_pos
+    api_router.include_router(routes_pos.router)
@@ -0,0 +1,39 @@
+from typing import Literal
+from fastapi import APIRouter, Query, status
+from app.db.query_log import query_log
+from app.services.barcodes import barcode_images
+from app.services.catalog_cache import catalog_cache
+from app.services.offers import offer_book
+from app.services.search import product_search
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """Catalog and barcode image cache counters, offer book and search index size"""
+    return {
+        **catalog_cache.stats(),
+        "offers": offer_book.stats(),
+        "barcode_images": barcode_images.memory.stats(),
+        "search": product_search.stats()
+    }
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    sort: Literal["total_ms", "max_ms", "avg_ms", "count"] = "total_ms",
+    limit: int = Query(20, ge=1, le=200)
+):
+    """Statements slower than QUERY_SLOW_MS since startup (or the last reset), grouped by statement"""
+    return {
+        "log": query_log.stats(),
+        "slow_queries": query_log.slow_statements(sort, limit)
+    }
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def reset_slow_queries():
+    """Clear the slow-query aggregate and counters"""
+    query_log.reset()
+    return None
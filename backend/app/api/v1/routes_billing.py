@@ -1,230 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import date, datetime
-from app.db.session import get_db
-from app.models.product import Product
-from app.models.offer import Offer, OfferType
-from app.models.stock import Stock
-from app.models.invoice import Invoice, InvoiceItem
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from app.core.clock import business_day
+from app.db.session import get_async_db, write_queue
+from app.models.invoice import Invoice
 from app.schemas.invoice import (
     InvoiceItemInput,
-    InvoiceItemDetail,
     InvoicePreview,
     InvoiceConfirmRequest,
-    InvoiceResponse
+    InvoiceResponse,
+    InvoiceDetail,
+    InvoiceNumberReserveRequest,
+    InvoiceNumberBlock
 )
+from app.schemas.pos import InvoiceSyncRequest, InvoiceSyncResponse, PosSnapshot
+from app.services.billing import book_invoice
+from app.services.idempotency import (
+    IdempotencyKeyReusedError,
+    find_replay,
+    request_fingerprint
+)
+from app.services.invoice_history import format_cursor, get_invoice, invoice_page_query, parse_cursor, to_invoice_detail
+from app.services.pos_sync import build_pos_snapshot, sync_offline_invoices
+from app.services.pricing import ProductNotFoundError, price_cart
+from app.services.sequences import (
+    format_invoice_number,
+    reserve_sequence,
+    sequence_outlet
+)
+from app.services.search import product_search
+from app.services.stock import InsufficientStockError
 
 router = APIRouter(prefix="/billing", tags=["Billing"])
 
 
-def calculate_offer_discount(quantity: int, unit_price: float, offer: Offer) -> tuple[float, float, str]:
-    """
-    Calculate discount based on offer type
-    Returns: (discounted_price, total_discount, offer_description)
-    """
-    
-    if offer.offer_type == OfferType.BUY_X_GET_Y:
-        # B1G1: Every 2 items, charge for 1
-        # B2G1: Every 3 items, charge for 2
-        x = offer.x_quantity
-        y = offer.y_quantity
-        
-        sets = quantity // (x + y)
-        remaining = quantity % (x + y)
-        
-        chargeable = (sets * x) + remaining
-        discount = (quantity - chargeable) * unit_price
-        
-        return chargeable * unit_price, discount, f"Buy {x} Get {y} Free"
-    
-    elif offer.offer_type == OfferType.PERCENTAGE:
-        discount_per_unit = unit_price * (offer.discount_percent / 100)
-        total_discount = discount_per_unit * quantity
-        final_price = (unit_price * quantity) - total_discount
-        
-        return final_price, total_discount, f"{offer.discount_percent}% Off"
-    
-    elif offer.offer_type == OfferType.FLAT:
-        discount_per_unit = min(offer.discount_flat, unit_price)  # Can't discount more than price
-        total_discount = discount_per_unit * quantity
-        final_price = (unit_price * quantity) - total_discount
-        
-        return final_price, total_discount, f"₹{offer.discount_flat} Off per item"
-    
-    return unit_price * quantity, 0.0, "No Offer"
-
-
 @router.post("/preview", response_model=InvoicePreview)
-def preview_invoice(items: list[InvoiceItemInput], db: Session = Depends(get_db)):
+async def preview_invoice(items: list[InvoiceItemInput], db: AsyncSession = Depends(get_async_db)):
     """Preview invoice with offers applied (doesn't save to DB)"""
     
-    today = date.today()
-    item_details = []
-    subtotal = 0.0
-    total_discount = 0.0
-    
-    for item in items:
-        # Get product
-        product = db.query(Product).filter(Product.product_id == item.product_id).first()
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Product {item.product_id} not found"
-            )
-        
-        # Get active offer
-        offer = db.query(Offer).filter(
-            Offer.product_id == product.id,
-            Offer.is_active == True,
-            Offer.start_date <= today,
-            Offer.end_date >= today
-        ).first()
-        
-        # Calculate pricing
-        unit_price = product.selling_price
-        
-        if offer:
-            line_total, discount, offer_desc = calculate_offer_discount(
-                item.quantity, unit_price, offer
-            )
-        else:
-            line_total = unit_price * item.quantity
-            discount = 0.0
-            offer_desc = None
-        
-        subtotal += (unit_price * item.quantity)
-        total_discount += discount
-        
-        item_details.append(InvoiceItemDetail(
-            product_id=product.product_id,
-            product_name=product.name,
-            quantity=item.quantity,
-            unit_price=unit_price,
-            discount=discount,
-            line_total=line_total,
-            offer_applied=offer_desc
-        ))
-    
-    final_total = subtotal - total_discount
+    try:
+        cart = await db.run_sync(price_cart, items)
+    except ProductNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
     
     return InvoicePreview(
-        items=item_details,
-        subtotal=subtotal,
-        total_discount=total_discount,
-        final_total=final_total
+        items=[line.to_detail() for line in cart.lines],
+        subtotal=cart.subtotal,
+        total_discount=cart.total_discount,
+        final_total=cart.final_total
     )
 
 
 @router.post("/confirm", response_model=InvoiceResponse, status_code=status.HTTP_201_CREATED)
-def confirm_invoice(request: InvoiceConfirmRequest, db: Session = Depends(get_db)):
-    """Confirm invoice - save to DB and reduce stock"""
-    
-    today = date.today()
-    item_details = []
-    subtotal = 0.0
-    total_discount = 0.0
-    
-    # First, validate all products and stock
-    for item in request.items:
-        product = db.query(Product).filter(Product.product_id == item.product_id).first()
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Product {item.product_id} not found"
-            )
-        
-        # Check stock availability
-        stock = db.query(Stock).filter(
-            Stock.product_id == product.id,
-            Stock.outlet_id == request.outlet_id
-        ).first()
-        
-        if not stock or stock.quantity < item.quantity:
-            available = stock.quantity if stock else 0
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for {product.name}. Available: {available}, Requested: {item.quantity}"
-            )
+async def confirm_invoice(
+    request: InvoiceConfirmRequest,
+    response: Response,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Confirm invoice - save to DB and reduce stock.
+    With an Idempotency-Key header, retries of the same request return the
+    original invoice (marked Idempotent-Replayed) instead of billing twice.
+    """
     
-    # Generate invoice number
-    invoice_count = db.query(Invoice).count()
-    invoice_number = f"INV{datetime.now().strftime('%Y%m%d')}{invoice_count + 1:04d}"
+    fingerprint = request_fingerprint(request) if idempotency_key else None
+    if idempotency_key:
+        replay = await _replay(db, idempotency_key, fingerprint, response)
+        if replay:
+            return replay
     
-    # Create invoice
-    db_invoice = Invoice(
-        invoice_number=invoice_number,
-        total_amount=0.0,  # Will update after processing items
-        discount_amount=0.0,
-        final_amount=0.0,
-        notes=request.notes
-    )
-    db.add(db_invoice)
-    db.flush()  # Get invoice.id
-    
-    # Process each item
-    for item in request.items:
-        product = db.query(Product).filter(Product.product_id == item.product_id).first()
-        
-        # Get active offer
-        offer = db.query(Offer).filter(
-            Offer.product_id == product.id,
-            Offer.is_active == True,
-            Offer.start_date <= today,
-            Offer.end_date >= today
-        ).first()
-        
-        # Calculate pricing
-        unit_price = product.selling_price
-        
-        if offer:
-            line_total, discount, offer_desc = calculate_offer_discount(
-                item.quantity, unit_price, offer
-            )
-        else:
-            line_total = unit_price * item.quantity
-            discount = 0.0
-            offer_desc = None
-        
-        subtotal += (unit_price * item.quantity)
-        total_discount += discount
-        
-        # Create invoice item
-        db_invoice_item = InvoiceItem(
-            invoice_id=db_invoice.id,
-            product_id=product.id,
-            quantity=item.quantity,
-            unit_price=unit_price,
-            discount=discount,
-            line_total=line_total,
-            offer_applied=offer_desc
+    # Priced inside the write transaction, from the database
+    try:
+        db_invoice, cart = await write_queue.run(
+            db, lambda db: book_invoice(db, request, idempotency_key, fingerprint)
         )
-        db.add(db_invoice_item)
-        
-        # Reduce stock
-        stock = db.query(Stock).filter(
-            Stock.product_id == product.id,
-            Stock.outlet_id == request.outlet_id
-        ).first()
-        stock.quantity -= item.quantity
-        
-        item_details.append(InvoiceItemDetail(
-            product_id=product.product_id,
-            product_name=product.name,
-            quantity=item.quantity,
-            unit_price=unit_price,
-            discount=discount,
-            line_total=line_total,
-            offer_applied=offer_desc
-        ))
-    
-    # Update invoice totals
-    final_total = subtotal - total_discount
-    db_invoice.total_amount = subtotal
-    db_invoice.discount_amount = total_discount
-    db_invoice.final_amount = final_total
+    except ProductNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except InsufficientStockError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except IntegrityError:
+        # A concurrent request with the same key got there first
+        replay = await _replay(db, idempotency_key, fingerprint, response) if idempotency_key else None
+        if replay is None:
+            raise
+        return replay
     
-    db.commit()
-    db.refresh(db_invoice)
+    await db.refresh(db_invoice)
+    product_search.record_sales(cart.requested_quantities())
     
     return InvoiceResponse(
         id=db_invoice.id,
@@ -233,5 +106,90 @@ def confirm_invoice(request: InvoiceConfirmRequest, db: Session = Depends(get_db
         discount_amount=float(db_invoice.discount_amount),
         final_amount=float(db_invoice.final_amount),
         created_at=db_invoice.created_at,
-        items=item_details
-    )
\ No newline at end of file
+        items=[line.to_detail() for line in cart.lines]
+    )
+
+
+async def _replay(db: AsyncSession, key: str, fingerprint: str, response: Response) -> InvoiceResponse | None:
+    try:
+        replay = await db.run_sync(find_replay, key, fingerprint)
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    if replay:
+        response.headers["Idempotent-Replayed"] = "true"
+    return replay
+
+
+@router.post("/invoice-numbers", response_model=InvoiceNumberBlock, status_code=status.HTTP_201_CREATED)
+async def reserve_invoice_numbers(request: InvoiceNumberReserveRequest, db: AsyncSession = Depends(get_async_db)):
+    """Reserve a block of today's invoice numbers for a till in one write"""
+    
+    day = business_day()
+    outlet_scope = sequence_outlet(request.outlet_id)
+    values = await write_queue.run(db, lambda db: reserve_sequence(db, day, outlet_scope, request.count))
+    
+    return InvoiceNumberBlock(
+        numbers=[format_invoice_number(day, outlet_scope, value) for value in values]
+    )
+
+
+@router.get("/invoices", response_model=list[InvoiceDetail])
+async def list_invoices(
+    response: Response,
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    outlet_id: int | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Past invoices with their items, newest first, filtered by outlet and date.
+    Keyset pagination: the next page's cursor is returned in the X-Next-Cursor
+    header (absent on the last page). A page costs a fixed handful of queries
+    (items are batch-loaded 500 invoices at a time), not one per invoice.
+    """
+    try:
+        after = parse_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {cursor!r}")
+    
+    invoices = list(await db.scalars(invoice_page_query(outlet_id, start, end, after, limit + 1)))
+    if len(invoices) > limit:
+        invoices = invoices[:limit]
+        response.headers["X-Next-Cursor"] = format_cursor(invoices[-1])
+    
+    return [to_invoice_detail(invoice) for invoice in invoices]
+
+
+@router.get("/invoices/{invoice_number}", response_model=InvoiceDetail)
+async def get_invoice_by_number(invoice_number: str, db: AsyncSession = Depends(get_async_db)):
+    """One invoice with its items"""
+    
+    invoice = await db.run_sync(get_invoice, Invoice.invoice_number == invoice_number)
+    if invoice is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Invoice '{invoice_number}' not found"
+        )
+    return invoice
+
+
+@router.get("/offline-snapshot", response_model=PosSnapshot)
+async def get_offline_snapshot(outlet_id: int | None = None, db: AsyncSession = Depends(get_async_db)):
+    """Products, offers and outlet stock for a till to price and confirm carts while offline"""
+    return await db.run_sync(build_pos_snapshot, outlet_id)
+
+
+@router.post("/sync", response_model=InvoiceSyncResponse)
+async def sync_invoices(request: InvoiceSyncRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Book a batch of invoices confirmed offline at an outlet till.
+    Idempotent per invoice UUID: replayed invoices come back as duplicates
+    with the number they were booked under.
+    """
+    results = await write_queue.run(db, lambda db: sync_offline_invoices(db, request.outlet_id, request.invoices))
+    return InvoiceSyncResponse(results=results)
@@ -1,54 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from dataclasses import fields
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from datetime import date
+from app.core.clock import business_day
 from app.db.session import get_db
 from app.models.product import Product
-from app.models.offer import Offer
+from app.models.offer import Offer, OfferType
 from app.schemas.offer import OfferCreate, OfferResponse
+from app.services.catalog_cache import OfferSnapshot
+from app.services.offers import offer_book
 
 router = APIRouter(prefix="/offers", tags=["Offers"])
 
 
 @router.post("/", response_model=OfferResponse, status_code=status.HTTP_201_CREATED)
 def create_offer(offer: OfferCreate, db: Session = Depends(get_db)):
-    """Create or update offer for a product"""
+    """Create an offer (product, bundle or cart-level); it takes effect on the next priced cart"""
     
-    # Verify product exists
-    product = db.query(Product).filter(Product.id == offer.product_id).first()
-    if not product:
+    # Verify products exist
+    product_pks = set(offer.bundle_product_ids or [])
+    if offer.offer_type == OfferType.CART_THRESHOLD:
+        if offer.product_id is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="CART_THRESHOLD offers apply to the whole cart; omit product_id"
+            )
+    elif offer.product_id is None and offer.offer_type != OfferType.BUNDLE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"product_id required for {offer.offer_type.value} offer"
+        )
+    if offer.product_id is not None:
+        product_pks.add(offer.product_id)
+    
+    found = set(db.scalars(select(Product.id).where(Product.id.in_(product_pks))))
+    missing = sorted(product_pks - found)
+    if missing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Product ID {offer.product_id} not found"
+            detail=f"Product ID {missing[0]} not found"
         )
     
     # Validate offer data
-    if offer.offer_type == "BUY_X_GET_Y":
+    if offer.offer_type == OfferType.BUY_X_GET_Y:
         if not offer.x_quantity or not offer.y_quantity:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="x_quantity and y_quantity required for BUY_X_GET_Y"
             )
-    elif offer.offer_type == "PERCENTAGE":
+    elif offer.offer_type == OfferType.PERCENTAGE:
         if not offer.discount_percent:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="discount_percent required for PERCENTAGE offer"
             )
-    elif offer.offer_type == "FLAT":
+    elif offer.offer_type == OfferType.FLAT:
         if not offer.discount_flat:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="discount_flat required for FLAT offer"
             )
+    elif offer.offer_type == OfferType.TIERED:
+        if not offer.tiers:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="tiers required for TIERED offer"
+            )
+    elif offer.offer_type == OfferType.BUNDLE:
+        if not product_pks or not offer.bundle_quantity or offer.bundle_price is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="bundle_product_ids, bundle_quantity and bundle_price required for BUNDLE offer"
+            )
+    elif offer.offer_type == OfferType.CART_THRESHOLD:
+        if offer.min_cart_total is None or not (offer.discount_percent or offer.discount_flat):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="min_cart_total and discount_percent or discount_flat required for CART_THRESHOLD offer"
+            )
     
     db_offer = Offer(**offer.model_dump())
     db.add(db_offer)
     db.commit()
     db.refresh(db_offer)
+    offer_book.invalidate()
     
     return db_offer
 
 
+def _offer_response(offer: OfferSnapshot) -> OfferResponse:
+    values = {f.name: getattr(offer, f.name) for f in fields(offer)}
+    if offer.tiers is not None:
+        values["tiers"] = [
+            {"min_quantity": min_quantity, "discount_percent": percent} for min_quantity, percent in offer.tiers
+        ]
+    if offer.bundle_product_ids is not None:
+        values["bundle_product_ids"] = list(offer.bundle_product_ids)
+    return OfferResponse(**values)
+
+
+@router.get("/active", response_model=dict[int, list[OfferResponse]])
+def get_active_offers(
+    product_ids: str = Query(..., description="Comma-separated Product.id values"),
+    on: date | None = Query(None, description="Defaults to today"),
+    db: Session = Depends(get_db)
+):
+    """Active offers (including bundles they belong to) for several products on a date, from the offer calendar"""
+    
+    try:
+        product_pks = [int(pk) for pk in product_ids.split(",") if pk.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="product_ids must be comma-separated integers"
+        )
+    
+    calendar = offer_book.calendar(db)
+    day = on or calendar.day
+    if day < calendar.day:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only today and future dates can be queried"
+        )
+    
+    return {
+        pk: [_offer_response(offer) for offer in offers]
+        for pk, offers in calendar.active_for(product_pks, day).items()
+    }
+
+
 @router.get("/{product_id}", response_model=OfferResponse | None)
 def get_active_offer(product_id: str, db: Session = Depends(get_db)):
     """Get active offer for a product by Product ID (SPN code)"""
@@ -62,7 +143,7 @@ def get_active_offer(product_id: str, db: Session = Depends(get_db)):
         )
     
     # Get active offer
-    today = date.today()
+    today = business_day()
     offer = db.query(Offer).filter(
         Offer.product_id == product.id,
         Offer.is_active == True,
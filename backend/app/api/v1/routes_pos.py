@@ -0,0 +1,72 @@
+from fastapi import APIRouter, HTTPException, status
+from app.schemas.invoice import InvoiceConfirmRequest, InvoiceItemInput, InvoicePreview
+from app.schemas.pos import OfflineReceipt, PosStatus, PosSyncReport
+from app.services.offline_pos import CentralRejectedError, CentralUnavailableError, SnapshotMissingError, pos_till
+from app.services.pricing import ProductNotFoundError
+from app.services.stock import InsufficientStockError
+
+router = APIRouter(prefix="/pos", tags=["Offline POS"])
+
+
+@router.get("/status", response_model=PosStatus)
+def get_pos_status():
+    """Snapshot age, invoices waiting to be synced and the last sync error"""
+    return pos_till.status()
+
+
+@router.post("/preview", response_model=InvoicePreview)
+def preview_offline(items: list[InvoiceItemInput]):
+    """Price a cart from the local snapshot"""
+
+    try:
+        cart = pos_till.price(items)
+    except SnapshotMissingError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except ProductNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    return InvoicePreview(
+        items=[line.to_detail() for line in cart.lines],
+        subtotal=cart.subtotal,
+        total_discount=cart.total_discount,
+        final_total=cart.final_total
+    )
+
+
+@router.post("/confirm", response_model=OfflineReceipt, status_code=status.HTTP_201_CREATED)
+def confirm_offline(request: InvoiceConfirmRequest):
+    """
+    Confirm a sale against the local snapshot and queue it for sync.
+    The invoice number is assigned by the central server when it is synced;
+    the receipt carries the invoice UUID. request.outlet_id is ignored (the
+    till sells for POS_OUTLET_ID).
+    """
+
+    try:
+        return pos_till.confirm(request.items, request.notes)
+    except SnapshotMissingError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except ProductNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/sync", response_model=PosSyncReport)
+def sync_now():
+    """Push queued invoices to the central server now (also runs in the background)"""
+    return pos_till.sync()
+
+
+@router.post("/snapshot", response_model=PosStatus)
+def refresh_snapshot():
+    """Pull a fresh products / offers / stock snapshot from the central server"""
+
+    try:
+        pos_till.refresh_snapshot()
+    except CentralUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except CentralRejectedError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+
+    return pos_till.status()
@@ -1,59 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Literal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from app.core.clock import business_day
+from app.db.session import get_async_db, get_db
 from app.models.product import Product
 from app.models.barcode import Barcode
-from app.schemas.product import ProductCreate, ProductResponse, ProductWithBarcode
-from io import BytesIO
-import barcode
-from barcode.writer import ImageWriter
+from app.schemas.product import (
+    ProductCreate,
+    ProductUpdate,
+    ProductResponse,
+    ProductWithBarcode,
+    ProductImportError,
+    ProductImportReport,
+    ProductSearchResult
+)
+from app.services.catalog_cache import catalog_cache
+from app.services.sequences import reserve_product_ids
+from app.services.stock import outlets_stocking, set_outlet_summaries
+from app.schemas.barcode import LabelSheetRequest
+from app.services.labels import LabelData, stream_pdf, stream_svg
+from app.services.barcodes import BARCODE_MEDIA_TYPES, BarcodeRender, barcode_images
+from app.services.product_import import IMPORT_FORMATS, detect_format, import_products, iter_rows
+from app.services.product_listing import ProductFilter, bundled_product_ids, parse_fields, product_page_query
+from app.services.search import product_search
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
 def generate_product_id(cost_price: float, db: Session) -> str:
     """Generate SPN Product ID based on cost price and sequence"""
-    cost_padded = f"{int(cost_price):04d}"
-    
-    # Count existing products with same cost price
-    count = db.query(func.count(Product.id)).filter(
-        Product.cost_price == cost_price
-    ).scalar() or 0
-    
-    count += 1  # For the new product
-    
-    # Determine sequence format
-    if 1 <= count <= 9:
-        sequence = f"990{count}"
-    elif 10 <= count <= 99:
-        sequence = f"90{count:02d}"
-    elif 100 <= count <= 999:
-        sequence = f"0{count:03d}"
-    else:
-        sequence = f"{count:04d}"
-    
-    return f"SPN{cost_padded}{sequence}"
-
-
-def generate_barcode_image(barcode_value: str) -> bytes:
-    """Generate Code128 barcode image as bytes"""
-    CODE128 = barcode.get_barcode_class('code128')
-    buffer = BytesIO()
-    
-    code128 = CODE128(barcode_value, writer=ImageWriter())
-    code128.write(buffer)
-    
-    buffer.seek(0)
-    return buffer.read()
+    return reserve_product_ids(db, cost_price)[0]
 
 
 @router.post("/", response_model=ProductWithBarcode, status_code=status.HTTP_201_CREATED)
-def create_product(product: ProductCreate, db: Session = Depends(get_db)):
-    """Create a new product with auto-generated Product ID and barcode"""
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a new product with auto-generated Product ID and barcode (image rendered on first request)"""
     
     # Generate Product ID
-    product_id = generate_product_id(product.cost_price, db)
+    product_id = await db.run_sync(lambda db: generate_product_id(product.cost_price, db))
     
     # Create product
     db_product = Product(
@@ -67,21 +56,19 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_product)
-    db.flush()  # Get the product.id
-    
-    # Generate barcode
-    barcode_image = generate_barcode_image(product_id)
+    await db.flush()  # Get the product.id
     
     db_barcode = Barcode(
         product_id=db_product.id,
         barcode_value=product_id,
-        barcode_format="Code128",
-        barcode_image=barcode_image
+        barcode_format="Code128"
     )
     
     db.add(db_barcode)
-    db.commit()
-    db.refresh(db_product)
+    await db.commit()
+    await db.refresh(db_product)
+    catalog_cache.invalidate_product(product_id)
+    product_search.upsert(db_product)
     
     return ProductWithBarcode(
         **db_product.__dict__,
@@ -89,27 +76,222 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     )
 
 
+@router.post("/import", response_model=ProductImportReport)
+def import_products_file(
+    file: UploadFile = File(...),
+    format: str | None = None,
+    chunk_size: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import products from a CSV or NDJSON upload (committed per chunk).
+    Parsing and validation are CPU-bound, so this stays a sync route and
+    runs in the threadpool instead of on the event loop.
+    """
+    
+    fmt = format or detect_format(file.filename)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format '{fmt}'. Use one of: {', '.join(IMPORT_FORMATS)}"
+        )
+    
+    if not 1 <= chunk_size <= 10000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="chunk_size must be between 1 and 10000"
+        )
+    
+    report = import_products(db, iter_rows(file.file, fmt), chunk_size=chunk_size)
+    
+    return ProductImportReport(
+        total_rows=report.total_rows,
+        imported=report.imported,
+        failed=report.failed,
+        errors=[ProductImportError(row=row, error=error) for row, error in report.errors]
+    )
+
+
+@router.post("/labels")
+async def print_label_sheet(request: LabelSheetRequest, db: AsyncSession = Depends(get_async_db)):
+    """Print-ready barcode label sheet (PDF or SVG) for a list of products and copy counts"""
+    
+    total_labels = sum(item.copies for item in request.items)
+    if total_labels > 5000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many labels requested ({total_labels}). Maximum is 5000 per sheet."
+        )
+    
+    products = await db.run_sync(catalog_cache.get_products, [item.product_id for item in request.items])
+    labels = []
+    for item in request.items:
+        product = products.get(item.product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Product {item.product_id} not found"
+            )
+        label = LabelData(
+            product_id=product.product_id,
+            barcode_value=product.barcode_value or product.product_id,
+            name=product.name,
+            mrp=float(product.mrp),
+            selling_price=float(product.selling_price)
+        )
+        labels.extend([label] * item.copies)
+    
+    if request.format == "svg":
+        return StreamingResponse(stream_svg(labels), media_type="image/svg+xml")
+    
+    return StreamingResponse(
+        stream_pdf(labels),
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'inline; filename="labels.pdf"'}
+    )
+
+
 @router.get("/", response_model=list[ProductResponse])
-def list_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """List all products"""
-    products = db.query(Product).offset(skip).limit(limit).all()
-    return products
+async def list_products(
+    response: Response,
+    after: int | None = Query(None, description="Cursor: return products with id greater than this"),
+    limit: int = Query(100, ge=1, le=1000),
+    category: str | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    has_offer: bool | None = None,
+    fields: str | None = Query(None, description="Comma-separated subset of columns, e.g. product_id,name,selling_price"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List products in id order with keyset pagination and server-side filters.
+    The next page's cursor is returned in the X-Next-Cursor header (absent on the last page).
+    """
+    try:
+        columns = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    filters = ProductFilter(category=category, min_price=min_price, max_price=max_price, has_offer=has_offer)
+    bundled = await db.run_sync(lambda db: bundled_product_ids(db, business_day())) if has_offer is not None else ()
+    query = product_page_query(filters, after, limit, columns, bundled)
+    
+    if columns:
+        rows = [dict(row) for row in (await db.execute(query)).mappings()]
+    else:
+        rows = list(await db.scalars(query))
+    
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = str(last["id"] if columns else last.id)
+    
+    # Sparse rows skip response-model validation
+    if columns:
+        return JSONResponse(content=jsonable_encoder(rows), headers=headers)
+    
+    response.headers.update(headers)
+    return rows
+
+
+@router.get("/search", response_model=list[ProductSearchResult])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Typeahead search on name, category and SPN code (prefix and fuzzy), best sellers ranked higher"""
+    hits = await db.run_sync(product_search.search, q, limit)
+    return [
+        ProductSearchResult(
+            id=hit.entry.id,
+            product_id=hit.entry.product_id,
+            name=hit.entry.name,
+            category=hit.entry.category,
+            selling_price=hit.entry.selling_price,
+            score=round(hit.score, 4)
+        )
+        for hit in hits
+    ]
 
 
 @router.get("/{product_id}", response_model=ProductWithBarcode)
-def get_product(product_id: str, db: Session = Depends(get_db)):
-    """Get product by SPN Product ID"""
-    product = db.query(Product).filter(Product.product_id == product_id).first()
+async def get_product(product_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get product by SPN Product ID (served from the catalog cache when warm)"""
+    product = await db.run_sync(catalog_cache.get_product, product_id)
+    
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product {product_id} not found"
+        )
     
+    return ProductWithBarcode.model_validate(product)
+
+
+@router.get("/{product_id}/barcode")
+async def get_barcode_image(
+    product_id: str,
+    format: Literal["png", "jpeg", "svg"] = "png",
+    module_width: float = Query(0.2, ge=0.1, le=1.0),
+    dpi: int = Query(300, ge=72, le=1200),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Code128 barcode image for a product, rendered lazily and cached (supports ETag / If-None-Match)"""
+    
+    product = await db.run_sync(catalog_cache.get_product, product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product {product_id} not found"
         )
     
-    barcode_value = product.barcode.barcode_value if product.barcode else None
+    barcode_value = product.barcode_value or product.product_id
+    render = BarcodeRender(format=format, module_width=module_width, dpi=dpi)
+    
+    etag = f'"{render.etag(barcode_value)}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    # Rendering a cache miss is CPU work: keep it off the event loop
+    _, image = await run_in_threadpool(barcode_images.get, barcode_value, render)
+    return Response(content=image, media_type=BARCODE_MEDIA_TYPES[format], headers=headers)
+
+
+@router.put("/{product_id}", response_model=ProductWithBarcode)
+async def update_product(product_id: str, product_update: ProductUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Update product details by SPN Product ID"""
+    
+    db_product = await db.scalar(
+        select(Product).options(selectinload(Product.barcode)).where(Product.product_id == product_id)
+    )
+    if not db_product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product {product_id} not found"
+        )
+    
+    # Update only provided fields
+    update_data = product_update.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_product, field, value)
+    
+    # A new min_stock changes which rows count as low stock
+    if "min_stock" in update_data:
+        await db.flush()
+        await db.run_sync(lambda db: set_outlet_summaries(db, outlets_stocking(db, db_product.id)))
+    
+    barcode_value = db_product.barcode.barcode_value if db_product.barcode else None
+    await db.commit()
+    await db.refresh(db_product)
+    catalog_cache.invalidate_product(product_id)
+    product_search.upsert(db_product)
     
     return ProductWithBarcode(
-        **product.__dict__,
+        **db_product.__dict__,
         barcode_value=barcode_value
-    )
\ No newline at end of file
+    )
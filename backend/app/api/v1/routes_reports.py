@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from datetime import date, timedelta
+from typing import Literal
+from app.core.clock import business_day
+from app.db.session import get_db
+from app.schemas.report import DailySales, OutletSales, ProductSales
+from app.services.invoice_export import invoice_lines_query, stream_invoice_lines
+from app.services.sales_rollup import daily_sales, outlet_sales, product_sales
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+
+DEFAULT_DAYS = 30
+
+
+def _date_range(start: date | None, end: date | None) -> tuple[date, date]:
+    end = end or business_day()
+    start = start or end - timedelta(days=DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    return start, end
+
+
+@router.get("/sales/daily", response_model=list[DailySales])
+def get_daily_sales(
+    start: date | None = Query(None, description="Defaults to 30 days before end"),
+    end: date | None = Query(None, description="Defaults to today"),
+    outlet_id: int | None = None,
+    db: Session = Depends(get_db)
+):
+    """Sales per day, for all outlets or one (read from the daily rollup)"""
+    return daily_sales(db, *_date_range(start, end), outlet_id)
+
+
+@router.get("/sales/outlets", response_model=list[OutletSales])
+def get_outlet_sales(
+    start: date | None = Query(None, description="Defaults to 30 days before end"),
+    end: date | None = Query(None, description="Defaults to today"),
+    db: Session = Depends(get_db)
+):
+    """Sales per outlet over a date range; outlet_id null = sales without an outlet"""
+    return outlet_sales(db, *_date_range(start, end))
+
+
+@router.get("/sales/products", response_model=list[ProductSales])
+def get_product_sales(
+    start: date | None = Query(None, description="Defaults to 30 days before end"),
+    end: date | None = Query(None, description="Defaults to today"),
+    outlet_id: int | None = None,
+    sort: Literal["units", "net", "margin"] = "net",
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Top products over a date range (read from the per-product rollup)"""
+    return product_sales(db, *_date_range(start, end), outlet_id, sort, limit)
+
+
+@router.get("/export/invoice-lines")
+def export_invoice_lines(
+    start: date | None = Query(None, description="Defaults to 30 days before end"),
+    end: date | None = Query(None, description="Defaults to today"),
+    outlet_id: int | None = Query(None, description="0 = invoices without an outlet"),
+    format: Literal["parquet", "arrow"] = "parquet",
+    db: Session = Depends(get_db)
+):
+    """
+    Invoice lines over a date range as one Parquet file or Arrow IPC stream,
+    written and sent a chunk at a time. Money columns are integer paise; the
+    day and outlet_id columns are there to partition on.
+    For a partitioned dataset use `manage.py export-invoices`.
+    """
+    start, end = _date_range(start, end)
+    query = invoice_lines_query(start, end, outlet_id)
+
+    def body():
+        # The request session closes before a streamed body is sent, so stream from our own
+        with Session(bind=db.get_bind()) as stream_db:
+            yield from stream_invoice_lines(stream_db, query, format)
+
+    media_type = "application/vnd.apache.parquet" if format == "parquet" else "application/vnd.apache.arrow.stream"
+    filename = f"invoice-lines_{start}_{end}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
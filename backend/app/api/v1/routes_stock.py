@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db, write_queue
 from app.models.product import Product
 from app.models.stock import Stock
-from app.models.outlet import Outlet
+from app.models.outlet import Outlet, OutletStockSummary
 from app.schemas.stock import StockCreate, StockResponse, StockUpdate, LowStockResponse
 from app.schemas.outlet import OutletCreate, OutletResponse, OutletUpdate, OutletWithStock
+from app.services.stock import (
+    add_stock,
+    compute_outlet_summaries,
+    delete_stock,
+    low_stock_query,
+    set_stock_quantity,
+    stream_json_rows_async
+)
 
 router = APIRouter(prefix="/stock", tags=["Stock"])
 
@@ -14,11 +23,11 @@ router = APIRouter(prefix="/stock", tags=["Stock"])
 # ==================== OUTLET ENDPOINTS ====================
 
 @router.post("/outlets/", response_model=OutletResponse, status_code=status.HTTP_201_CREATED)
-def create_outlet(outlet: OutletCreate, db: Session = Depends(get_db)):
+async def create_outlet(outlet: OutletCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new outlet"""
     
     # Check if outlet name already exists
-    existing_outlet = db.query(Outlet).filter(Outlet.name == outlet.name).first()
+    existing_outlet = await db.scalar(select(Outlet).where(Outlet.name == outlet.name))
     if existing_outlet:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -27,43 +36,47 @@ def create_outlet(outlet: OutletCreate, db: Session = Depends(get_db)):
     
     db_outlet = Outlet(**outlet.model_dump())
     db.add(db_outlet)
-    db.commit()
-    db.refresh(db_outlet)
+    await db.commit()
+    await db.refresh(db_outlet)
     
     return db_outlet
 
 
 @router.get("/outlets/", response_model=list[OutletResponse])
-def list_outlets(active_only: bool = False, db: Session = Depends(get_db)):
+async def list_outlets(active_only: bool = False, db: AsyncSession = Depends(get_async_db)):
     """List all outlets"""
-    query = db.query(Outlet)
+    query = select(Outlet)
     
     if active_only:
-        query = query.filter(Outlet.is_active == True)
+        query = query.where(Outlet.is_active == True)
     
-    return query.all()
+    return list(await db.scalars(query))
 
 
 @router.get("/outlets/{outlet_id}", response_model=OutletWithStock)
-def get_outlet(outlet_id: int, db: Session = Depends(get_db)):
+async def get_outlet(outlet_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get outlet details with stock summary"""
     
-    outlet = db.query(Outlet).filter(Outlet.id == outlet_id).first()
-    if not outlet:
+    row = (await db.execute(
+        select(Outlet, OutletStockSummary)
+        .outerjoin(OutletStockSummary, OutletStockSummary.outlet_id == Outlet.id)
+        .where(Outlet.id == outlet_id)
+    )).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Outlet ID {outlet_id} not found"
         )
     
-    # Calculate stock summary
-    stock_records = db.query(Stock).filter(Stock.outlet_id == outlet_id).all()
-    
-    total_products = len(stock_records)
-    total_quantity = sum(stock.quantity for stock in stock_records)
-    low_stock_count = sum(
-        1 for stock in stock_records 
-        if stock.quantity < stock.product.min_stock
-    )
+    # Stock summary is maintained incrementally; aggregate once if it doesn't exist yet
+    outlet, summary = row
+    if summary:
+        total_products, total_quantity, low_stock_count = (
+            summary.total_products, summary.total_quantity, summary.low_stock_count
+        )
+    else:
+        summaries = await db.run_sync(compute_outlet_summaries, [outlet_id])
+        total_products, total_quantity, low_stock_count = summaries.get(outlet_id, (0, 0, 0))
     
     return OutletWithStock(
         **outlet.__dict__,
@@ -74,10 +87,10 @@ def get_outlet(outlet_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/outlets/{outlet_id}", response_model=OutletResponse)
-def update_outlet(outlet_id: int, outlet_update: OutletUpdate, db: Session = Depends(get_db)):
+async def update_outlet(outlet_id: int, outlet_update: OutletUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update outlet details"""
     
-    db_outlet = db.query(Outlet).filter(Outlet.id == outlet_id).first()
+    db_outlet = await db.get(Outlet, outlet_id)
     if not db_outlet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -89,17 +102,17 @@ def update_outlet(outlet_id: int, outlet_update: OutletUpdate, db: Session = Dep
     for field, value in update_data.items():
         setattr(db_outlet, field, value)
     
-    db.commit()
-    db.refresh(db_outlet)
+    await db.commit()
+    await db.refresh(db_outlet)
     
     return db_outlet
 
 
 @router.delete("/outlets/{outlet_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_outlet(outlet_id: int, db: Session = Depends(get_db)):
+async def delete_outlet(outlet_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete an outlet (only if no stock records exist)"""
     
-    db_outlet = db.query(Outlet).filter(Outlet.id == outlet_id).first()
+    db_outlet = await db.get(Outlet, outlet_id)
     if not db_outlet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -107,15 +120,15 @@ def delete_outlet(outlet_id: int, db: Session = Depends(get_db)):
         )
     
     # Check if outlet has stock
-    stock_count = db.query(Stock).filter(Stock.outlet_id == outlet_id).count()
+    stock_count = await db.scalar(select(func.count(Stock.id)).where(Stock.outlet_id == outlet_id))
     if stock_count > 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Cannot delete outlet with existing stock. Move or delete {stock_count} stock records first."
         )
     
-    db.delete(db_outlet)
-    db.commit()
+    await db.delete(db_outlet)
+    await db.commit()
     
     return None
 
@@ -123,11 +136,11 @@ def delete_outlet(outlet_id: int, db: Session = Depends(get_db)):
 # ==================== STOCK ENDPOINTS ====================
 
 @router.post("/", response_model=StockResponse, status_code=status.HTTP_201_CREATED)
-def create_stock_entry(stock: StockCreate, db: Session = Depends(get_db)):
+async def create_stock_entry(stock: StockCreate, db: AsyncSession = Depends(get_async_db)):
     """Create or add to stock entry"""
     
     # Verify product exists
-    product = db.query(Product).filter(Product.id == stock.product_id).first()
+    product = await db.get(Product, stock.product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -136,7 +149,7 @@ def create_stock_entry(stock: StockCreate, db: Session = Depends(get_db)):
     
     # Verify outlet exists if provided
     if stock.outlet_id:
-        outlet = db.query(Outlet).filter(Outlet.id == stock.outlet_id).first()
+        outlet = await db.get(Outlet, stock.outlet_id)
         if not outlet:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -149,107 +162,77 @@ def create_stock_entry(stock: StockCreate, db: Session = Depends(get_db)):
                 detail=f"Outlet '{outlet.name}' is inactive"
             )
     
-    # Check if stock entry already exists
-    existing_stock = db.query(Stock).filter(
-        and_(
-            Stock.product_id == stock.product_id,
-            Stock.outlet_id == stock.outlet_id
-        )
-    ).first()
-    
-    if existing_stock:
-        # Update existing stock (add to existing quantity)
-        existing_stock.quantity += stock.quantity
-        db.commit()
-        db.refresh(existing_stock)
-        return existing_stock
-    else:
-        # Create new stock entry
-        db_stock = Stock(**stock.model_dump())
-        db.add(db_stock)
-        db.commit()
-        db.refresh(db_stock)
-        return db_stock
+    # Add to the existing entry, or create one
+    return await write_queue.run(db, lambda db: add_stock(db, stock.product_id, stock.outlet_id, stock.quantity))
 
 
 @router.put("/{stock_id}", response_model=StockResponse)
-def update_stock(stock_id: int, stock_update: StockUpdate, db: Session = Depends(get_db)):
+async def update_stock(stock_id: int, stock_update: StockUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update stock quantity (absolute value, not incremental)"""
     
-    db_stock = db.query(Stock).filter(Stock.id == stock_id).first()
+    db_stock = await write_queue.run(db, lambda db: set_stock_quantity(db, stock_id, stock_update.quantity))
     if not db_stock:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Stock entry {stock_id} not found"
         )
     
-    db_stock.quantity = stock_update.quantity
-    db.commit()
-    db.refresh(db_stock)
-    
     return db_stock
 
 
 @router.get("/", response_model=list[StockResponse])
-def list_stock(
+async def list_stock(
     product_id: int | None = None,
     outlet_id: int | None = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List stock entries with optional filters"""
     
-    query = db.query(Stock)
+    query = select(Stock)
     
     if product_id:
-        query = query.filter(Stock.product_id == product_id)
+        query = query.where(Stock.product_id == product_id)
     
     if outlet_id:
-        query = query.filter(Stock.outlet_id == outlet_id)
+        query = query.where(Stock.outlet_id == outlet_id)
     
-    return query.all()
+    return list(await db.scalars(query))
 
 
 @router.get("/low", response_model=list[LowStockResponse])
-def get_low_stock(outlet_id: int | None = None, db: Session = Depends(get_db)):
-    """Get all products with stock below minimum threshold"""
-    
-    query = db.query(Stock)
-    
-    if outlet_id:
-        query = query.filter(Stock.outlet_id == outlet_id)
-    
-    stock_entries = query.all()
-    low_stock_items = []
+async def get_low_stock(
+    outlet_id: int | None = None,
+    after_shortage: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = Query(None, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get all products with stock below minimum threshold, most severe shortage first.
+    Computed in one joined query and streamed; page with limit + after_shortage/after_id.
+    """
+    try:
+        query = low_stock_query(outlet_id, after_shortage, after_id, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    for stock in stock_entries:
-        product = stock.product
-        
-        if stock.quantity < product.min_stock:
-            outlet_name = stock.outlet.name if stock.outlet else "Godown"
-            
-            low_stock_items.append(LowStockResponse(
-                product_id=product.product_id,
-                product_name=product.name,
-                current_quantity=stock.quantity,
-                min_stock=product.min_stock,
-                outlet_name=outlet_name
-            ))
+    async def rows():
+        # The request session closes before a streamed body is sent, so stream from our own
+        async with AsyncSession(bind=db.bind) as stream_db:
+            async for chunk in stream_json_rows_async(stream_db, query):
+                yield chunk
     
-    return low_stock_items
+    return StreamingResponse(rows(), media_type="application/json")
 
 
 @router.delete("/{stock_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_stock_entry(stock_id: int, db: Session = Depends(get_db)):
+async def delete_stock_entry(stock_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a stock entry"""
     
-    db_stock = db.query(Stock).filter(Stock.id == stock_id).first()
-    if not db_stock:
+    if not await write_queue.run(db, lambda db: delete_stock(db, stock_id)):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Stock entry {stock_id} not found"
         )
     
-    db.delete(db_stock)
-    db.commit()
-    
     return None
\ No newline at end of file
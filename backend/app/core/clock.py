@@ -0,0 +1,32 @@
+"""
+The business day. Timestamps are stored as naive UTC (created_at defaults to
+datetime.utcnow); invoice numbers, sales rollups, report ranges and offer
+dates all use the calendar date in BUSINESS_TIMEZONE instead, or in the
+server's local time zone when that is unset.
+"""
+from datetime import date, datetime, time, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from app.core.config import settings
+
+
+@lru_cache()
+def business_timezone() -> ZoneInfo | None:
+    """BUSINESS_TIMEZONE, or None for the server's local time zone"""
+    return ZoneInfo(settings.BUSINESS_TIMEZONE) if settings.BUSINESS_TIMEZONE else None
+
+
+def business_day(at: datetime | None = None) -> date:
+    """The business date of a timestamp (naive values are UTC), or today's"""
+    at = at or datetime.utcnow()
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return at.astimezone(business_timezone()).date()
+
+
+def business_day_start(day: date) -> datetime:
+    """When a business day starts, as a naive UTC timestamp (for created_at ranges)"""
+    start = datetime.combine(day, time.min, business_timezone())
+    if start.tzinfo is None:
+        start = start.astimezone()  # server local time
+    return start.astimezone(timezone.utc).replace(tzinfo=None)
@@ -9,6 +9,79 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./spn_billing.db"
+    # Workers only check the schema version at startup; with this on, the first
+    # worker to find it behind applies the migrations (app.db.migrations). Turn it
+    # off where deploys run `python manage.py migrate` before starting workers
+    DB_AUTO_MIGRATE: bool = True
+    
+    # Connection pool, per engine (the async API engine and the sync one used by
+    # jobs and the remaining sync routes); not used for in-memory SQLite.
+    # The async engine uses aiosqlite for SQLite and asyncpg for PostgreSQL.
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # -1 never recycles
+    DB_POOL_PRE_PING: bool = False  # one extra round trip per checkout; useful behind proxies that drop idle connections
+
+    # SQLite storage profile: "production" sets WAL, synchronous=NORMAL, mmap and
+    # cache size on every connection and runs API writes one at a time through
+    # the in-process write queue; "default" keeps SQLite's own settings
+    SQLITE_PROFILE: str = "production"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # both profiles (other processes still contend for the write lock)
+    SQLITE_MMAP_SIZE_MB: int = 256
+    SQLITE_CACHE_SIZE_MB: int = 64
+
+    # SQL logging. DB_ECHO prints every statement (development only); the query
+    # log writes a sample of statements as JSON lines (logger "spn.sql") and
+    # always logs and aggregates those slower than QUERY_SLOW_MS
+    DB_ECHO: bool = False
+    QUERY_LOG_SAMPLE_RATE: float = 0.001  # 0 logs slow statements only
+    QUERY_SLOW_MS: float = 100
+    QUERY_SLOW_KEEP: int = 200  # distinct slow statements kept for /admin/slow-queries
+
+    # Per-route latency and SQL statement counts, scraped from /metrics
+    # (Prometheus text format); SERVER_TIMING adds them to each response too
+    METRICS_ENABLED: bool = True
+    SERVER_TIMING: bool = True
+
+    # Catalog cache (entries per LRU: products and active offers)
+    CATALOG_CACHE_SIZE: int = 10000
+    
+    # Business day for invoice numbers, sales rollups, report ranges and offer dates
+    BUSINESS_TIMEZONE: str | None = None  # e.g. "Asia/Kolkata"; unset = the server's local time zone
+    
+    # Invoice numbering
+    INVOICE_NUMBER_PREFIX: str = "INV"
+    INVOICE_SEQUENCE_PER_OUTLET: bool = False
+    INVOICE_NUMBER_BLOCK_SIZE: int = 1  # >1 reserves numbers in blocks (may leave gaps)
+    
+    # Idempotency-Key on /billing/confirm: replays within the TTL return the original invoice
+    IDEMPOTENCY_KEY_TTL_HOURS: float = 24
+    IDEMPOTENCY_PURGE_INTERVAL_MINUTES: float = 60  # background eviction; 0 disables it
+    
+    # Rendered barcode images (in-memory LRU entries, optional on-disk cache)
+    BARCODE_CACHE_SIZE: int = 2048
+    BARCODE_CACHE_DIR: str | None = None
+    LABEL_RENDER_WORKERS: int = 0  # 0 = one per CPU
+    
+    # Expired offers are moved to offer_history this many days after they end
+    OFFER_ARCHIVE_AFTER_DAYS: int = 7
+    OFFER_ARCHIVE_INTERVAL_HOURS: float = 24  # background job; 0 disables it
+    
+    # Product search (sales boost from the last N days, reloaded every N seconds)
+    SEARCH_SALES_WINDOW_DAYS: int = 30
+    SEARCH_SALES_REFRESH_SECONDS: int = 300
+    SEARCH_PRODUCT_REFRESH_SECONDS: float = 10  # re-index products edited by other workers
+    
+    # Offline POS: set on an outlet till to price and confirm carts from a local
+    # snapshot and sync the queued invoices to the central API in the background
+    POS_CENTRAL_URL: str | None = None  # e.g. http://central:8000/api/v1
+    POS_OUTLET_ID: int | None = None
+    POS_DATA_DIR: str = "./pos_data"
+    POS_SYNC_INTERVAL_SECONDS: float = 30
+    POS_SYNC_BATCH_SIZE: int = 200
+    POS_SNAPSHOT_REFRESH_MINUTES: float = 60
+    POS_CENTRAL_TIMEOUT_SECONDS: float = 10
     
     # CORS
     BACKEND_CORS_ORIGINS: list = ["*"]
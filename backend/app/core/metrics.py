@@ -0,0 +1,182 @@
+"""
+Request and database metrics in the Prometheus text format, served at
+/metrics. MetricsMiddleware times every request and counts the SQL
+statements it runs (cursor-execute events on the engines), labelled by
+route template, and reports both in a Server-Timing header.
+
+Queries per request make N+1 endpoints easy to spot: compare
+db_queries_per_request_sum / _count across routes, or watch a route whose
+histogram climbs with the page size.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+    def server_timing(self, elapsed: float) -> str:
+        return f'app;dur={elapsed * 1000:.1f}, db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"'
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def _label_pairs(names: tuple[str, ...], values: tuple) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+class Histogram:
+
+    def __init__(self, name: str, help: str, buckets: tuple, labels: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            # Per-bucket counts (the last one is +Inf) and the running sum
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            pairs = _label_pairs(self.labels, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{pairs},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{pairs}}} {total[0]}")
+            lines.append(f"{self.name}_count{{{pairs}}} {cumulative}")
+        return lines
+
+
+class Metrics:
+
+    def __init__(self):
+        self._lock = Lock()
+        self.request_seconds = Histogram(
+            "http_request_duration_seconds", "Request latency by route template",
+            LATENCY_BUCKETS, ("method", "route", "status")
+        )
+        self.request_queries = Histogram(
+            "db_queries_per_request", "SQL statements executed per request",
+            QUERY_BUCKETS, ("method", "route")
+        )
+        self.request_db_seconds = Histogram(
+            "db_time_per_request_seconds", "Time spent executing SQL per request",
+            LATENCY_BUCKETS, ("method", "route")
+        )
+        self.queries_outside_requests = 0  # background jobs, startup
+        self._gauges: list[tuple[str, str, tuple[str, ...], Callable]] = []
+
+    def gauge(self, name: str, help: str, read: Callable, labels: tuple[str, ...] = ()):
+        """Register a value read at scrape time: a number, or {label values: number} with labels"""
+        self._gauges.append((name, help, labels, read))
+
+    def attach(self, engine):
+        """Count statements on an engine (sync, or the sync_engine of an async one) against the current request"""
+        engine = getattr(engine, "sync_engine", engine)
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        stats = _request_stats.get()
+        if stats is None:
+            self.queries_outside_requests += 1
+            return
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - context._metrics_start
+
+    def observe_request(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats):
+        with self._lock:
+            self.request_seconds.observe((method, route, status), elapsed)
+            self.request_queries.observe((method, route), stats.queries)
+            self.request_db_seconds.observe((method, route), stats.db_seconds)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = (
+                self.request_seconds.render()
+                + self.request_queries.render()
+                + self.request_db_seconds.render()
+            )
+        lines += [
+            "# HELP db_queries_outside_requests_total SQL statements run outside a request (jobs, startup)",
+            "# TYPE db_queries_outside_requests_total counter",
+            f"db_queries_outside_requests_total {self.queries_outside_requests}",
+        ]
+        for name, help, labels, read in self._gauges:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            value = read()
+            if isinstance(value, dict):
+                lines += [f"{name}{{{_label_pairs(labels, key)}}} {v}" for key, v in value.items()]
+            else:
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def route_template(scope) -> str:
+    """The matched route's path template (never the raw path, to keep label cardinality bounded)"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed bodies (and their queries) are measured to the end"""
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    # Streamed bodies may run more queries after this point
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", stats.server_timing(time.perf_counter() - start)
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            metrics.observe_request(scope["method"], route_template(scope), status, time.perf_counter() - start, stats)
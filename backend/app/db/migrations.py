@@ -0,0 +1,357 @@
+"""
+Versioned schema migrations.
+
+The models describe the schema at HEAD. A new database is created from them
+directly and stamped with HEAD. An existing database records its version in
+schema_version; one without that table predates migrations and is taken to
+be at version 0, the schema first created by create_all at startup, possibly
+with some of the later tables already added by it (create_all adds missing
+tables, never missing columns or indexes). Migrations are therefore written
+to tolerate objects that already exist.
+
+Workers only read the version at startup (ensure_schema). Run pending
+migrations with `python manage.py migrate` before starting them, or leave
+DB_AUTO_MIGRATE on to have the first worker apply them.
+
+Table definitions inside a migration are frozen copies, not the models: a
+migration must keep creating the same schema after the models move on.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+from sqlalchemy import (
+    BigInteger, Boolean, Column, Date, DateTime, Enum, ForeignKey, Integer, JSON, MetaData, Numeric, String,
+    Table, inspect, select, text
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+OFFER_TYPES = ("BUY_X_GET_Y", "PERCENTAGE", "FLAT", "TIERED", "BUNDLE", "CART_THRESHOLD")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+# Helpers
+
+def _columns(conn: Connection, table: str) -> dict[str, dict]:
+    return {column["name"]: column for column in inspect(conn).get_columns(table)}
+
+
+def _add_column(conn: Connection, table: str, column: Column, default: str | None = None, references: str | None = None):
+    """ALTER TABLE ADD COLUMN unless present; NOT NULL columns need a default for the existing rows"""
+    if column.name in _columns(conn, table):
+        return
+    ddl = f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+    if default is not None:
+        ddl += f" NOT NULL DEFAULT {default}"
+    if references:
+        ddl += f" REFERENCES {references}"
+    conn.exec_driver_sql(ddl)
+
+
+def _create_index(conn: Connection, name: str, table: str, columns: tuple[str, ...], unique: bool = False):
+    conn.exec_driver_sql(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    )
+
+
+# 1: everything added since the first release, which create_all could not apply to existing databases
+
+def _offer_columns(history: bool = False) -> list[Column]:
+    """Columns of offers, or of offer_history (same ids, no foreign key, archive indexes)"""
+    product_fk = [] if history else [ForeignKey("products.id", ondelete="CASCADE")]
+    columns = [
+        Column("id", Integer, primary_key=True, autoincrement=not history),
+        Column("product_id", Integer, *product_fk, nullable=True, index=history),
+        Column("offer_type", Enum(*OFFER_TYPES, name="offertype"), nullable=False),
+        Column("priority", Integer, nullable=False),
+        Column("stackable", Boolean, nullable=False),
+        Column("x_quantity", Integer),
+        Column("y_quantity", Integer),
+        Column("discount_percent", Numeric(5, 2)),
+        Column("discount_flat", Numeric(10, 2)),
+        Column("tiers", JSON),
+        Column("bundle_product_ids", JSON),
+        Column("bundle_quantity", Integer),
+        Column("bundle_price", Numeric(10, 2)),
+        Column("min_cart_total", Numeric(10, 2)),
+        Column("start_date", Date, nullable=False),
+        Column("end_date", Date, nullable=False, index=history),
+        Column("is_active", Boolean, nullable=False),
+    ]
+    return columns + [Column("archived_at", DateTime, nullable=False)] if history else columns
+
+
+def _rebuild_offers(conn: Connection):
+    """
+    SQLite: copy offers into a fresh table (nullable product_id, AUTOINCREMENT
+    ids, priority/stackable filled in if missing) and swap it in
+    """
+    existing = _columns(conn, "offers")
+    metadata = MetaData()
+    Table("products", metadata, Column("id", Integer, primary_key=True))
+    rebuilt = Table("offers_rebuild", metadata, *_offer_columns(), sqlite_autoincrement=True)
+    rebuilt.create(conn)
+    copied = [name for name in existing if name in rebuilt.c]
+    defaults = [name for name in ("priority", "stackable") if name not in existing]
+    conn.exec_driver_sql(
+        f"INSERT INTO offers_rebuild ({', '.join(copied + defaults)}) "
+        f"SELECT {', '.join(copied + ['0'] * len(defaults))} FROM offers"
+    )
+    conn.exec_driver_sql("DROP TABLE offers")
+    conn.exec_driver_sql("ALTER TABLE offers_rebuild RENAME TO offers")
+    _create_index(conn, "ix_offers_id", "offers", ("id",))
+    _create_index(conn, "ix_offers_product_active", "offers", ("product_id", "is_active", "end_date"))
+    _create_index(conn, "ix_offers_active_dates", "offers", ("is_active", "end_date", "start_date"))
+
+
+def _upgrade_offers(conn: Connection):
+    offers = Table("offers", MetaData(), *_offer_columns())
+
+    if not _columns(conn, "offers")["product_id"]["nullable"]:
+        # Cart-level offers have no product
+        if conn.dialect.name == "sqlite":
+            # SQLite cannot drop NOT NULL
+            _rebuild_offers(conn)
+        else:
+            conn.exec_driver_sql("ALTER TABLE offers ALTER COLUMN product_id DROP NOT NULL")
+
+    if conn.dialect.name == "postgresql":
+        for offer_type in OFFER_TYPES:
+            conn.exec_driver_sql(f"ALTER TYPE offertype ADD VALUE IF NOT EXISTS '{offer_type}'")
+
+    _add_column(conn, "offers", offers.c.priority, default="0")
+    _add_column(conn, "offers", offers.c.stackable, default="FALSE")
+    for name in ("tiers", "bundle_product_ids", "bundle_quantity", "bundle_price", "min_cart_total"):
+        _add_column(conn, "offers", offers.c[name])
+    _create_index(conn, "ix_offers_product_active", "offers", ("product_id", "is_active", "end_date"))
+    _create_index(conn, "ix_offers_active_dates", "offers", ("is_active", "end_date", "start_date"))
+
+
+def _new_tables(metadata: MetaData) -> list[Table]:
+    return [
+        Table("offer_history", metadata, *_offer_columns(history=True)),
+        Table(
+            "outlet_stock_summaries", metadata,
+            Column("outlet_id", Integer, ForeignKey("outlets.id", ondelete="CASCADE"), primary_key=True),
+            Column("total_products", Integer, nullable=False),
+            Column("total_quantity", Integer, nullable=False),
+            Column("low_stock_count", Integer, nullable=False),
+        ),
+        Table(
+            "invoice_sequences", metadata,
+            Column("prefix", String(20), primary_key=True),
+            Column("day", Date, primary_key=True),
+            Column("outlet_id", Integer, primary_key=True),
+            Column("last_value", Integer, nullable=False),
+        ),
+        Table(
+            "product_id_sequences", metadata,
+            Column("cost_bucket", Integer, primary_key=True),
+            Column("last_value", Integer, nullable=False),
+        ),
+        Table(
+            "idempotency_keys", metadata,
+            Column("key", String(255), primary_key=True),
+            Column("request_hash", String(64), nullable=False),
+            Column("invoice_id", Integer, ForeignKey("invoices.id", ondelete="CASCADE")),
+            Column("created_at", DateTime, nullable=False, index=True),
+        ),
+        Table(
+            "sales_daily", metadata,
+            Column("day", Date, primary_key=True),
+            Column("outlet_id", Integer, primary_key=True),
+            Column("invoices", Integer, nullable=False),
+            *[Column(name, BigInteger, nullable=False) for name in ("units", "gross_paise", "discount_paise", "cost_paise")],
+        ),
+        Table(
+            "product_sales_daily", metadata,
+            Column("day", Date, primary_key=True),
+            Column("outlet_id", Integer, primary_key=True),
+            Column("product_id", Integer, primary_key=True),
+            *[Column(name, BigInteger, nullable=False) for name in ("units", "gross_paise", "discount_paise", "cost_paise")],
+        ),
+    ]
+
+
+def upgrade_1(conn: Connection):
+    metadata = MetaData()
+    Table("products", metadata, Column("id", Integer, primary_key=True))
+    Table("outlets", metadata, Column("id", Integer, primary_key=True))
+    Table("invoices", metadata, Column("id", Integer, primary_key=True))
+    for table in _new_tables(metadata):
+        table.create(conn, checkfirst=True)
+
+    _upgrade_offers(conn)
+
+    _add_column(conn, "invoices", Column("outlet_id", Integer), references="outlets (id) ON DELETE SET NULL")
+    _add_column(conn, "invoices", Column("client_uuid", String(36)))
+    _create_index(conn, "uq_invoices_client_uuid", "invoices", ("client_uuid",), unique=True)
+    _create_index(conn, "ix_invoices_created_at_id", "invoices", ("created_at", "id"))
+    _create_index(conn, "ix_invoices_outlet_created_at_id", "invoices", ("outlet_id", "created_at", "id"))
+    _create_index(conn, "ix_invoice_items_invoice_id", "invoice_items", ("invoice_id",))
+    _create_index(conn, "ix_products_category_id", "products", ("category", "id"))
+    _create_index(conn, "ix_products_selling_price_id", "products", ("selling_price", "id"))
+
+
+# 2: one stock row per (product, outlet)
+
+def upgrade_2(conn: Connection):
+    duplicates = conn.exec_driver_sql(
+        "SELECT product_id, outlet_id, MIN(id), SUM(quantity) FROM stock "
+        "WHERE outlet_id IS NOT NULL GROUP BY product_id, outlet_id HAVING COUNT(*) > 1"
+    ).all()
+    for product_id, outlet_id, keep_id, quantity in duplicates:
+        # Keep the oldest row with the combined quantity
+        params = {"product_id": product_id, "outlet_id": outlet_id, "keep_id": keep_id, "quantity": quantity}
+        conn.execute(text("UPDATE stock SET quantity = :quantity WHERE id = :keep_id"), params)
+        conn.execute(text(
+            "DELETE FROM stock WHERE product_id = :product_id AND outlet_id = :outlet_id AND id <> :keep_id"
+        ), params)
+
+    if duplicates:
+        # Merged rows change the outlets' product counts
+        conn.exec_driver_sql("DELETE FROM outlet_stock_summaries")
+        conn.exec_driver_sql(
+            "INSERT INTO outlet_stock_summaries (outlet_id, total_products, total_quantity, low_stock_count) "
+            "SELECT s.outlet_id, COUNT(s.id), COALESCE(SUM(s.quantity), 0), "
+            "SUM(CASE WHEN s.quantity < p.min_stock THEN 1 ELSE 0 END) "
+            "FROM stock s JOIN products p ON p.id = s.product_id "
+            "WHERE s.outlet_id IS NOT NULL GROUP BY s.outlet_id"
+        )
+    _create_index(conn, "uq_stock_product_outlet", "stock", ("product_id", "outlet_id"), unique=True)
+
+
+# 3: offer ids are never reused (archived offers keep theirs in offer_history)
+
+def upgrade_3(conn: Connection):
+    highest = "SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM offers UNION ALL SELECT MAX(id) FROM offer_history) ids"
+    # Offers that were handed an archived offer's id again could never be archived: move them past every id
+    offset = conn.exec_driver_sql(f"SELECT COALESCE(({highest}), 0)").scalar()
+    conn.exec_driver_sql(f"UPDATE offers SET id = id + {offset} WHERE id IN (SELECT id FROM offer_history)")
+
+    if conn.dialect.name == "sqlite":
+        ddl = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'offers'").scalar()
+        if "AUTOINCREMENT" not in ddl.upper():
+            _rebuild_offers(conn)
+        # Continue after the highest id used in either table
+        conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'offers'")
+        conn.exec_driver_sql(f"INSERT INTO sqlite_sequence (name, seq) SELECT 'offers', COALESCE(({highest}), 0)")
+    elif conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('offers', 'id'), GREATEST(COALESCE(({highest}), 0), 1))"
+        )
+
+
+# 4: products record when they last changed (search indexes in other workers pick up edits)
+
+def upgrade_4(conn: Connection):
+    _add_column(conn, "products", Column("updated_at", DateTime))
+    conn.exec_driver_sql("UPDATE products SET updated_at = created_at WHERE updated_at IS NULL")
+    _create_index(conn, "ix_products_updated_at", "products", ("updated_at",))
+
+
+MIGRATIONS = [
+    Migration(1, "Offer types, sequences, idempotency keys, outlet invoices, sales rollups and history indexes", upgrade_1),
+    Migration(2, "One stock row per product and outlet (unique index on product_id, outlet_id)", upgrade_2),
+    Migration(3, "Offer ids are never reused (AUTOINCREMENT on SQLite)", upgrade_3),
+    Migration(4, "products.updated_at for search index refreshes", upgrade_4),
+]
+HEAD = MIGRATIONS[-1].version
+
+
+def current_version(conn: Connection) -> int | None:
+    """The database's schema version: None for an empty database, 0 for one that predates migrations"""
+    if inspect(conn).has_table("schema_version"):
+        return conn.scalar(select(schema_version.c.version).order_by(schema_version.c.version.desc()).limit(1)) or 0
+    return 0 if inspect(conn).has_table("products") else None
+
+
+@contextmanager
+def _migration_transaction(engine: Engine):
+    """A transaction that holds the database's migration lock, so concurrently starting workers migrate once"""
+    if engine.dialect.name == "sqlite":
+        # pysqlite does not open a transaction before DDL; take the write lock up front instead
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            conn.exec_driver_sql("COMMIT")
+    else:
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.exec_driver_sql("SELECT pg_advisory_xact_lock(hashtext('spn_schema_version'))")
+            yield conn
+
+
+def migrate(engine: Engine, log: Callable[[str], None] = lambda message: None) -> list[Migration]:
+    """Bring the database to HEAD in one transaction; returns the migrations applied"""
+    from app.db.base import Base
+    import app.models  # noqa: F401  (register all tables)
+
+    with _migration_transaction(engine) as conn:
+        version = current_version(conn)
+        schema_version.create(conn, checkfirst=True)
+        now = datetime.utcnow()
+
+        if version is None:
+            Base.metadata.create_all(bind=conn)
+            conn.execute(schema_version.insert(), [
+                {"version": m.version, "description": m.description, "applied_at": now} for m in MIGRATIONS
+            ])
+            log(f"Created schema at version {HEAD}")
+            return list(MIGRATIONS)
+
+        pending = [m for m in MIGRATIONS if m.version > version]
+        for migration in pending:
+            log(f"Applying {migration.version}: {migration.description}")
+            migration.upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                version=migration.version, description=migration.description, applied_at=datetime.utcnow()
+            ))
+        return pending
+
+
+def ensure_schema(engine: Engine, auto_migrate: bool, log: Callable[[str], None] = lambda message: None) -> int:
+    """
+    Worker startup: read the schema version (one query) and return it if it
+    is HEAD. Otherwise migrate, or raise SchemaOutOfDate when
+    auto_migrate is off. A database newer than this build also raises.
+    """
+    with engine.connect() as conn:
+        try:
+            # The common case in one statement; no inspector, nothing to compile
+            version = conn.exec_driver_sql("SELECT MAX(version) FROM schema_version").scalar() or 0
+        except DBAPIError:
+            conn.rollback()
+            version = current_version(conn)
+    if version == HEAD:
+        return version
+    if version is not None and version > HEAD:
+        raise SchemaOutOfDate(f"Database schema is at version {version}, newer than this build ({HEAD})")
+    if not auto_migrate:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {version or 0}, this build needs {HEAD}: run `python manage.py migrate`"
+        )
+    migrate(engine, log)
+    return HEAD
@@ -0,0 +1,145 @@
+"""
+Structured, sampled SQL statement log. Instead of echoing every statement,
+a share of them (QUERY_LOG_SAMPLE_RATE) is logged as one JSON line each with
+its duration and row count, and every statement slower than QUERY_SLOW_MS is
+logged at WARNING and aggregated by statement shape for /admin/slow-queries.
+
+Durations cover cursor.execute() only (fetching a large result afterwards is
+not included). Row counts are what the driver reports: affected rows for
+INSERT/UPDATE/DELETE; SQLite reports none for SELECT (logged as null).
+"""
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from sqlalchemy import event
+from app.core.config import settings
+
+logger = logging.getLogger("spn.sql")
+if not logger.handlers:
+    # One JSON object per line on stderr, unless the deployment configures "spn.sql" itself
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# "IN (?, ?, ?)" and multi-row VALUES lists vary in length with the parameters
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*,)*\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*\)")
+_REPEATED_LIST = re.compile(r"\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with placeholder lists collapsed, so the same query groups together"""
+    shape = _PLACEHOLDER_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+    return _REPEATED_LIST.sub("(?...), ...", shape)
+
+
+@dataclass
+class SlowStatement:
+    statement: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    max_rows: int | None = None
+    last_seen: datetime | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "statement": self.statement,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 2),
+            "max_ms": round(self.max_ms, 2),
+            "max_rows": self.max_rows,
+            "last_seen": self.last_seen,
+        }
+
+
+class QueryLog:
+
+    def __init__(self, sample_rate: float, slow_ms: float, keep: int):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.keep = keep
+        self._slow: dict[str, SlowStatement] = {}
+        self._lock = Lock()
+        self.statements = 0
+        self.sampled = 0
+        self.slow = 0
+
+    def attach(self, engine):
+        """Time every statement on an engine (sync, or the sync_engine of an async one)"""
+        engine = getattr(engine, "sync_engine", engine)
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._query_log_start = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._query_log_start) * 1000
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+        slow = elapsed_ms >= self.slow_ms
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+
+        self.statements += 1
+        if not (slow or sampled):
+            return
+
+        shape = statement_shape(statement)
+        if slow:
+            self._record_slow(shape, elapsed_ms, rows)
+        else:
+            self.sampled += 1
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps({
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "event": "slow_query" if slow else "query",
+            "ms": round(elapsed_ms, 3),
+            "rows": rows,
+            "executemany": executemany,
+            "statement": shape,
+        }))
+
+    def _record_slow(self, shape: str, elapsed_ms: float, rows: int | None):
+        with self._lock:
+            self.slow += 1
+            entry = self._slow.get(shape)
+            if entry is None:
+                if len(self._slow) >= self.keep:
+                    # Make room by dropping the statement with the least total time
+                    del self._slow[min(self._slow.values(), key=lambda e: e.total_ms).statement]
+                entry = self._slow[shape] = SlowStatement(shape)
+            entry.count += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            if rows is not None:
+                entry.max_rows = max(entry.max_rows or 0, rows)
+            entry.last_seen = datetime.now()
+
+    def slow_statements(self, sort: str = "total_ms", limit: int = 20) -> list[dict]:
+        with self._lock:
+            entries = [entry.as_dict() for entry in self._slow.values()]
+        return sorted(entries, key=lambda entry: entry[sort], reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._slow.clear()
+            self.statements = self.sampled = self.slow = 0
+
+    def stats(self) -> dict:
+        return {
+            "statements": self.statements,
+            "sampled": self.sampled,
+            "slow": self.slow,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+        }
+
+
+query_log = QueryLog(settings.QUERY_LOG_SAMPLE_RATE, settings.QUERY_SLOW_MS, settings.QUERY_SLOW_KEEP)
@@ -1,15 +1,106 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import time
+from weakref import WeakKeyDictionary
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.query_log import query_log
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its async driver (aiosqlite for SQLite, asyncpg for PostgreSQL)"""
+    scheme, separator, rest = url.partition("://")
+    backend = scheme.split("+")[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database URL scheme '{scheme}'")
+    return f"{ASYNC_DRIVERS[backend]}{separator}{rest}"
+
+
+def pool_options(url: str, poolclass=None) -> dict:
+    """Pool settings for an engine; in-memory SQLite keeps SQLAlchemy's single-connection pool"""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return {}
+    options = {"poolclass": poolclass} if poolclass else {}
+    return options | {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+SQLITE_PROFILES = ("production", "default")
+
+
+def sqlite_pragmas(profile: str) -> list[str]:
+    """PRAGMAs run on every new SQLite connection for a storage profile"""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE '{profile}'. Use one of: {', '.join(SQLITE_PROFILES)}")
+    pragmas = [f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}"]
+    if profile == "production":
+        pragmas += [
+            # Readers keep reading the last commit while a write is in progress
+            "PRAGMA journal_mode=WAL",
+            # fsync at checkpoints only: a power cut can lose the latest commits, never corrupt the file
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+            f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_MB * 1024}",  # negative = KiB
+            "PRAGMA temp_store=MEMORY",
+        ]
+    return pragmas
+
+
+def apply_sqlite_profile(engine, profile: str):
+    """Set the profile's PRAGMAs on each new connection of a SQLite engine (sync or async)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(profile)
+
+    @event.listens_for(sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
 
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False},  # Needed for SQLite
-    echo=True  # Set to False in production
+    echo=settings.DB_ECHO,
+    **pool_options(settings.DATABASE_URL)
 )
 
+apply_sqlite_profile(engine, settings.SQLITE_PROFILE)
+query_log.attach(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# API routes: the event loop waits on the database instead of a threadpool thread
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    echo=settings.DB_ECHO,
+    # aiosqlite would default to NullPool (a new connection per checkout) for a file database
+    **pool_options(settings.DATABASE_URL, poolclass=AsyncAdaptedQueuePool)
+)
+apply_sqlite_profile(async_engine, settings.SQLITE_PROFILE)
+query_log.attach(async_engine)
+
+# expire_on_commit=False: an expired attribute would need I/O to reload outside an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
     """Dependency for FastAPI routes"""
@@ -17,4 +108,119 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Dependency for async FastAPI routes"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def is_lock_conflict(exc: OperationalError) -> bool:
+    """True for transient lock/serialization errors that are safe to retry"""
+    pgcode = getattr(exc.orig, "pgcode", None) or getattr(exc.orig, "sqlstate", None)
+    return pgcode in ("40001", "40P01") or "locked" in str(exc.orig).lower()
+
+
+def run_in_transaction(db: Session, work, retries: int = 3, backoff: float = 0.02):
+    """
+    Run work(db) and commit, retrying the whole unit on lock conflicts.
+    Any other error rolls back and propagates.
+    """
+    for attempt in range(retries + 1):
+        try:
+            result = work(db)
+            db.commit()
+            return result
+        except OperationalError as e:
+            db.rollback()
+            if attempt == retries or not is_lock_conflict(e):
+                raise
+            time.sleep(backoff * (2 ** attempt))
+        except Exception:
+            db.rollback()
+            raise
+
+
+async def run_in_transaction_async(db: AsyncSession, work, retries: int = 3, backoff: float = 0.02):
+    """
+    run_in_transaction for an AsyncSession: work(sync_session) runs through
+    run_sync, so the sync services can be reused; retries back off without
+    blocking the event loop.
+    """
+    for attempt in range(retries + 1):
+        try:
+            result = await db.run_sync(work)
+            await db.commit()
+            return result
+        except OperationalError as e:
+            await db.rollback()
+            if attempt == retries or not is_lock_conflict(e):
+                raise
+            await asyncio.sleep(backoff * (2 ** attempt))
+        except Exception:
+            await db.rollback()
+            raise
+
+
+class WriteQueue:
+    """
+    Runs API write transactions one at a time, in arrival order, per process.
+    SQLite has a single write lock: without the queue, concurrent writers each
+    hold a pooled connection while they wait on busy_timeout, and readers end
+    up waiting for connections behind them. A job waiting here holds none.
+    With serialize=False (server databases) jobs run straight through.
+    """
+
+    def __init__(self, serialize: bool):
+        self.serialize = serialize
+        self._locks: WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = WeakKeyDictionary()
+        self.waiting = 0
+
+    def _lock(self) -> asyncio.Lock:
+        # asyncio.Lock is FIFO; one per event loop (benchmarks and tests start several)
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    async def run(self, db: AsyncSession, work, retries: int = 3):
+        """
+        run_in_transaction_async(db, work) through the queue. Whatever db has
+        read so far is committed first (it must not hold pending writes), which
+        gives its connection back to the pool while the job waits.
+        """
+        if not self.serialize:
+            return await run_in_transaction_async(db, work, retries)
+
+        await db.commit()
+        lock = self._lock()
+        self.waiting += 1
+        try:
+            await lock.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            return await run_in_transaction_async(db, work, retries)
+        finally:
+            lock.release()
+
+
+write_queue = WriteQueue(
+    serialize=settings.DATABASE_URL.startswith("sqlite") and settings.SQLITE_PROFILE == "production"
+)
+
+
+def pool_checked_out() -> dict:
+    # StaticPool/SingletonThreadPool (in-memory SQLite) do not track checkouts
+    pools = {("sync",): engine.pool, ("async",): async_engine.sync_engine.pool}
+    return {key: pool.checkedout() for key, pool in pools.items() if hasattr(pool, "checkedout")}
+
+
+if settings.METRICS_ENABLED:
+    metrics.attach(engine)
+    metrics.attach(async_engine)
+    metrics.gauge("db_pool_checked_out", "Pooled connections currently in use", pool_checked_out, ("engine",))
+    metrics.gauge("db_write_queue_waiting", "API write transactions waiting in the write queue", lambda: write_queue.waiting)
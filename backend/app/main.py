@@ -1,23 +1,51 @@
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from app.core.config import settings
-from app.db.base import Base
-from app.db.session import engine
+from app.core.metrics import MetricsMiddleware, metrics
+from app.db.migrations import ensure_schema
+from app.db.session import engine, SessionLocal
 from app.api.v1 import api_router
+from app.services.labels import shutdown_pool
+from app.services.idempotency import run_key_purge_job
+from app.services.offer_archive import run_archive_job
+from app.services.offline_pos import pos_till, run_pos_sync_job
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
-    # Startup: Create tables
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created")
+    # Startup: Check the schema version (migrate if behind and DB_AUTO_MIGRATE)
+    version = ensure_schema(engine, settings.DB_AUTO_MIGRATE, log=lambda message: print(f"🛠️  {message}"))
+    print(f"✅ Database schema at version {version}")
+    
+    # Archive expired offers in the background
+    archive_job = None
+    if settings.OFFER_ARCHIVE_INTERVAL_HOURS > 0:
+        archive_job = asyncio.create_task(run_archive_job(SessionLocal, settings.OFFER_ARCHIVE_INTERVAL_HOURS))
+    
+    # Evict expired idempotency keys
+    key_purge_job = None
+    if settings.IDEMPOTENCY_PURGE_INTERVAL_MINUTES > 0:
+        key_purge_job = asyncio.create_task(run_key_purge_job(SessionLocal, settings.IDEMPOTENCY_PURGE_INTERVAL_MINUTES))
+    
+    # Outlet till: push offline invoices to the central API in the background
+    pos_sync_job = None
+    if pos_till is not None:
+        pos_sync_job = asyncio.create_task(run_pos_sync_job(pos_till, settings.POS_SYNC_INTERVAL_SECONDS))
     
     yield
     
-    # Shutdown: Cleanup if needed
+    # Shutdown: Stop background jobs and label rendering workers
+    for job in (archive_job, key_purge_job, pos_sync_job):
+        if job:
+            job.cancel()
+            with suppress(asyncio.CancelledError):
+                await job
+    shutdown_pool()
     print("👋 Shutting down...")
 
 
@@ -36,8 +64,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed", "Server-Timing"],
 )
 
+# Request latency and SQL statement counts per route (added last: outermost, times everything)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, server_timing=settings.SERVER_TIMING)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -55,4 +88,10 @@ def root():
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
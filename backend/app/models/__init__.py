@@ -1,18 +1,28 @@
 from app.models.user import User
-from app.models.outlet import Outlet
+from app.models.outlet import Outlet, OutletStockSummary
 from app.models.product import Product
-from app.models.offer import Offer
+from app.models.offer import Offer, OfferHistory
 from app.models.stock import Stock
 from app.models.invoice import Invoice, InvoiceItem
 from app.models.barcode import Barcode
+from app.models.sequence import InvoiceSequence, ProductIdSequence
+from app.models.idempotency import IdempotencyKey
+from app.models.sales import SalesDaily, ProductSalesDaily
 
 __all__ = [
     "User",
     "Outlet",
+    "OutletStockSummary",
     "Product",
     "Offer",
+    "OfferHistory",
     "Stock",
     "Invoice",
     "InvoiceItem",
-    "Barcode"
+    "Barcode",
+    "InvoiceSequence",
+    "ProductIdSequence",
+    "IdempotencyKey",
+    "SalesDaily",
+    "ProductSalesDaily"
 ]
\ No newline at end of file
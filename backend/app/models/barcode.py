@@ -10,7 +10,7 @@ class Barcode(Base):
     product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"), unique=True)
     barcode_value: Mapped[str] = mapped_column(String(15), unique=True, nullable=False)
     barcode_format: Mapped[str] = mapped_column(String(20), default="Code128")
-    barcode_image: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)  # Store image bytes
+    barcode_image: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)  # Legacy pre-rendered image; new barcodes render on demand
     
     # Relationships
     product: Mapped["Product"] = relationship("Product", back_populates="barcode")
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import String, Integer, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    # Client-chosen Idempotency-Key of a confirmed invoice; evicted after IDEMPOTENCY_KEY_TTL_HOURS
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)  # sha256 of the request body
+    invoice_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
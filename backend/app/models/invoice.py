@@ -1,19 +1,28 @@
-from sqlalchemy import String, Integer, Numeric, DateTime, ForeignKey, Text
+from sqlalchemy import String, Integer, Numeric, DateTime, ForeignKey, Index, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
+from decimal import Decimal
 from app.db.base import Base
 
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        # Invoice history: newest first, keyset on (created_at, id), overall and per outlet
+        Index("ix_invoices_created_at_id", "created_at", "id"),
+        Index("ix_invoices_outlet_created_at_id", "outlet_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     invoice_number: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
-    total_amount: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
-    discount_amount: Mapped[float] = mapped_column(Numeric(10, 2), default=0.0)
-    final_amount: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
+    total_amount: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    discount_amount: Mapped[Decimal] = mapped_column(Numeric(10, 2), default=0.0)
+    final_amount: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    outlet_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("outlets.id", ondelete="SET NULL"), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Generated by an outlet till for invoices confirmed offline; makes bulk sync idempotent
+    client_uuid: Mapped[str | None] = mapped_column(String(36), unique=True, nullable=True)
     
     # Relationships
     items: Mapped[list["InvoiceItem"]] = relationship("InvoiceItem", back_populates="invoice", cascade="all, delete-orphan")
@@ -23,13 +32,13 @@ class InvoiceItem(Base):
     __tablename__ = "invoice_items"
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    invoice_id: Mapped[int] = mapped_column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"))
+    invoice_id: Mapped[int] = mapped_column(Integer, ForeignKey("invoices.id", ondelete="CASCADE"), index=True)
     product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id"))
     
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
-    unit_price: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
-    discount: Mapped[float] = mapped_column(Numeric(10, 2), default=0.0)
-    line_total: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
+    unit_price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    discount: Mapped[Decimal] = mapped_column(Numeric(10, 2), default=0.0)
+    line_total: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
     
     offer_applied: Mapped[str | None] = mapped_column(String(255), nullable=True)
     
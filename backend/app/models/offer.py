@@ -1,6 +1,6 @@
-from sqlalchemy import String, Integer, Numeric, Date, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, Integer, Numeric, Date, DateTime, Boolean, ForeignKey, Index, JSON, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from datetime import date
+from datetime import date, datetime
 from enum import Enum
 from app.db.base import Base
 
@@ -9,28 +9,79 @@ class OfferType(str, Enum):
     BUY_X_GET_Y = "BUY_X_GET_Y"
     PERCENTAGE = "PERCENTAGE"
     FLAT = "FLAT"
+    TIERED = "TIERED"
+    BUNDLE = "BUNDLE"
+    CART_THRESHOLD = "CART_THRESHOLD"
 
 
 class Offer(Base):
     __tablename__ = "offers"
+    __table_args__ = (
+        # Active-offer lookups by product ("has active offer" filter, pricing)
+        Index("ix_offers_product_active", "product_id", "is_active", "end_date"),
+        # Date-range scans: offer calendar loads and archiving expired offers
+        Index("ix_offers_active_dates", "is_active", "end_date", "start_date"),
+        # Never reuse an id: archived offers keep theirs in offer_history
+        {"sqlite_autoincrement": True},
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"))
+    # None for cart-level offers (CART_THRESHOLD)
+    product_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=True)
     offer_type: Mapped[OfferType] = mapped_column(SQLEnum(OfferType), nullable=False)
     
+    # Higher priority is applied first; stackable offers apply on top of the best exclusive one
+    priority: Mapped[int] = mapped_column(Integer, default=0)
+    stackable: Mapped[bool] = mapped_column(Boolean, default=False)
+    
     # For BUY_X_GET_Y
     x_quantity: Mapped[int | None] = mapped_column(Integer, nullable=True)
     y_quantity: Mapped[int | None] = mapped_column(Integer, nullable=True)
     
-    # For PERCENTAGE
+    # For PERCENTAGE (and CART_THRESHOLD)
     discount_percent: Mapped[float | None] = mapped_column(Numeric(5, 2), nullable=True)
     
-    # For FLAT
+    # For FLAT (and CART_THRESHOLD)
     discount_flat: Mapped[float | None] = mapped_column(Numeric(10, 2), nullable=True)
     
+    # For TIERED: [{"min_quantity": 5, "discount_percent": 10}, ...]
+    tiers: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    
+    # For BUNDLE: any bundle_quantity units from these products for bundle_price
+    bundle_product_ids: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    bundle_quantity: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    bundle_price: Mapped[float | None] = mapped_column(Numeric(10, 2), nullable=True)
+    
+    # For CART_THRESHOLD
+    min_cart_total: Mapped[float | None] = mapped_column(Numeric(10, 2), nullable=True)
+    
     start_date: Mapped[date] = mapped_column(Date, nullable=False)
     end_date: Mapped[date] = mapped_column(Date, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     
     # Relationships
-    product: Mapped["Product"] = relationship("Product", back_populates="offers")
\ No newline at end of file
+    product: Mapped["Product"] = relationship("Product", back_populates="offers")
+
+
+class OfferHistory(Base):
+    """Expired offers moved out of the hot offers table (same id and columns)"""
+    __tablename__ = "offer_history"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    product_id: Mapped[int | None] = mapped_column(Integer, index=True, nullable=True)
+    offer_type: Mapped[OfferType] = mapped_column(SQLEnum(OfferType), nullable=False)
+    priority: Mapped[int] = mapped_column(Integer, default=0)
+    stackable: Mapped[bool] = mapped_column(Boolean, default=False)
+    x_quantity: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    y_quantity: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    discount_percent: Mapped[float | None] = mapped_column(Numeric(5, 2), nullable=True)
+    discount_flat: Mapped[float | None] = mapped_column(Numeric(10, 2), nullable=True)
+    tiers: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    bundle_product_ids: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    bundle_quantity: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    bundle_price: Mapped[float | None] = mapped_column(Numeric(10, 2), nullable=True)
+    min_cart_total: Mapped[float | None] = mapped_column(Numeric(10, 2), nullable=True)
+    start_date: Mapped[date] = mapped_column(Date, nullable=False)
+    end_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
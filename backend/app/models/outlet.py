@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, Boolean
+from sqlalchemy import String, Integer, Boolean, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
@@ -19,4 +19,13 @@ class Outlet(Base):
         "Stock", 
         back_populates="outlet",
         cascade="all, delete-orphan"
-    )
\ No newline at end of file
+    )
+
+class OutletStockSummary(Base):
+    __tablename__ = "outlet_stock_summaries"
+    
+    # Maintained incrementally on every stock write (see app.services.stock)
+    outlet_id: Mapped[int] = mapped_column(Integer, ForeignKey("outlets.id", ondelete="CASCADE"), primary_key=True)
+    total_products: Mapped[int] = mapped_column(Integer, default=0)
+    total_quantity: Mapped[int] = mapped_column(Integer, default=0)
+    low_stock_count: Mapped[int] = mapped_column(Integer, default=0)
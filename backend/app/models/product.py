@@ -1,4 +1,4 @@
-from sqlalchemy import String, Numeric, Integer, DateTime
+from sqlalchemy import String, Numeric, Integer, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from app.db.base import Base
@@ -6,6 +6,11 @@ from app.db.base import Base
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Keyset pagination on id within the catalog listing filters
+        Index("ix_products_category_id", "category", "id"),
+        Index("ix_products_selling_price_id", "selling_price", "id"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     product_id: Mapped[str] = mapped_column(String(15), unique=True, index=True, nullable=False)
@@ -16,6 +21,8 @@ class Product(Base):
     selling_price: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
     min_stock: Mapped[int] = mapped_column(Integer, default=10)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Set on every ORM update; other workers' search indexes re-read products changed since their last refresh
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     barcode: Mapped["Barcode"] = relationship("Barcode", back_populates="product", uselist=False, cascade="all, delete-orphan")
@@ -0,0 +1,31 @@
+from sqlalchemy import Integer, BigInteger, Date
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import date
+from app.db.base import Base
+
+
+class SalesDaily(Base):
+    __tablename__ = "sales_daily"
+    
+    # Rolled up on every booked invoice (see app.services.sales_rollup); outlet_id 0 = no outlet.
+    # Money is in integer paise so repeated increments stay exact.
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    outlet_id: Mapped[int] = mapped_column(Integer, primary_key=True, default=0)
+    invoices: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    units: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    gross_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    discount_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    cost_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class ProductSalesDaily(Base):
+    __tablename__ = "product_sales_daily"
+    
+    # Same measures per product; product_id is Product.id (no FK: history outlives products)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    outlet_id: Mapped[int] = mapped_column(Integer, primary_key=True, default=0)
+    product_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    units: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    gross_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    discount_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    cost_paise: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
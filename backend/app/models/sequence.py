@@ -0,0 +1,22 @@
+from sqlalchemy import String, Integer, Date
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import date
+from app.db.base import Base
+
+
+class InvoiceSequence(Base):
+    __tablename__ = "invoice_sequences"
+    
+    # One counter per (prefix, day, outlet); outlet_id 0 is the shared counter
+    prefix: Mapped[str] = mapped_column(String(20), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    outlet_id: Mapped[int] = mapped_column(Integer, primary_key=True, default=0)
+    last_value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ProductIdSequence(Base):
+    __tablename__ = "product_id_sequences"
+    
+    # One counter per whole-rupee cost price (the 4-digit block of the SPN ID)
+    cost_bucket: Mapped[int] = mapped_column(Integer, primary_key=True)
+    last_value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,10 +1,14 @@
-from sqlalchemy import Integer, ForeignKey
+from sqlalchemy import Integer, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 
 class Stock(Base):
     __tablename__ = "stock"
+    __table_args__ = (
+        # One row per product and outlet (add_stock upserts); also the lookup index for both
+        Index("uq_stock_product_outlet", "product_id", "outlet_id", unique=True),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"))
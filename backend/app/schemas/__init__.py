@@ -1,9 +1,11 @@
 from app.schemas.outlet import OutletCreate, OutletUpdate, OutletResponse, OutletWithStock
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductWithBarcode
+from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductWithBarcode, ProductImportError, ProductImportReport
 from app.schemas.offer import OfferCreate, OfferResponse
 from app.schemas.stock import StockCreate, StockUpdate, StockResponse, LowStockResponse
-from app.schemas.invoice import InvoiceItemInput, InvoiceItemDetail, InvoicePreview, InvoiceConfirmRequest, InvoiceResponse
-from app.schemas.barcode import BarcodeResponse
+from app.schemas.invoice import InvoiceItemInput, InvoiceItemDetail, InvoicePreview, InvoiceConfirmRequest, InvoiceResponse, InvoiceDetail, InvoiceNumberReserveRequest, InvoiceNumberBlock
+from app.schemas.barcode import BarcodeResponse, LabelSheetItem, LabelSheetRequest
+from app.schemas.pos import PosSnapshot, OfflineInvoice, InvoiceSyncRequest, InvoiceSyncResponse, OfflineReceipt, PosSyncReport, PosStatus
+from app.schemas.report import DailySales, OutletSales, ProductSales
 
 __all__ = [
     # Outlet
@@ -17,6 +19,8 @@ __all__ = [
     "ProductUpdate",
     "ProductResponse",
     "ProductWithBarcode",
+    "ProductImportError",
+    "ProductImportReport",
     
     # Offer
     "OfferCreate",
@@ -34,7 +38,26 @@ __all__ = [
     "InvoicePreview",
     "InvoiceConfirmRequest",
     "InvoiceResponse",
+    "InvoiceDetail",
+    "InvoiceNumberReserveRequest",
+    "InvoiceNumberBlock",
     
     # Barcode
-    "BarcodeResponse"
+    "BarcodeResponse",
+    "LabelSheetItem",
+    "LabelSheetRequest",
+    
+    # Offline POS
+    "PosSnapshot",
+    "OfflineInvoice",
+    "InvoiceSyncRequest",
+    "InvoiceSyncResponse",
+    "OfflineReceipt",
+    "PosSyncReport",
+    "PosStatus",
+    
+    # Reports
+    "DailySales",
+    "OutletSales",
+    "ProductSales"
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Literal
 
 
 class BarcodeResponse(BaseModel):
@@ -7,4 +8,14 @@ class BarcodeResponse(BaseModel):
     id: int
     product_id: int
     barcode_value: str
-    barcode_format: str
\ No newline at end of file
+    barcode_format: str
+
+
+class LabelSheetItem(BaseModel):
+    product_id: str  # SPN Product ID
+    copies: int = Field(default=1, ge=1, le=1000)
+
+
+class LabelSheetRequest(BaseModel):
+    items: list[LabelSheetItem] = Field(..., min_length=1)
+    format: Literal["pdf", "svg"] = "pdf"
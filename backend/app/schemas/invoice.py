@@ -39,4 +39,18 @@ class InvoiceResponse(BaseModel):
     discount_amount: float
     final_amount: float
     created_at: datetime
-    items: list[InvoiceItemDetail]
\ No newline at end of file
+    items: list[InvoiceItemDetail]
+
+
+class InvoiceDetail(InvoiceResponse):
+    outlet_id: int | None = None
+    notes: str | None = None
+
+
+class InvoiceNumberReserveRequest(BaseModel):
+    outlet_id: int | None = None
+    count: int = Field(..., gt=0, le=1000)
+
+
+class InvoiceNumberBlock(BaseModel):
+    numbers: list[str]
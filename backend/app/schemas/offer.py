@@ -1,14 +1,26 @@
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 from datetime import date
-from typing import Literal
+from app.models.offer import OfferType
+
+
+class OfferTier(BaseModel):
+    min_quantity: int = Field(..., gt=0)
+    discount_percent: float = Field(..., gt=0, le=100)
 
 
 class OfferBase(BaseModel):
-    offer_type: Literal["BUY_X_GET_Y", "PERCENTAGE", "FLAT"]
+    offer_type: OfferType
+    priority: int = 0
+    stackable: bool = False
     x_quantity: int | None = None
     y_quantity: int | None = None
     discount_percent: float | None = Field(None, ge=0, le=100)
     discount_flat: float | None = Field(None, ge=0)
+    tiers: list[OfferTier] | None = None
+    bundle_product_ids: list[int] | None = None
+    bundle_quantity: int | None = Field(None, gt=1)
+    bundle_price: float | None = Field(None, ge=0)
+    min_cart_total: float | None = Field(None, ge=0)
     start_date: date
     end_date: date
     is_active: bool = True
@@ -22,11 +34,11 @@ class OfferBase(BaseModel):
 
 
 class OfferCreate(OfferBase):
-    product_id: int
+    product_id: int | None = None  # not used by CART_THRESHOLD offers
 
 
 class OfferResponse(OfferBase):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
-    product_id: int
\ No newline at end of file
+    product_id: int | None
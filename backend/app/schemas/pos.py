@@ -0,0 +1,123 @@
+from pydantic import BaseModel, Field, ConfigDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Literal
+from uuid import UUID
+from app.models.offer import OfferType
+from app.schemas.invoice import InvoiceItemDetail
+
+
+# ==================== SNAPSHOT (central -> till) ====================
+
+class PosProduct(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    product_id: str
+    name: str
+    category: str | None = None
+    cost_price: Decimal
+    mrp: Decimal
+    selling_price: Decimal
+    min_stock: int
+    barcode_value: str | None = None
+
+
+class PosOffer(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    product_id: int | None = None
+    offer_type: OfferType
+    x_quantity: int | None = None
+    y_quantity: int | None = None
+    discount_percent: Decimal | None = None
+    discount_flat: Decimal | None = None
+    start_date: date
+    end_date: date
+    is_active: bool = True
+    priority: int = 0
+    stackable: bool = False
+    tiers: list[tuple[int, Decimal]] | None = None  # (min_quantity, discount_percent)
+    bundle_product_ids: list[int] | None = None
+    bundle_quantity: int | None = None
+    bundle_price: Decimal | None = None
+    min_cart_total: Decimal | None = None
+
+
+class PosSnapshot(BaseModel):
+    """Everything an outlet till needs to price and confirm carts while offline"""
+    outlet_id: int | None = None
+    generated_at: datetime
+    products: list[PosProduct]
+    offers: list[PosOffer]  # active, ending today or later
+    stock: dict[int, int]  # Product.id -> quantity at the outlet
+
+
+# ==================== BULK SYNC (till -> central) ====================
+
+class OfflineInvoiceLine(BaseModel):
+    product_id: str  # SPN Product ID
+    quantity: int = Field(..., gt=0)
+    unit_price: Decimal
+    discount: Decimal
+    line_total: Decimal
+    offer_applied: str | None = None
+
+
+class OfflineInvoice(BaseModel):
+    uuid: UUID  # generated by the till; the idempotency key for sync
+    created_at: datetime
+    items: list[OfflineInvoiceLine] = Field(..., min_length=1)
+    subtotal: Decimal
+    total_discount: Decimal
+    final_total: Decimal
+    notes: str | None = None
+
+
+class InvoiceSyncRequest(BaseModel):
+    outlet_id: int | None = None
+    invoices: list[OfflineInvoice] = Field(..., max_length=1000)
+
+
+class InvoiceSyncResult(BaseModel):
+    uuid: UUID
+    status: Literal["created", "duplicate", "rejected"]
+    invoice_number: str | None = None
+    detail: str | None = None
+
+
+class InvoiceSyncResponse(BaseModel):
+    results: list[InvoiceSyncResult]
+
+
+# ==================== TILL (outlet mode) ====================
+
+class OfflineReceipt(BaseModel):
+    uuid: UUID
+    created_at: datetime
+    items: list[InvoiceItemDetail]
+    subtotal: float
+    total_discount: float
+    final_total: float
+    pending_sync: int  # invoices in the local queue, this one included
+
+
+class PosSyncReport(BaseModel):
+    sent: int = 0
+    created: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    pending: int = 0
+    error: str | None = None  # set when the central API could not be reached or refused a snapshot request
+
+
+class PosStatus(BaseModel):
+    central_url: str
+    outlet_id: int | None
+    snapshot_at: datetime | None
+    products: int
+    offers: int
+    pending_sync: int
+    last_sync_at: datetime | None
+    last_sync_error: str | None
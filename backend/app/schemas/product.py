@@ -32,4 +32,25 @@ class ProductResponse(ProductBase):
 
 
 class ProductWithBarcode(ProductResponse):
-    barcode_value: str | None = None
\ No newline at end of file
+    barcode_value: str | None = None
+
+
+class ProductImportError(BaseModel):
+    row: int
+    error: str
+
+
+class ProductImportReport(BaseModel):
+    total_rows: int
+    imported: int
+    failed: int
+    errors: list[ProductImportError]
+
+
+class ProductSearchResult(BaseModel):
+    id: int
+    product_id: str
+    name: str
+    category: str | None = None
+    selling_price: float
+    score: float
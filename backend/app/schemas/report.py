@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from datetime import date
+
+
+class SalesTotals(BaseModel):
+    units: int
+    gross: float
+    discount: float
+    net: float
+    cost: float
+    margin: float
+
+
+class DailySales(SalesTotals):
+    day: date
+    invoices: int
+
+
+class OutletSales(SalesTotals):
+    outlet_id: int | None = None
+    outlet_name: str | None = None
+    invoices: int
+
+
+class ProductSales(SalesTotals):
+    product_pk: int
+    product_id: str | None = None
+    product_name: str | None = None
@@ -34,6 +34,7 @@ class StockResponse(StockBase):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
+    quantity: int  # below zero after synced offline sales the central books didn't know about
 
 
 class LowStockResponse(BaseModel):
@@ -41,4 +42,8 @@ class LowStockResponse(BaseModel):
     product_name: str
     current_quantity: int
     min_stock: int
-    outlet_name: str | None = None
\ No newline at end of file
+    outlet_name: str | None = None
+    
+    # Keyset cursor: pass the last row's values as after_shortage / after_id
+    stock_id: int
+    shortage: int
\ No newline at end of file
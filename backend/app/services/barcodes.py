@@ -0,0 +1,90 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from io import BytesIO
+import barcode
+from barcode.writer import ImageWriter, SVGWriter
+from app.core.config import settings
+from app.services.catalog_cache import LRUCache
+
+BARCODE_MEDIA_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "svg": "image/svg+xml"
+}
+
+
+@dataclass(frozen=True)
+class BarcodeRender:
+    """Render parameters; together with the value they fully determine the image bytes"""
+    format: str = "png"
+    module_width: float = 0.2  # mm per narrow bar
+    dpi: int = 300
+
+    def etag(self, barcode_value: str) -> str:
+        key = f"code128|{barcode_value}|{self.format}|{self.module_width}|{self.dpi}"
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def generate_barcode_image(barcode_value: str, render: BarcodeRender = BarcodeRender(), **writer_options) -> bytes:
+    """Generate Code128 barcode image as bytes (extra python-barcode writer options may be passed)"""
+    CODE128 = barcode.get_barcode_class('code128')
+    buffer = BytesIO()
+
+    if render.format == "svg":
+        writer = SVGWriter()
+        options = {"module_width": render.module_width}
+    else:
+        writer = ImageWriter(format=render.format.upper())
+        options = {"module_width": render.module_width, "dpi": render.dpi}
+    options.update(writer_options)
+
+    code128 = CODE128(barcode_value, writer=writer)
+    code128.write(buffer, options=options)
+
+    buffer.seek(0)
+    return buffer.read()
+
+
+class BarcodeImageCache:
+    """
+    Rendered barcode images in a bounded in-memory LRU, backed by an optional
+    on-disk cache addressed by the render ETag.
+    """
+
+    def __init__(self, maxsize: int, cache_dir: str | None = None):
+        self.memory = LRUCache(maxsize)
+        self.cache_dir = cache_dir
+
+    def _disk_path(self, etag: str, render: BarcodeRender) -> str:
+        return os.path.join(self.cache_dir, etag[:2], f"{etag}.{render.format}")
+
+    def get(self, barcode_value: str, render: BarcodeRender) -> tuple[str, bytes]:
+        """(etag, image bytes), rendering on first request"""
+        etag = render.etag(barcode_value)
+
+        cached = self.memory.get_many([etag])
+        if cached:
+            return etag, cached[etag]
+
+        image = None
+        if self.cache_dir:
+            path = self._disk_path(etag, render)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    image = f.read()
+
+        if image is None:
+            image = generate_barcode_image(barcode_value, render)
+            if self.cache_dir:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(image)
+                os.replace(tmp_path, path)
+
+        self.memory.put_many({etag: image})
+        return etag, image
+
+
+barcode_images = BarcodeImageCache(settings.BARCODE_CACHE_SIZE, settings.BARCODE_CACHE_DIR)
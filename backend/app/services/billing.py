@@ -0,0 +1,99 @@
+"""
+Booking a confirmed sale: pricing, idempotency claim, invoice number, stock
+reservation, invoice rows and sales rollups, all inside the caller's
+transaction (run it through run_in_transaction / run_in_transaction_async
+so lock conflicts are retried as a unit).
+"""
+from sqlalchemy.orm import Session
+from app.core.clock import business_day
+from app.models.invoice import Invoice, InvoiceItem
+from app.schemas.invoice import InvoiceConfirmRequest
+from app.services.idempotency import claim_key
+from app.services.pricing import PricedCart, price_cart_current
+from app.services.sales_rollup import SalesDelta, apply_sales_delta
+from app.services.sequences import invoice_numbers
+from app.services.stock import (
+    InsufficientStockError,
+    adjust_outlet_summary,
+    load_stock,
+    reserve_stock,
+    stock_change_delta
+)
+
+
+def book_invoice(
+    db: Session,
+    request: InvoiceConfirmRequest,
+    idempotency_key: str | None = None,
+    fingerprint: str | None = None
+) -> tuple[Invoice, PricedCart]:
+    """
+    Price the cart from the database, write it as an invoice and take its stock.
+    Raises ProductNotFoundError for an unknown product, and InsufficientStockError
+    (after rolling back) if any line can't be covered.
+    """
+    # Current prices, offers, costs and min_stock, not another worker's stale cache
+    cart = price_cart_current(db, request.items)
+
+    # Before any write: refilling a number block commits in its own session,
+    # which would wait on a write lock this transaction already held
+    invoice_number = invoice_numbers.next_number(db, request.outlet_id)
+    claim = claim_key(db, idempotency_key, fingerprint) if idempotency_key else None
+    requested = cart.requested_quantities()
+
+    # Reserve stock up front so the write lock is held briefly
+    reserved = reserve_stock(db, request.outlet_id, requested)
+    failed = set(requested) - reserved.keys()
+    if failed:
+        db.rollback()
+        stock = load_stock(db, list(failed), request.outlet_id)
+        names = {line.product.id: line.product.name for line in cart.lines}
+        raise InsufficientStockError([
+            (names[pk], stock[pk].quantity if pk in stock else 0, requested[pk])
+            for pk in failed
+        ])
+
+    # Keep the outlet summary in step with the decrement
+    min_stock = {line.product.id: line.product.min_stock for line in cart.lines}
+    adjust_outlet_summary(
+        db,
+        request.outlet_id,
+        quantity=-sum(requested.values()),
+        low=sum(
+            stock_change_delta(quantity + requested[pk], quantity, min_stock[pk])[2]
+            for pk, quantity in reserved.items()
+        )
+    )
+
+    # Create invoice
+    db_invoice = Invoice(
+        invoice_number=invoice_number,
+        total_amount=cart.subtotal,
+        discount_amount=cart.total_discount,
+        final_amount=cart.final_total,
+        outlet_id=request.outlet_id,
+        notes=request.notes
+    )
+    db.add(db_invoice)
+    db.flush()  # Get invoice.id
+
+    # Create invoice items
+    db.add_all([
+        InvoiceItem(
+            invoice_id=db_invoice.id,
+            product_id=line.product.id,
+            quantity=line.quantity,
+            unit_price=line.unit_price,
+            discount=line.discount,
+            line_total=line.line_total,
+            offer_applied=line.offer_applied
+        )
+        for line in cart.lines
+    ])
+
+    delta = SalesDelta()
+    delta.add_cart(business_day(db_invoice.created_at), request.outlet_id, cart)
+    apply_sales_delta(db, delta)
+    if claim:
+        claim.invoice_id = db_invoice.id
+    return db_invoice, cart
@@ -0,0 +1,192 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime
+from threading import Lock
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.clock import business_day
+from app.core.config import settings
+from app.models.product import Product
+from app.models.barcode import Barcode
+from app.models.offer import Offer, OfferType
+from app.services.money import to_paise
+
+
+@dataclass(frozen=True, slots=True)
+class ProductSnapshot:
+    """Read-only copy of a Product row that is safe to share across sessions"""
+    id: int
+    product_id: str
+    name: str
+    category: str | None
+    cost_price: float
+    mrp: float
+    selling_price: float
+    min_stock: int
+    created_at: datetime
+    barcode_value: str | None = None
+    price_paise: int = field(init=False)  # selling_price, precomputed for the pricing engine
+
+    def __post_init__(self):
+        object.__setattr__(self, "price_paise", to_paise(self.selling_price))
+
+    @classmethod
+    def from_model(cls, product: Product, barcode_value: str | None = None) -> "ProductSnapshot":
+        return cls(
+            id=product.id,
+            product_id=product.product_id,
+            name=product.name,
+            category=product.category,
+            cost_price=product.cost_price,
+            mrp=product.mrp,
+            selling_price=product.selling_price,
+            min_stock=product.min_stock,
+            created_at=product.created_at,
+            barcode_value=barcode_value
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class OfferSnapshot:
+    """Read-only copy of an Offer row that is safe to share across sessions"""
+    id: int
+    product_id: int | None
+    offer_type: OfferType
+    x_quantity: int | None
+    y_quantity: int | None
+    discount_percent: float | None
+    discount_flat: float | None
+    start_date: date
+    end_date: date
+    is_active: bool
+    priority: int = 0
+    stackable: bool = False
+    tiers: tuple[tuple[int, float], ...] | None = None  # (min_quantity, discount_percent)
+    bundle_product_ids: tuple[int, ...] | None = None
+    bundle_quantity: int | None = None
+    bundle_price: float | None = None
+    min_cart_total: float | None = None
+
+    @classmethod
+    def from_model(cls, offer: Offer) -> "OfferSnapshot":
+        values = {f.name: getattr(offer, f.name) for f in fields(cls)}
+        if offer.tiers is not None:
+            values["tiers"] = tuple((tier["min_quantity"], tier["discount_percent"]) for tier in offer.tiers)
+        if offer.bundle_product_ids is not None:
+            values["bundle_product_ids"] = tuple(offer.bundle_product_ids)
+        values["priority"] = offer.priority or 0
+        values["stackable"] = bool(offer.stackable)
+        return cls(**values)
+
+
+class LRUCache:
+    """Thread-safe LRU mapping whose entries all expire when the calendar day changes"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self._day = business_day()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _roll_day(self):
+        today = business_day()
+        if today != self._day:
+            self._data.clear()
+            self._day = today
+
+    def get_many(self, keys) -> dict:
+        """Return the cached entries among keys (missing keys are simply absent)"""
+        found = {}
+        with self._lock:
+            self._roll_day()
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def put_many(self, entries: dict):
+        with self._lock:
+            self._roll_day()
+            for key, value in entries.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+def load_products(db: Session, product_ids) -> dict[str, ProductSnapshot]:
+    """Products by SPN Product ID straight from the database, in one IN (...) query"""
+    rows = db.execute(
+        select(Product, Barcode.barcode_value)
+        .outerjoin(Barcode, Barcode.product_id == Product.id)
+        .where(Product.product_id.in_(set(product_ids)))
+    )
+    return {
+        product.product_id: ProductSnapshot.from_model(product, barcode_value)
+        for product, barcode_value in rows
+    }
+
+
+class CatalogCache:
+    """
+    Process-local cache of products (by SPN Product ID).
+    Misses are resolved with a single IN (...) query per call.
+    Active offers live in the compiled offer book (app.services.offers).
+    """
+
+    def __init__(self, maxsize: int):
+        self.products = LRUCache(maxsize)
+
+    def get_products(self, db: Session, product_ids: list[str]) -> dict[str, ProductSnapshot]:
+        """Products by SPN Product ID; unknown IDs are absent from the result"""
+        found = self.products.get_many(set(product_ids))
+        missing = set(product_ids) - found.keys()
+
+        if missing:
+            loaded = load_products(db, missing)
+            self.products.put_many(loaded)
+            found.update(loaded)
+
+        return found
+
+    def get_product(self, db: Session, product_id: str) -> ProductSnapshot | None:
+        return self.get_products(db, [product_id]).get(product_id)
+
+    def invalidate_product(self, product_id: str):
+        self.products.discard(product_id)
+
+    def clear(self):
+        self.products.clear()
+
+    def stats(self) -> dict:
+        return {
+            "products": self.products.stats()
+        }
+
+
+catalog_cache = CatalogCache(settings.CATALOG_CACHE_SIZE)
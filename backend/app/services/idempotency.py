@@ -0,0 +1,92 @@
+"""
+Idempotency-Key support for POST /billing/confirm.
+
+The key is claimed inside the confirm transaction, so it is stored only if
+the invoice is. The row holds just the key, a hash of the request body and
+the invoice id; a replay rebuilds the original InvoiceResponse from the
+invoice rows without pricing the cart or touching stock again. Keys expire
+after IDEMPOTENCY_KEY_TTL_HOURS and are purged by a background job.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.idempotency import IdempotencyKey
+from app.models.invoice import Invoice
+from app.schemas.invoice import InvoiceConfirmRequest, InvoiceResponse
+from app.services.invoice_history import get_invoice
+
+
+class IdempotencyKeyReusedError(ValueError):
+    """Raised when a key is sent again with a different request body"""
+
+    def __init__(self, key: str):
+        self.key = key
+        super().__init__(f"Idempotency-Key {key!r} was already used for a different request")
+
+
+def request_fingerprint(request: InvoiceConfirmRequest) -> str:
+    return hashlib.sha256(request.model_dump_json().encode()).hexdigest()
+
+
+def _cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def invoice_response(db: Session, invoice_id: int) -> InvoiceResponse:
+    """Rebuild the confirm response of a stored invoice (two queries)"""
+    return get_invoice(db, Invoice.id == invoice_id)
+
+
+def find_replay(db: Session, key: str, fingerprint: str) -> InvoiceResponse | None:
+    """
+    The original response for a key seen within the TTL, else None.
+    Raises IdempotencyKeyReusedError if the key came with a different body.
+    """
+    stored = db.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.invoice_id).where(
+            IdempotencyKey.key == key,
+            IdempotencyKey.created_at >= _cutoff()
+        )
+    ).first()
+    if stored is None or stored.invoice_id is None:
+        return None
+    if stored.request_hash != fingerprint:
+        raise IdempotencyKeyReusedError(key)
+    return invoice_response(db, stored.invoice_id)
+
+
+def claim_key(db: Session, key: str, fingerprint: str) -> IdempotencyKey:
+    """
+    Claim a key in the caller's transaction (set invoice_id before commit).
+    A concurrent request holding the same key makes the flush or commit fail
+    with IntegrityError; the caller then replays the winner's result.
+    """
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.created_at < _cutoff()))
+    claim = IdempotencyKey(key=key, request_hash=fingerprint)
+    db.add(claim)
+    db.flush()
+    return claim
+
+
+def purge_expired_keys(db: Session) -> int:
+    purged = db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < _cutoff())).rowcount
+    db.commit()
+    return purged
+
+
+def _purge_once(session_factory) -> int:
+    with session_factory() as db:
+        return purge_expired_keys(db)
+
+
+async def run_key_purge_job(session_factory, interval_minutes: float):
+    """Background loop: evict expired idempotency keys every interval_minutes"""
+    while True:
+        try:
+            await asyncio.to_thread(_purge_once, session_factory)
+        except Exception as e:
+            print(f"⚠️  Idempotency key purge failed: {e}")
+        await asyncio.sleep(interval_minutes * 60)
@@ -0,0 +1,92 @@
+"""
+Invoice history: newest-first listing with keyset pagination on
+(created_at, id) and single-invoice lookup. Items and their products are
+batch-loaded (selectinload + joined product), so a page costs a fixed
+number of queries however many invoices and lines it holds.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import Select, and_, or_, select
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
+from app.core.clock import business_day_start
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.product import Product
+from app.schemas.invoice import InvoiceDetail, InvoiceItemDetail
+
+WITH_ITEMS = selectinload(Invoice.items).options(
+    joinedload(InvoiceItem.product).options(load_only(Product.product_id, Product.name))
+)
+
+
+def format_cursor(invoice: Invoice) -> str:
+    return f"{invoice.created_at.isoformat()},{invoice.id}"
+
+
+def parse_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError for a malformed cursor"""
+    created_at, _, invoice_id = cursor.rpartition(",")
+    return datetime.fromisoformat(created_at), int(invoice_id)
+
+
+def invoice_page_query(
+    outlet_id: int | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    cursor: tuple[datetime, int] | None = None,
+    limit: int | None = None
+) -> Select:
+    """
+    Invoices newest first, with items. Keyset pagination continues after the
+    (created_at, id) cursor of the previous page's last invoice.
+    """
+    query = select(Invoice).options(WITH_ITEMS).order_by(Invoice.created_at.desc(), Invoice.id.desc())
+
+    if outlet_id is not None:
+        query = query.where(Invoice.outlet_id == outlet_id)
+    if start:
+        query = query.where(Invoice.created_at >= business_day_start(start))
+    if end:
+        query = query.where(Invoice.created_at < business_day_start(end + timedelta(days=1)))
+
+    if cursor:
+        after_created_at, after_id = cursor
+        query = query.where(or_(
+            Invoice.created_at < after_created_at,
+            and_(Invoice.created_at == after_created_at, Invoice.id < after_id)
+        ))
+
+    if limit:
+        query = query.limit(limit)
+
+    return query
+
+
+def to_invoice_detail(invoice: Invoice) -> InvoiceDetail:
+    """Response for an invoice loaded with WITH_ITEMS (no further queries)"""
+    return InvoiceDetail(
+        id=invoice.id,
+        invoice_number=invoice.invoice_number,
+        total_amount=float(invoice.total_amount),
+        discount_amount=float(invoice.discount_amount),
+        final_amount=float(invoice.final_amount),
+        created_at=invoice.created_at,
+        outlet_id=invoice.outlet_id,
+        notes=invoice.notes,
+        items=[
+            InvoiceItemDetail(
+                product_id=item.product.product_id,
+                product_name=item.product.name,
+                quantity=item.quantity,
+                unit_price=float(item.unit_price),
+                discount=float(item.discount),
+                line_total=float(item.line_total),
+                offer_applied=item.offer_applied
+            )
+            for item in sorted(invoice.items, key=lambda item: item.id)
+        ]
+    )
+
+
+def get_invoice(db: Session, where) -> InvoiceDetail | None:
+    """One invoice with its items (two queries), or None"""
+    invoice = db.scalars(select(Invoice).options(WITH_ITEMS).where(where)).first()
+    return to_invoice_detail(invoice) if invoice else None
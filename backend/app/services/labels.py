@@ -0,0 +1,251 @@
+"""
+Printable barcode label sheets (A4, 3 x 8 labels of 70 x 37 mm).
+
+Label artwork is rendered in a process pool and the document is streamed
+page by page, so memory stays flat regardless of how many labels are printed.
+"""
+import multiprocessing
+import os
+import re
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from threading import Lock
+from typing import Callable, Iterable, Iterator
+from xml.sax.saxutils import escape
+from PIL import Image, ImageDraw, ImageFont
+from app.core.config import settings
+from app.services.barcodes import BarcodeRender, generate_barcode_image
+
+PAGE_WIDTH_MM = 210.0
+PAGE_HEIGHT_MM = 297.0
+COLUMNS = 3
+ROWS = 8
+LABELS_PER_PAGE = COLUMNS * ROWS
+LABEL_WIDTH_MM = PAGE_WIDTH_MM / COLUMNS
+LABEL_HEIGHT_MM = PAGE_HEIGHT_MM / ROWS
+
+PDF_DPI = 300
+PT_PER_MM = 72 / 25.4
+SVG_PX_PER_MM = 96 / 25.4
+
+LABEL_BARCODE = BarcodeRender(format="png", module_width=0.3, dpi=PDF_DPI)
+LABEL_BARCODE_OPTIONS = {"module_height": 13.0, "font_size": 8, "text_distance": 3.0, "quiet_zone": 2.0}
+
+
+@dataclass(frozen=True)
+class LabelData:
+    product_id: str
+    barcode_value: str
+    name: str
+    mrp: float
+    selling_price: float
+
+    @property
+    def price_line(self) -> str:
+        return f"MRP: {float(self.mrp):.2f}  Price: {float(self.selling_price):.2f}"
+
+
+def _mm2px(mm: float) -> int:
+    return int(round(mm * PDF_DPI / 25.4))
+
+
+# ==================== WORKER FUNCTIONS (run in the process pool) ====================
+
+@lru_cache(maxsize=256)
+def _font(size_px: int) -> ImageFont.FreeTypeFont:
+    try:
+        import barcode
+        return ImageFont.truetype(os.path.join(os.path.dirname(barcode.__file__), "fonts", "DejaVuSansMono.ttf"), size_px)
+    except OSError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=512)
+def _barcode_bitmap(barcode_value: str) -> Image.Image:
+    image = generate_barcode_image(barcode_value, LABEL_BARCODE, **LABEL_BARCODE_OPTIONS)
+    return Image.open(BytesIO(image)).convert("L")
+
+
+def _fit_text(draw: ImageDraw.ImageDraw, text: str, font, max_width: int) -> str:
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _draw_label(page: Image.Image, label: LabelData, left: int, top: int):
+    draw = ImageDraw.Draw(page)
+    width, height = _mm2px(LABEL_WIDTH_MM), _mm2px(LABEL_HEIGHT_MM)
+    padding = _mm2px(2)
+    centre = left + width // 2
+
+    name_font = _font(_mm2px(3.2))
+    small_font = _font(_mm2px(2.4))
+
+    name = _fit_text(draw, label.name, name_font, width - 2 * padding)
+    draw.text((centre, top + padding), name, font=name_font, fill=0, anchor="mt")
+
+    bars = _barcode_bitmap(label.barcode_value)
+    box_width, box_height = width - 2 * padding, height - _mm2px(12)
+    if bars.width > box_width or bars.height > box_height:
+        scale = min(box_width / bars.width, box_height / bars.height)
+        bars = bars.resize((int(bars.width * scale), int(bars.height * scale)), Image.NEAREST)
+    page.paste(bars, (centre - bars.width // 2, top + _mm2px(5.5)))
+
+    draw.text((centre, top + height - _mm2px(6.5)), label.price_line, font=small_font, fill=0, anchor="mt")
+    draw.text((centre, top + height - padding), "SPN Novelty", font=small_font, fill=0, anchor="mb")
+
+
+def render_pdf_page(labels: list[LabelData]) -> tuple[int, int, bytes]:
+    """Rasterise one sheet as a 1-bit image; returns (width, height, Flate-compressed bits)"""
+    page = Image.new("L", (_mm2px(PAGE_WIDTH_MM), _mm2px(PAGE_HEIGHT_MM)), 255)
+    for index, label in enumerate(labels):
+        row, column = divmod(index, COLUMNS)
+        _draw_label(page, label, _mm2px(column * LABEL_WIDTH_MM), _mm2px(row * LABEL_HEIGHT_MM))
+
+    bits = page.point(lambda value: 255 if value > 127 else 0, mode="1")
+    return bits.width, bits.height, zlib.compress(bits.tobytes(), 6)
+
+
+def render_svg_label(label: LabelData) -> str:
+    """SVG fragment for one label, positioned at the origin (user units are CSS px)"""
+    barcode_svg = generate_barcode_image(
+        label.barcode_value,
+        BarcodeRender(format="svg", module_width=LABEL_BARCODE.module_width),
+        **LABEL_BARCODE_OPTIONS
+    ).decode()
+    barcode_svg = barcode_svg[barcode_svg.index("<svg"):]
+    barcode_width = float(re.search(r'width="([\d.]+)mm"', barcode_svg).group(1)) * SVG_PX_PER_MM
+
+    width, height = LABEL_WIDTH_MM * SVG_PX_PER_MM, LABEL_HEIGHT_MM * SVG_PX_PER_MM
+    centre = width / 2
+    return (
+        f'<text x="{centre:.1f}" y="{4.5 * SVG_PX_PER_MM:.1f}" font-size="{3.2 * SVG_PX_PER_MM:.1f}" '
+        f'text-anchor="middle" font-family="monospace">{escape(label.name[:28])}</text>'
+        f'<g transform="translate({centre - barcode_width / 2:.1f},{5.5 * SVG_PX_PER_MM:.1f})">{barcode_svg}</g>'
+        f'<text x="{centre:.1f}" y="{height - 4.5 * SVG_PX_PER_MM:.1f}" font-size="{2.4 * SVG_PX_PER_MM:.1f}" '
+        f'text-anchor="middle" font-family="monospace">{escape(label.price_line)}</text>'
+        f'<text x="{centre:.1f}" y="{height - 2 * SVG_PX_PER_MM:.1f}" font-size="{2.4 * SVG_PX_PER_MM:.1f}" '
+        f'text-anchor="middle" font-family="monospace">SPN Novelty</text>'
+    )
+
+
+# ==================== PROCESS POOL ====================
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = Lock()
+_workers = settings.LABEL_RENDER_WORKERS or os.cpu_count() or 1
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _pool_map(fn: Callable, args: Iterable) -> Iterator:
+    """Ordered map over the pool with a bounded number of tasks in flight"""
+    pool = get_pool()
+    window = 2 * _workers
+    pending = deque()
+    for arg in args:
+        pending.append(pool.submit(fn, arg))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# ==================== DOCUMENT STREAMS ====================
+
+def _pages(labels: list[LabelData]) -> Iterator[list[LabelData]]:
+    for start in range(0, len(labels), LABELS_PER_PAGE):
+        yield labels[start:start + LABELS_PER_PAGE]
+
+
+def stream_pdf(labels: list[LabelData]) -> Iterator[bytes]:
+    """Minimal PDF writer: one full-page image per sheet, written as pages finish rendering"""
+    offsets: dict[int, int] = {}
+    position = 0
+    page_ids: list[int] = []
+    next_id = 3  # 1 = catalog, 2 = page tree (written last)
+
+    def chunk(data: bytes, obj_id: int | None = None) -> bytes:
+        nonlocal position
+        if obj_id is not None:
+            offsets[obj_id] = position
+        position += len(data)
+        return data
+
+    yield chunk(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    yield chunk(b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n", 1)
+
+    width_pt, height_pt = PAGE_WIDTH_MM * PT_PER_MM, PAGE_HEIGHT_MM * PT_PER_MM
+    for width, height, bits in _pool_map(render_pdf_page, _pages(labels)):
+        image_id, content_id, page_id = next_id, next_id + 1, next_id + 2
+        next_id += 3
+
+        yield chunk(
+            f"{image_id} 0 obj\n<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 1 /Filter /FlateDecode /Length {len(bits)} >>\nstream\n".encode()
+            + bits + b"\nendstream\nendobj\n",
+            image_id
+        )
+        content = f"q {width_pt:.2f} 0 0 {height_pt:.2f} 0 0 cm /Im0 Do Q".encode()
+        yield chunk(
+            f"{content_id} 0 obj\n<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream\nendobj\n",
+            content_id
+        )
+        yield chunk(
+            f"{page_id} 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width_pt:.2f} {height_pt:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>\nendobj\n".encode(),
+            page_id
+        )
+        page_ids.append(page_id)
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    yield chunk(f"2 0 obj\n<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>\nendobj\n".encode(), 2)
+
+    xref_position = position
+    xref = [f"xref\n0 {next_id}\n", "0000000000 65535 f \n"]
+    xref.extend(f"{offsets[obj_id]:010d} 00000 n \n" for obj_id in range(1, next_id))
+    xref.append(f"trailer\n<< /Size {next_id} /Root 1 0 R >>\nstartxref\n{xref_position}\n%%EOF\n")
+    yield "".join(xref).encode()
+
+
+def stream_svg(labels: list[LabelData]) -> Iterator[bytes]:
+    """One tall SVG with the sheets stacked vertically; each distinct product is rendered once"""
+    unique = list(dict.fromkeys(labels))
+    fragments = dict(zip(unique, _pool_map(render_svg_label, unique)))
+
+    pages = max(1, -(-len(labels) // LABELS_PER_PAGE))
+    width, height = PAGE_WIDTH_MM * SVG_PX_PER_MM, PAGE_HEIGHT_MM * SVG_PX_PER_MM * pages
+    yield (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{PAGE_WIDTH_MM}mm" height="{PAGE_HEIGHT_MM * pages}mm" '
+        f'viewBox="0 0 {width:.2f} {height:.2f}">\n'
+    ).encode()
+
+    for index, label in enumerate(labels):
+        page, slot = divmod(index, LABELS_PER_PAGE)
+        row, column = divmod(slot, COLUMNS)
+        x = column * LABEL_WIDTH_MM * SVG_PX_PER_MM
+        y = (page * PAGE_HEIGHT_MM + row * LABEL_HEIGHT_MM) * SVG_PX_PER_MM
+        yield f'<g transform="translate({x:.2f},{y:.2f})">{fragments[label]}</g>\n'.encode()
+
+    yield b"</svg>\n"
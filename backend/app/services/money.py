@@ -0,0 +1,46 @@
+"""
+Money is carried as integer paise inside the pricing engine and converted to
+2-place Decimals at the edges (snapshots in, invoice rows and responses out).
+Percentages are integer basis points. All rounding is ROUND_HALF_UP.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+_ONE = Decimal(1)
+
+
+def to_paise(amount) -> int:
+    """Rupees (Decimal, str, int or float) to integer paise"""
+    return int((Decimal(str(amount)) * 100).quantize(_ONE, rounding=ROUND_HALF_UP))
+
+
+def to_rupees(paise: int) -> Decimal:
+    """Integer paise to a 2-place Decimal (1250 -> Decimal('12.50'))"""
+    return Decimal(paise).scaleb(-2)
+
+
+def to_basis_points(percent) -> int:
+    """Percentage to basis points (12.5 -> 1250)"""
+    return int((Decimal(str(percent)) * 100).quantize(_ONE, rounding=ROUND_HALF_UP))
+
+
+def apply_rate(paise: int, basis_points: int) -> int:
+    """paise x rate, rounded half up to the paisa (non-negative amounts)"""
+    return (paise * basis_points + 5000) // 10000
+
+
+def allocate(total: int, weights: list[int]) -> list[int]:
+    """
+    Split `total` paise in proportion to `weights` so the shares add up
+    exactly (largest remainder method)
+    """
+    weight_sum = sum(weights)
+    if not weight_sum:
+        return [0] * len(weights)
+
+    shares = [total * weight // weight_sum for weight in weights]
+    leftover = total - sum(shares)
+    if leftover:
+        by_remainder = sorted(range(len(weights)), key=lambda i: -(total * weights[i] % weight_sum))
+        for i in by_remainder[:leftover]:
+            shares[i] += 1
+    return shares
@@ -0,0 +1,85 @@
+"""
+Moves expired offers from `offers` into `offer_history` so the hot table
+(and the offer calendar loaded from it) only holds current and future offers.
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+from sqlalchemy import DateTime, delete, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.clock import business_day
+from app.core.config import settings
+from app.models.offer import Offer, OfferHistory
+from app.services.offers import offer_book
+
+ARCHIVED_COLUMNS = [
+    column.name for column in OfferHistory.__table__.columns if column.name != "archived_at"
+]
+
+
+def archive_expired_offers(
+    db: Session, ended_before: date | None = None, batch_size: int = 1000, retries: int = 3
+) -> int:
+    """
+    Copy offers that ended before `ended_before` into offer_history and delete
+    them, one short transaction per batch. Returns the number archived.
+    A batch that still conflicts with offer_history after `retries` attempts
+    raises IntegrityError.
+    """
+    if ended_before is None:
+        ended_before = business_day() - timedelta(days=settings.OFFER_ARCHIVE_AFTER_DAYS)
+
+    archived = 0
+    conflicts = 0
+    while True:
+        ids = list(db.scalars(
+            select(Offer.id)
+            .where(Offer.end_date < ended_before)
+            .order_by(Offer.id)
+            .limit(batch_size)
+        ))
+        if not ids:
+            break
+
+        try:
+            db.execute(
+                insert(OfferHistory).from_select(
+                    ARCHIVED_COLUMNS + ["archived_at"],
+                    select(*(getattr(Offer, name) for name in ARCHIVED_COLUMNS), literal(datetime.utcnow(), DateTime))
+                    .where(Offer.id.in_(ids))
+                )
+            )
+            db.execute(delete(Offer).where(Offer.id.in_(ids)))
+            db.commit()
+        except IntegrityError:
+            # Another worker archived this batch first (the next select skips
+            # it); the same conflict over and over is an id already in history
+            db.rollback()
+            conflicts += 1
+            if conflicts > retries:
+                raise
+            continue
+
+        archived += len(ids)
+        conflicts = 0
+
+    if archived:
+        offer_book.invalidate()
+    return archived
+
+
+def _archive_once(session_factory) -> int:
+    with session_factory() as db:
+        return archive_expired_offers(db)
+
+
+async def run_archive_job(session_factory, interval_hours: float):
+    """Background loop: archive expired offers now and then every interval_hours"""
+    while True:
+        try:
+            archived = await asyncio.to_thread(_archive_once, session_factory)
+            if archived:
+                print(f"🗄️  Archived {archived} expired offers")
+        except Exception as e:
+            print(f"⚠️  Offer archive job failed: {e}")
+        await asyncio.sleep(interval_hours * 3600)
@@ -0,0 +1,519 @@
+"""
+Offer rule engine.
+
+Every active Offer is compiled once into a rule object (see RULE_TYPES) and
+indexed by product in an OfferBook, so pricing a line is a dict lookup plus a
+few integer operations: all amounts are in paise (see app.services.money).
+Selection rules:
+
+- Line offers (BUY_X_GET_Y, PERCENTAGE, FLAT, TIERED): the best non-stackable
+  offer wins (ties go to the higher priority); stackable offers then apply in
+  priority order to whatever amount is left on the line.
+- Bundles (mix-and-match across products) take whole units, most expensive
+  first, and are only used when they beat the line offers they displace.
+- Cart offers (CART_THRESHOLD) apply to the total after line discounts and are
+  spread over the lines in proportion to their totals.
+"""
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date
+from threading import Lock
+from typing import Callable
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from app.core.clock import business_day
+from app.models.offer import Offer, OfferType
+from app.services.catalog_cache import OfferSnapshot, ProductSnapshot
+from app.services.money import allocate, apply_rate, to_basis_points, to_paise
+
+
+class OfferRule:
+    """A compiled offer; subclasses precompute everything they need from the snapshot"""
+
+    def __init__(self, offer: OfferSnapshot):
+        self.offer_id = offer.id
+        self.product_id = offer.product_id
+        self.priority = offer.priority
+        self.stackable = offer.stackable
+
+    @property
+    def rank(self) -> tuple[int, int]:
+        """Application order: higher priority first, then older offers"""
+        return (-self.priority, self.offer_id)
+
+
+class LineRule(OfferRule):
+    """Discount on a single product line"""
+
+    description: str = ""
+
+    def discount(self, quantity: int, unit_price: int, amount: int) -> int:
+        """Discount on `quantity` units at unit_price, given `amount` still payable on the line (paise)"""
+        raise NotImplementedError
+
+    def describe(self, quantity: int) -> str:
+        return self.description
+
+
+RULE_TYPES: dict[OfferType, Callable[[OfferSnapshot], OfferRule]] = {}
+
+
+def register_rule(offer_type: OfferType):
+    """Class decorator: compile offers of this type with the decorated class"""
+    def decorator(cls):
+        RULE_TYPES[offer_type] = cls
+        return cls
+    return decorator
+
+
+def compile_offer(offer: OfferSnapshot) -> OfferRule:
+    return RULE_TYPES[OfferType(offer.offer_type)](offer)
+
+
+@register_rule(OfferType.BUY_X_GET_Y)
+class BuyXGetYRule(LineRule):
+    # B1G1: every 2 items, charge for 1. B2G1: every 3 items, charge for 2
+
+    def __init__(self, offer: OfferSnapshot):
+        super().__init__(offer)
+        self.group = offer.x_quantity + offer.y_quantity
+        self.free = offer.y_quantity
+        self.description = f"Buy {offer.x_quantity} Get {offer.y_quantity} Free"
+
+    def discount(self, quantity: int, unit_price: int, amount: int) -> int:
+        return min(amount, (quantity // self.group) * self.free * unit_price)
+
+
+@register_rule(OfferType.PERCENTAGE)
+class PercentageRule(LineRule):
+
+    def __init__(self, offer: OfferSnapshot):
+        super().__init__(offer)
+        self.basis_points = to_basis_points(offer.discount_percent)
+        self.description = f"{offer.discount_percent}% Off"
+
+    def discount(self, quantity: int, unit_price: int, amount: int) -> int:
+        return apply_rate(amount, self.basis_points)
+
+
+@register_rule(OfferType.FLAT)
+class FlatRule(LineRule):
+
+    def __init__(self, offer: OfferSnapshot):
+        super().__init__(offer)
+        self.per_unit = to_paise(offer.discount_flat)
+        self.description = f"₹{offer.discount_flat} Off per item"
+
+    def discount(self, quantity: int, unit_price: int, amount: int) -> int:
+        # Can't discount more than the price
+        return min(amount, min(self.per_unit, unit_price) * quantity)
+
+
+@register_rule(OfferType.TIERED)
+class TieredRule(LineRule):
+    """Percentage off that grows with the quantity bought (highest tier reached applies)"""
+
+    def __init__(self, offer: OfferSnapshot):
+        super().__init__(offer)
+        # Highest threshold first
+        self.tiers = sorted(
+            ((int(min_quantity), to_basis_points(percent)) for min_quantity, percent in offer.tiers),
+            reverse=True
+        )
+
+    def _tier(self, quantity: int) -> tuple[int, int] | None:
+        for tier in self.tiers:
+            if quantity >= tier[0]:
+                return tier
+        return None
+
+    def discount(self, quantity: int, unit_price: int, amount: int) -> int:
+        tier = self._tier(quantity)
+        return apply_rate(amount, tier[1]) if tier else 0
+
+    def describe(self, quantity: int) -> str:
+        min_quantity, basis_points = self._tier(quantity)
+        return f"{basis_points / 100:g}% Off on {min_quantity}+"
+
+
+@register_rule(OfferType.BUNDLE)
+class BundleRule(OfferRule):
+    """Any `size` units from a set of products for a fixed price (mix and match)"""
+
+    def __init__(self, offer: OfferSnapshot):
+        super().__init__(offer)
+        products = set(offer.bundle_product_ids or ())
+        if offer.product_id is not None:
+            products.add(offer.product_id)
+        self.products = frozenset(products)
+        self.size = offer.bundle_quantity
+        self.price = to_paise(offer.bundle_price)
+        self.description = f"Any {self.size} for ₹{offer.bundle_price}"
+
+
+@register_rule(OfferType.CART_THRESHOLD)
+class CartThresholdRule(OfferRule):
+    """Discount on the whole cart once its total (after line offers) reaches a threshold"""
+
+    def __init__(self, offer: OfferSnapshot):
+        super().__init__(offer)
+        self.min_total = to_paise(offer.min_cart_total or 0)
+        self.basis_points = to_basis_points(offer.discount_percent) if offer.discount_percent else 0
+        self.flat = to_paise(offer.discount_flat) if offer.discount_flat else 0
+        off = f"{offer.discount_percent}%" if offer.discount_percent else f"₹{offer.discount_flat}"
+        self.description = f"{off} Off on bills over ₹{offer.min_cart_total}"
+
+    def discount(self, total: int) -> int:
+        if total < self.min_total:
+            return 0
+        return min(total, apply_rate(total, self.basis_points) + self.flat)
+
+
+# ==================== EVALUATION ====================
+
+@dataclass
+class LineOutcome:
+    discount: int = 0  # paise
+    offers: list[str] = field(default_factory=list)
+
+    @property
+    def description(self) -> str | None:
+        return " + ".join(self.offers) if self.offers else None
+
+
+@dataclass
+class _Line:
+    pk: int
+    quantity: int
+    unit_price: int  # paise
+    exclusive: tuple[LineRule, ...]
+    stackable: tuple[LineRule, ...]
+    bundled: int = 0  # units consumed by bundles
+    outcome: LineOutcome = field(default_factory=LineOutcome)
+
+
+def _best_exclusive(rules: tuple[LineRule, ...], quantity: int, unit_price: int) -> tuple[int, LineRule | None]:
+    best, best_rule = 0, None
+    amount = quantity * unit_price
+    for rule in rules:  # already in rank order, so ties keep the higher priority
+        discount = rule.discount(quantity, unit_price, amount)
+        if discount > best:
+            best, best_rule = discount, rule
+    return best, best_rule
+
+
+class OfferBook:
+    """Compiled offers active on one day, indexed for cart evaluation"""
+
+    def __init__(self, day: date, rules: list[OfferRule]):
+        self.day = day
+        self.size = len(rules)
+        self.exclusive: dict[int, tuple[LineRule, ...]] = {}
+        self.stackable: dict[int, tuple[LineRule, ...]] = {}
+        self.bundles: dict[int, tuple[BundleRule, ...]] = {}
+        self.cart_rules: tuple[CartThresholdRule, ...] = ()
+
+        exclusive: dict[int, list] = {}
+        stackable: dict[int, list] = {}
+        bundles: dict[int, list] = {}
+        cart_rules = []
+        for rule in sorted(rules, key=lambda r: r.rank):
+            if isinstance(rule, LineRule):
+                (stackable if rule.stackable else exclusive).setdefault(rule.product_id, []).append(rule)
+            elif isinstance(rule, BundleRule):
+                for pk in rule.products:
+                    bundles.setdefault(pk, []).append(rule)
+            elif isinstance(rule, CartThresholdRule):
+                cart_rules.append(rule)
+
+        self.exclusive = {pk: tuple(r) for pk, r in exclusive.items()}
+        self.stackable = {pk: tuple(r) for pk, r in stackable.items()}
+        self.bundles = {pk: tuple(r) for pk, r in bundles.items()}
+        self.cart_rules = tuple(cart_rules)
+
+    def has_offers(self, product_pk: int) -> bool:
+        return product_pk in self.exclusive or product_pk in self.stackable or product_pk in self.bundles
+
+    def evaluate(self, lines: list[tuple[ProductSnapshot, int]]) -> list[LineOutcome]:
+        """Discount and applied offer descriptions for each (product, quantity) line"""
+        state = [
+            _Line(
+                pk=product.id,
+                quantity=quantity,
+                unit_price=product.price_paise,
+                exclusive=self.exclusive.get(product.id, ()),
+                stackable=self.stackable.get(product.id, ())
+            )
+            for product, quantity in lines
+        ]
+
+        if self.bundles:
+            self._apply_bundles(state)
+
+        for line in state:
+            self._apply_line_rules(line)
+
+        if self.cart_rules:
+            self._apply_cart_rules(state)
+
+        return [line.outcome for line in state]
+
+    def _apply_bundles(self, state: list[_Line]):
+        candidates: dict[int, BundleRule] = {}
+        lines_by_pk: dict[int, list[_Line]] = {}
+        for line in state:
+            lines_by_pk.setdefault(line.pk, []).append(line)
+            for rule in self.bundles.get(line.pk, ()):
+                candidates[rule.offer_id] = rule
+
+        for rule in sorted(candidates.values(), key=lambda r: r.rank):
+            members = sorted(
+                (
+                    line
+                    for pk in rule.products & lines_by_pk.keys()
+                    for line in lines_by_pk[pk]
+                    if line.quantity > line.bundled
+                ),
+                key=lambda line: -line.unit_price
+            )
+            free_units = sum(line.quantity - line.bundled for line in members)
+            bundles = free_units // rule.size
+            if not bundles:
+                continue
+
+            # Fill the bundles with the most expensive units
+            taken: list[tuple[_Line, int]] = []
+            remaining = bundles * rule.size
+            for line in members:
+                units = min(remaining, line.quantity - line.bundled)
+                taken.append((line, units))
+                remaining -= units
+                if not remaining:
+                    break
+
+            value = sum(line.unit_price * units for line, units in taken)
+            discount = value - bundles * rule.price
+            if discount <= 0:
+                continue
+
+            # Only worth it if it beats the exclusive line offers it displaces
+            displaced = 0
+            for line, units in taken:
+                free = line.quantity - line.bundled
+                displaced += (
+                    _best_exclusive(line.exclusive, free, line.unit_price)[0]
+                    - _best_exclusive(line.exclusive, free - units, line.unit_price)[0]
+                )
+            if discount <= displaced:
+                continue
+
+            shares = allocate(discount, [line.unit_price * units for line, units in taken])
+            for (line, units), share in zip(taken, shares):
+                line.bundled += units
+                line.outcome.discount += share
+                if rule.description not in line.outcome.offers:
+                    line.outcome.offers.append(rule.description)
+
+    def _apply_line_rules(self, line: _Line):
+        quantity = line.quantity - line.bundled
+        if not quantity or not (line.exclusive or line.stackable):
+            return
+
+        outcome = line.outcome
+        amount = quantity * line.unit_price
+
+        discount, rule = _best_exclusive(line.exclusive, quantity, line.unit_price)
+        if rule:
+            amount -= discount
+            outcome.discount += discount
+            outcome.offers.append(rule.describe(quantity))
+
+        for rule in line.stackable:
+            if amount <= 0:
+                break
+            discount = rule.discount(quantity, line.unit_price, amount)
+            if discount > 0:
+                amount -= discount
+                outcome.discount += discount
+                outcome.offers.append(rule.describe(quantity))
+
+    def _apply_cart_rules(self, state: list[_Line]):
+        line_totals = [line.quantity * line.unit_price - line.outcome.discount for line in state]
+        total = sum(line_totals)
+
+        cart_discount = 0
+        applied = []
+        exclusive = [rule for rule in self.cart_rules if not rule.stackable]
+        best = max(exclusive, key=lambda rule: rule.discount(total), default=None)
+        if best and best.discount(total) > 0:
+            cart_discount = best.discount(total)
+            applied.append(best.description)
+        for rule in self.cart_rules:
+            if rule.stackable and total - cart_discount > 0:
+                discount = min(rule.discount(total), total - cart_discount)
+                if discount > 0:
+                    cart_discount += discount
+                    applied.append(rule.description)
+
+        if not cart_discount:
+            return
+
+        # Spread over the lines pro rata, to the paisa
+        shares = allocate(cart_discount, line_totals)
+        for line, share in zip(state, shares):
+            if share:
+                line.outcome.discount += share
+                line.outcome.offers.extend(applied)
+
+
+class OfferCalendar:
+    """
+    Active offers ending on or after the day it was loaded, as start-sorted
+    intervals per product (bundles under every member product, cart offers
+    under None). Answers "active offers for these products on day D" with one
+    bisect per product.
+    """
+
+    def __init__(self, day: date, offers: list[OfferSnapshot]):
+        self.day = day
+        self.size = len(offers)
+        by_product: dict[int | None, list[OfferSnapshot]] = {}
+        for offer in offers:
+            keys = {offer.product_id, *(offer.bundle_product_ids or ())}
+            if offer.offer_type != OfferType.CART_THRESHOLD:
+                keys.discard(None)
+            for key in keys:
+                by_product.setdefault(key, []).append(offer)
+
+        self._starts: dict[int | None, list[date]] = {}
+        self._offers: dict[int | None, list[OfferSnapshot]] = {}
+        for key, intervals in by_product.items():
+            intervals.sort(key=lambda offer: (offer.start_date, offer.id))
+            self._starts[key] = [offer.start_date for offer in intervals]
+            self._offers[key] = intervals
+        self._all = sorted(offers, key=lambda offer: (offer.start_date, offer.id))
+        self._all_starts = [offer.start_date for offer in self._all]
+
+    def active_for(self, product_pks, day: date) -> dict[int, list[OfferSnapshot]]:
+        """Offers touching each product that are active on `day` (not earlier than the load day)"""
+        found = {}
+        for pk in product_pks:
+            starts = self._starts.get(pk)
+            if not starts:
+                continue
+            active = [offer for offer in self._offers[pk][:bisect_right(starts, day)] if offer.end_date >= day]
+            if active:
+                found[pk] = active
+        return found
+
+    def active_on(self, day: date) -> list[OfferSnapshot]:
+        return [offer for offer in self._all[:bisect_right(self._all_starts, day)] if offer.end_date >= day]
+
+
+def load_offer_book(db: Session, product_pks, day: date) -> OfferBook:
+    """
+    An OfferBook compiled straight from the database for one cart: offers
+    active on `day` for these products, plus every active bundle and cart
+    offer. One query; nothing is cached.
+    """
+    offers = db.scalars(
+        select(Offer).where(
+            Offer.is_active == True,
+            Offer.start_date <= day,
+            Offer.end_date >= day,
+            or_(
+                Offer.product_id.in_(set(product_pks)),
+                Offer.product_id.is_(None),
+                Offer.offer_type == OfferType.BUNDLE
+            )
+        )
+    )
+    return OfferBook(day, [compile_offer(OfferSnapshot.from_model(offer)) for offer in offers])
+
+
+class OfferBookCache:
+    """
+    The offer calendar and today's compiled OfferBook. Both are rebuilt at
+    day rollover (one range query on the active-offer index) or after an offer
+    write. Rules are reused across rebuilds while their offer row is unchanged.
+    """
+
+    def __init__(self):
+        self._calendar: OfferCalendar | None = None
+        self._book: OfferBook | None = None
+        self._compiled: dict[int, tuple[OfferSnapshot, OfferRule]] = {}
+        self._lock = Lock()
+        self._generation = 0  # bumped by invalidate()
+        self.loads = 0
+        self.compiles = 0
+
+    def _ensure(self, db: Session) -> tuple[OfferCalendar, OfferBook]:
+        calendar, book = self._calendar, self._book
+        today = business_day()
+        if calendar is not None and book is not None and book.day == today:
+            return calendar, book
+
+        # Query without holding the lock: under AsyncSession.run_sync the query
+        # yields to the event loop, and a second request blocking on the lock
+        # would stall the loop (and the first request with it)
+        generation = self._generation
+        if calendar is None or calendar.day != today:
+            calendar = self._load_calendar(db, today)
+
+        with self._lock:
+            if self._generation != generation:
+                # An offer write landed mid-load: answer this call, cache nothing
+                return calendar, self._compile(today, calendar.active_on(today))
+            if self._calendar is None or self._calendar.day != today:
+                self._calendar = calendar
+            if self._book is None or self._book.day != today:
+                self._book = self._compile(today, self._calendar.active_on(today))
+            return self._calendar, self._book
+
+    def get(self, db: Session) -> OfferBook:
+        return self._ensure(db)[1]
+
+    def calendar(self, db: Session) -> OfferCalendar:
+        return self._ensure(db)[0]
+
+    def _load_calendar(self, db: Session, today: date) -> OfferCalendar:
+        offers = db.scalars(
+            select(Offer).where(
+                Offer.is_active == True,
+                Offer.end_date >= today
+            )
+        )
+        self.loads += 1
+        return OfferCalendar(today, [OfferSnapshot.from_model(offer) for offer in offers])
+
+    def _compile(self, today: date, offers: list[OfferSnapshot]) -> OfferBook:
+        compiled = {}
+        for snapshot in offers:
+            cached = self._compiled.get(snapshot.id)
+            if cached and cached[0] == snapshot:
+                compiled[snapshot.id] = cached
+            else:
+                compiled[snapshot.id] = (snapshot, compile_offer(snapshot))
+                self.compiles += 1
+
+        self._compiled = compiled
+        return OfferBook(today, [rule for _, rule in compiled.values()])
+
+    def invalidate(self):
+        """Reload on next use (call after any offer write)"""
+        with self._lock:
+            self._generation += 1
+            self._calendar = None
+            self._book = None
+
+    def stats(self) -> dict:
+        calendar, book = self._calendar, self._book
+        return {
+            "active_offers": book.size if book else None,
+            "current_and_future_offers": calendar.size if calendar else None,
+            "loads": self.loads,
+            "compiles": self.compiles
+        }
+
+
+offer_book = OfferBookCache()
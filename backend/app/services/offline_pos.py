@@ -0,0 +1,438 @@
+"""
+Outlet side of the offline POS (enabled by setting POS_CENTRAL_URL).
+
+The till prices carts from a local snapshot of products, offers and its
+outlet's stock pulled from the central API, so confirming a sale needs no
+network round trip. Confirmed invoices are appended to a local queue file
+(fsync'd before the receipt is returned) and pushed to POST /billing/sync in
+batches by a background job.
+
+The queue is append-only; a cursor file holds the byte offset the central
+server has acknowledged. A crash between sending a batch and recording the
+acknowledgement only replays it, and the central side reports the replayed
+invoices as duplicates (they are keyed by the UUID generated here).
+"""
+import asyncio
+import json
+import os
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from threading import Lock, RLock
+from uuid import uuid4
+from pydantic import ValidationError
+from app.core.clock import business_day
+from app.core.config import settings
+from app.schemas.invoice import InvoiceItemInput
+from app.schemas.pos import (
+    InvoiceSyncResponse,
+    InvoiceSyncResult,
+    OfflineInvoice,
+    OfflineInvoiceLine,
+    OfflineReceipt,
+    PosOffer,
+    PosSnapshot,
+    PosStatus,
+    PosSyncReport
+)
+from app.services.catalog_cache import OfferSnapshot, ProductSnapshot
+from app.services.offers import OfferBook, OfferCalendar, compile_offer
+from app.services.pricing import PricedCart, ProductNotFoundError, price_lines
+from app.services.stock import InsufficientStockError
+
+
+class CentralUnavailableError(ConnectionError):
+    """The central API could not be reached or answered with a server error"""
+
+
+class CentralRejectedError(ValueError):
+    """The central API refused the request body itself (400, 413, 422): sending it unchanged will not help"""
+
+
+REFUSED_STATUSES = (400, 413, 422)  # any other status is retried later, like an unreachable server
+
+
+class SnapshotMissingError(LookupError):
+    """The till has not pulled a snapshot yet, so it can't price carts"""
+
+
+class CentralClient:
+    """Minimal JSON client for the central API (standard library only)"""
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: bytes | None = None) -> bytes:
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=body,
+            method=method,
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            if e.code in REFUSED_STATUSES:
+                detail = e.read().decode(errors="replace")[:500]
+                raise CentralRejectedError(f"{method} {path}: HTTP {e.code} {detail}".rstrip()) from e
+            raise CentralUnavailableError(f"{method} {path}: HTTP {e.code}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise CentralUnavailableError(f"{method} {path}: {e}") from e
+
+    def fetch_snapshot(self, outlet_id: int | None) -> PosSnapshot:
+        query = f"?outlet_id={outlet_id}" if outlet_id is not None else ""
+        return PosSnapshot.model_validate_json(self._request("GET", f"/billing/offline-snapshot{query}"))
+
+    def push_invoices(self, outlet_id: int | None, invoices: list[str]) -> list[InvoiceSyncResult]:
+        """Send queued invoices (already JSON) as one sync batch; one result per invoice, in order"""
+        body = f'{{"outlet_id": {json.dumps(outlet_id)}, "invoices": [{",".join(invoices)}]}}'
+        response = self._request("POST", "/billing/sync", body.encode())
+        try:
+            results = InvoiceSyncResponse.model_validate_json(response).results
+        except ValidationError as e:
+            raise CentralUnavailableError(f"POST /billing/sync: unexpected response ({e.error_count()} errors)") from e
+        if len(results) != len(invoices):
+            raise CentralUnavailableError(f"POST /billing/sync: {len(results)} results for {len(invoices)} invoices")
+        return results
+
+
+class InvoiceQueue:
+    """Append-only JSON-lines file of offline invoices plus the byte offset already synced"""
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, "invoices.jsonl")
+        self.cursor_path = os.path.join(directory, "invoices.synced")
+        self.rejected_path = os.path.join(directory, "invoices.rejected.jsonl")
+        self._repair()
+        self.synced = min(self._read_cursor(), self._size())
+        self.pending = len(self.read_from(self.synced))
+
+    def _size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def _repair(self):
+        """Drop a half-written last record (a crash mid-append; its receipt was never issued)"""
+        size = self._size()
+        if not size:
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(max(0, size - 65536))
+            tail = f.read()
+            if not tail.endswith(b"\n"):
+                f.truncate(size - len(tail) + tail.rfind(b"\n") + 1)
+
+    def _read_cursor(self) -> int:
+        try:
+            with open(self.cursor_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _append_lines(path: str, lines: list[str]):
+        with open(path, "ab") as f:
+            f.write("".join(f"{line}\n" for line in lines).encode())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, record: str):
+        self._append_lines(self.path, [record])
+        self.pending += 1
+
+    def read_from(self, offset: int, limit: int | None = None) -> list[str]:
+        return self.read_batch(offset, limit)[0]
+
+    def read_batch(self, offset: int, limit: int | None = None) -> tuple[list[str], int]:
+        """Up to `limit` records starting at byte `offset`, and the offset just past them"""
+        records = []
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                while limit is None or len(records) < limit:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break  # end of file, or a record still being appended
+                    offset += len(line)
+                    if line.strip():
+                        records.append(line.decode().rstrip("\n"))
+        except FileNotFoundError:
+            pass
+        return records, offset
+
+    def mark_synced(self, offset: int, count: int):
+        tmp_path = f"{self.cursor_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.cursor_path)
+        self.synced = offset
+        self.pending -= count
+
+    def reject(self, records: list[tuple[str, str | None]]):
+        """Set aside invoices the central server refused, with the reason, for manual follow-up"""
+        self._append_lines(self.rejected_path, [
+            f'{{"detail": {json.dumps(detail)}, "invoice": {record}}}' for record, detail in records
+        ])
+
+    def compact(self):
+        """Empty the queue once everything in it has been synced"""
+        with open(self.path, "wb") as f:
+            os.fsync(f.fileno())
+        self.mark_synced(0, 0)
+
+
+def _offer_snapshot(offer: PosOffer) -> OfferSnapshot:
+    values = offer.model_dump()
+    if offer.tiers is not None:
+        values["tiers"] = tuple(tuple(tier) for tier in offer.tiers)
+    if offer.bundle_product_ids is not None:
+        values["bundle_product_ids"] = tuple(offer.bundle_product_ids)
+    return OfferSnapshot(**values)
+
+
+class OfflineTill:
+    """
+    Prices and confirms carts for one outlet from the local snapshot.
+    Local stock is the snapshot's stock minus every invoice queued since the
+    snapshot was pulled, so it survives restarts.
+    """
+
+    def __init__(self, client: CentralClient, outlet_id: int | None, data_dir: str):
+        os.makedirs(data_dir, exist_ok=True)
+        self.client = client
+        self.outlet_id = outlet_id
+        self.snapshot_path = os.path.join(data_dir, "snapshot.json")
+        self.queue = InvoiceQueue(data_dir)
+        self._lock = Lock()  # local state: snapshot, stock and queue appends
+        self._sync_lock = RLock()  # one sync or snapshot refresh at a time
+        self._snapshot: PosSnapshot | None = None
+        self._products: dict[str, ProductSnapshot] = {}
+        self._calendar: OfferCalendar | None = None
+        self._book: OfferBook | None = None
+        self._stock: dict[int, int] = {}
+        self.last_sync_at: datetime | None = None
+        self.last_sync_error: str | None = None
+        self._load_saved_snapshot()
+
+    # ---------- snapshot ----------
+
+    def _load_saved_snapshot(self):
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                saved = json.loads(f.read())
+        except FileNotFoundError:
+            return
+        self._install(PosSnapshot.model_validate(saved["snapshot"]), saved["queue_offset"])
+
+    def _save_snapshot(self, snapshot: PosSnapshot, queue_offset: int):
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f'{{"queue_offset": {queue_offset}, "snapshot": {snapshot.model_dump_json()}}}')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _install(self, snapshot: PosSnapshot, queue_offset: int):
+        """Swap in a snapshot; invoices queued from `queue_offset` on are not in its stock yet"""
+        products = {
+            product.product_id: ProductSnapshot(**product.model_dump(), created_at=None)
+            for product in snapshot.products
+        }
+        stock = dict(snapshot.stock)
+        for record in self.queue.read_from(queue_offset):
+            for line in OfflineInvoice.model_validate_json(record).items:
+                if line.product_id in products:
+                    pk = products[line.product_id].id
+                    stock[pk] = stock.get(pk, 0) - line.quantity
+
+        self._snapshot = snapshot
+        self._products = products
+        self._calendar = OfferCalendar(business_day(), [_offer_snapshot(offer) for offer in snapshot.offers])
+        self._book = None
+        self._stock = stock
+
+    def refresh_snapshot(self):
+        """Pull a fresh snapshot; raises CentralUnavailableError when offline"""
+        with self._sync_lock:
+            # Invoices before the cursor are booked centrally (no sync runs meanwhile)
+            queue_offset = self.queue.synced
+            snapshot = self.client.fetch_snapshot(self.outlet_id)
+            with self._lock:
+                if not self.queue.pending:
+                    self.queue.compact()
+                    queue_offset = 0
+                self._save_snapshot(snapshot, queue_offset)
+                self._install(snapshot, queue_offset)
+
+    def _snapshot_due(self) -> bool:
+        snapshot = self._snapshot
+        return (
+            snapshot is None
+            or business_day(snapshot.generated_at) != business_day()
+            or datetime.utcnow() - snapshot.generated_at > timedelta(minutes=settings.POS_SNAPSHOT_REFRESH_MINUTES)
+        )
+
+    # ---------- selling ----------
+
+    def _current_book(self) -> OfferBook:
+        today = business_day()
+        if self._book is None or self._book.day != today:
+            self._book = OfferBook(today, [compile_offer(offer) for offer in self._calendar.active_on(today)])
+        return self._book
+
+    def _price(self, items: list[InvoiceItemInput]) -> PricedCart:
+        if self._snapshot is None:
+            raise SnapshotMissingError("No offline snapshot yet: the till has not reached the central API")
+        for item in items:
+            if item.product_id not in self._products:
+                raise ProductNotFoundError(item.product_id)
+        return price_lines(self._current_book(), [(self._products[item.product_id], item.quantity) for item in items])
+
+    def price(self, items: list[InvoiceItemInput]) -> PricedCart:
+        with self._lock:
+            return self._price(items)
+
+    def confirm(self, items: list[InvoiceItemInput], notes: str | None = None) -> OfflineReceipt:
+        """Price, check local stock and queue the invoice; raises like /billing/confirm"""
+        with self._lock:
+            cart = self._price(items)
+            requested = cart.requested_quantities()
+            names = {line.product.id: line.product.name for line in cart.lines}
+            shortages = [
+                (names[pk], self._stock.get(pk, 0), quantity)
+                for pk, quantity in requested.items()
+                if self._stock.get(pk, 0) < quantity
+            ]
+            if shortages:
+                raise InsufficientStockError(shortages)
+
+            invoice = OfflineInvoice(
+                uuid=uuid4(),
+                created_at=datetime.utcnow(),
+                items=[
+                    OfflineInvoiceLine(
+                        product_id=line.product.product_id,
+                        quantity=line.quantity,
+                        unit_price=line.unit_price,
+                        discount=line.discount,
+                        line_total=line.line_total,
+                        offer_applied=line.offer_applied
+                    )
+                    for line in cart.lines
+                ],
+                subtotal=cart.subtotal,
+                total_discount=cart.total_discount,
+                final_total=cart.final_total,
+                notes=notes
+            )
+            self.queue.append(invoice.model_dump_json())
+            for pk, quantity in requested.items():
+                self._stock[pk] = self._stock.get(pk, 0) - quantity
+            pending = self.queue.pending
+
+        return OfflineReceipt(
+            uuid=invoice.uuid,
+            created_at=invoice.created_at,
+            items=[line.to_detail() for line in cart.lines],
+            subtotal=cart.subtotal,
+            total_discount=cart.total_discount,
+            final_total=cart.final_total,
+            pending_sync=pending
+        )
+
+    # ---------- sync ----------
+
+    def _push(self, records: list[str], refusals: list[str]) -> list[tuple[str, str, str | None]]:
+        """
+        (record, status, detail) for each record. A batch the central API
+        refuses as a whole is split in halves until the invoices it refuses
+        are isolated, so only those are rejected; their errors go to refusals.
+        """
+        try:
+            results = self.client.push_invoices(self.outlet_id, records)
+        except CentralRejectedError as e:
+            if len(records) == 1:
+                refusals.append(str(e))
+                return [(records[0], "rejected", str(e))]
+            middle = len(records) // 2
+            return self._push(records[:middle], refusals) + self._push(records[middle:], refusals)
+        return [(record, result.status, result.detail) for record, result in zip(records, results)]
+
+    def sync(self, batch_size: int | None = None) -> PosSyncReport:
+        """
+        Push queued invoices in batches, then refresh the snapshot if it is due.
+        Invoices the central API rejects or refuses are set aside, the last
+        refusal kept in last_sync_error; any other failure leaves the queue
+        where it was, to be retried.
+        """
+        batch_size = batch_size or settings.POS_SYNC_BATCH_SIZE
+        report = PosSyncReport()
+        refusals: list[str] = []
+        with self._sync_lock:
+            try:
+                while True:
+                    records, offset = self.queue.read_batch(self.queue.synced, batch_size)
+                    if not records:
+                        break
+                    pushed = self._push(records, refusals)
+                    rejected = [(record, detail) for record, status, detail in pushed if status == "rejected"]
+                    if rejected:
+                        self.queue.reject(rejected)
+                    with self._lock:
+                        self.queue.mark_synced(offset, len(records))
+
+                    report.sent += len(records)
+                    report.created += sum(status == "created" for _, status, _ in pushed)
+                    report.duplicates += sum(status == "duplicate" for _, status, _ in pushed)
+                    report.rejected += len(rejected)
+
+                if self._snapshot_due():
+                    self.refresh_snapshot()
+                self.last_sync_at = datetime.utcnow()
+                self.last_sync_error = refusals[-1] if refusals else None
+            except (CentralUnavailableError, CentralRejectedError) as e:
+                report.error = self.last_sync_error = str(e)
+
+        report.pending = self.queue.pending
+        return report
+
+    def status(self) -> PosStatus:
+        snapshot = self._snapshot
+        return PosStatus(
+            central_url=self.client.base_url,
+            outlet_id=self.outlet_id,
+            snapshot_at=snapshot.generated_at if snapshot else None,
+            products=len(self._products),
+            offers=len(snapshot.offers) if snapshot else 0,
+            pending_sync=self.queue.pending,
+            last_sync_at=self.last_sync_at,
+            last_sync_error=self.last_sync_error
+        )
+
+
+pos_till = OfflineTill(
+    CentralClient(settings.POS_CENTRAL_URL, settings.POS_CENTRAL_TIMEOUT_SECONDS),
+    settings.POS_OUTLET_ID,
+    settings.POS_DATA_DIR
+) if settings.POS_CENTRAL_URL else None
+
+
+async def run_pos_sync_job(till: OfflineTill, interval_seconds: float):
+    """Background loop: push queued invoices (and refresh the snapshot) every interval_seconds"""
+    while True:
+        try:
+            report = await asyncio.to_thread(till.sync)
+            if report.sent:
+                print(
+                    f"🔄 Synced {report.sent} offline invoices "
+                    f"({report.created} new, {report.duplicates} duplicate, {report.rejected} rejected)"
+                )
+        except Exception as e:
+            print(f"⚠️  Offline invoice sync failed: {e}")
+        await asyncio.sleep(interval_seconds)
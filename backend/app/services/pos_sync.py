@@ -0,0 +1,226 @@
+"""
+Central side of the offline POS: the snapshot an outlet till prices from, and
+idempotent bulk sync of the invoices it confirmed while offline. Each synced
+invoice carries the UUID the till generated for it; replaying a batch (after a
+timeout, a crash between send and acknowledge, ...) reports those invoices as
+duplicates instead of booking them twice.
+"""
+from datetime import date, datetime
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.clock import business_day
+from app.models.barcode import Barcode
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.offer import Offer
+from app.models.product import Product
+from app.models.stock import Stock
+from app.schemas.pos import InvoiceSyncResult, OfflineInvoice, PosOffer, PosProduct, PosSnapshot
+from app.services.catalog_cache import OfferSnapshot, ProductSnapshot
+from app.services.money import to_paise
+from app.services.sales_rollup import SalesDelta, apply_sales_delta
+from app.services.sequences import format_invoice_number, reserve_sequence, sequence_outlet
+from app.services.stock import adjust_outlet_summary, deduct_stock, stock_change_delta
+
+
+def build_pos_snapshot(db: Session, outlet_id: int | None) -> PosSnapshot:
+    """Products, current and future offers and the outlet's stock, read in three queries"""
+    generated_at = datetime.utcnow()
+
+    products = db.execute(
+        select(Product, Barcode.barcode_value)
+        .outerjoin(Barcode, Barcode.product_id == Product.id)
+        .order_by(Product.id)
+    )
+    offers = db.scalars(
+        select(Offer).where(Offer.is_active == True, Offer.end_date >= business_day())
+    )
+    stock = db.execute(
+        select(Stock.product_id, Stock.quantity).where(Stock.outlet_id == outlet_id)
+    )
+
+    return PosSnapshot(
+        outlet_id=outlet_id,
+        generated_at=generated_at,
+        products=[
+            PosProduct.model_validate(ProductSnapshot.from_model(product, barcode_value))
+            for product, barcode_value in products
+        ],
+        offers=[PosOffer.model_validate(OfferSnapshot.from_model(offer)) for offer in offers],
+        stock=dict(stock.all())
+    )
+
+
+def check_offline_invoice(invoice: OfflineInvoice, products: dict[str, tuple[int, int, int]]) -> str | None:
+    """Why an offline invoice can't be booked, or None (amounts must add up to the paisa)"""
+    unknown = sorted({line.product_id for line in invoice.items} - products.keys())
+    if unknown:
+        return f"Unknown product(s): {', '.join(unknown)}"
+
+    for line in invoice.items:
+        if line.unit_price * line.quantity - line.discount != line.line_total:
+            return f"Line total for {line.product_id} does not match unit price, quantity and discount"
+
+    subtotal = sum(line.unit_price * line.quantity for line in invoice.items)
+    discount = sum(line.discount for line in invoice.items)
+    if (subtotal, discount, subtotal - discount) != (invoice.subtotal, invoice.total_discount, invoice.final_total):
+        return "Invoice totals do not match its lines"
+    return None
+
+
+def _book_offline_invoices(
+    db: Session,
+    outlet_id: int | None,
+    invoices: list[OfflineInvoice],
+    products: dict[str, tuple[int, int, int]]
+) -> dict[str, str]:
+    """
+    Write checked offline invoices as they were charged at the till, set-wise:
+    one sequence reservation per sale day (numbers follow the order the till
+    sold them in), one stock UPDATE for the whole batch, and bulk inserts.
+    Stock is deducted without an availability check (the goods are already
+    gone). The sales rollups are bumped by the batch. Returns the invoice
+    number per UUID.
+    """
+    outlet_scope = sequence_outlet(outlet_id)
+    by_day: dict[date, list[OfflineInvoice]] = {}
+    for invoice in sorted(invoices, key=lambda invoice: invoice.created_at):
+        by_day.setdefault(business_day(invoice.created_at), []).append(invoice)
+
+    numbers: dict[str, str] = {}
+    for day, day_invoices in by_day.items():
+        values = reserve_sequence(db, day, outlet_scope, len(day_invoices))
+        for invoice, value in zip(day_invoices, values):
+            numbers[str(invoice.uuid)] = format_invoice_number(day, outlet_scope, value)
+
+    sold: dict[int, int] = {}
+    for invoice in invoices:
+        for line in invoice.items:
+            pk = products[line.product_id][0]
+            sold[pk] = sold.get(pk, 0) + line.quantity
+
+    deducted = deduct_stock(db, outlet_id, sold)
+    min_stock = {pk: minimum for pk, minimum, _ in products.values()}
+    adjust_outlet_summary(
+        db,
+        outlet_id,
+        quantity=-sum(sold[pk] for pk in deducted),
+        low=sum(
+            stock_change_delta(quantity + sold[pk], quantity, min_stock[pk])[2]
+            for pk, quantity in deducted.items()
+        )
+    )
+
+    db_invoices = [
+        Invoice(
+            invoice_number=numbers[str(invoice.uuid)],
+            total_amount=invoice.subtotal,
+            discount_amount=invoice.total_discount,
+            final_amount=invoice.final_total,
+            created_at=invoice.created_at,
+            notes=invoice.notes,
+            client_uuid=str(invoice.uuid),
+            outlet_id=outlet_id
+        )
+        for invoice in invoices
+    ]
+    db.add_all(db_invoices)
+    db.flush()
+
+    db.add_all([
+        InvoiceItem(
+            invoice_id=db_invoice.id,
+            product_id=products[line.product_id][0],
+            quantity=line.quantity,
+            unit_price=line.unit_price,
+            discount=line.discount,
+            line_total=line.line_total,
+            offer_applied=line.offer_applied
+        )
+        for invoice, db_invoice in zip(invoices, db_invoices)
+        for line in invoice.items
+    ])
+    db.flush()
+
+    delta = SalesDelta()
+    for invoice in invoices:
+        day = business_day(invoice.created_at)
+        delta.add_invoice(day, outlet_id)
+        for line in invoice.items:
+            pk, _, cost_paise = products[line.product_id]
+            delta.add_line(
+                day,
+                outlet_id,
+                pk,
+                line.quantity,
+                gross=to_paise(line.unit_price) * line.quantity,
+                discount=to_paise(line.discount),
+                cost=cost_paise * line.quantity
+            )
+    apply_sales_delta(db, delta)
+    return numbers
+
+
+def sync_offline_invoices(
+    db: Session,
+    outlet_id: int | None,
+    invoices: list[OfflineInvoice],
+    retry: bool = True
+) -> list[InvoiceSyncResult]:
+    """
+    Book a batch of offline invoices inside the caller's transaction. Invoices
+    already booked (or repeated within the batch) are reported as duplicates
+    and invoices that fail the checks as rejected; the rest are written
+    together. Returns one result per invoice, in order.
+    """
+    uuids = {str(invoice.uuid) for invoice in invoices}
+    booked = dict(db.execute(
+        select(Invoice.client_uuid, Invoice.invoice_number).where(Invoice.client_uuid.in_(uuids))
+    ).all())
+
+    product_ids = {line.product_id for invoice in invoices for line in invoice.items}
+    products = {
+        product_id: (pk, min_stock, to_paise(cost_price))
+        for product_id, pk, min_stock, cost_price in db.execute(
+            select(Product.product_id, Product.id, Product.min_stock, Product.cost_price)
+            .where(Product.product_id.in_(product_ids))
+        )
+    }
+
+    problems: dict[str, str] = {}
+    new: dict[str, OfflineInvoice] = {}
+    for invoice in invoices:
+        key = str(invoice.uuid)
+        if key in booked or key in new or key in problems:
+            continue
+        problem = check_offline_invoice(invoice, products)
+        if problem:
+            problems[key] = problem
+        else:
+            new[key] = invoice
+
+    if new:
+        try:
+            with db.begin_nested():
+                created = _book_offline_invoices(db, outlet_id, list(new.values()), products)
+        except IntegrityError:
+            if not retry:
+                raise
+            # Most likely the same invoices synced concurrently: look again, they are duplicates now
+            return sync_offline_invoices(db, outlet_id, invoices, retry=False)
+    else:
+        created = {}
+
+    results = []
+    reported = set()
+    for invoice in invoices:
+        key = str(invoice.uuid)
+        if key in problems:
+            results.append(InvoiceSyncResult(uuid=invoice.uuid, status="rejected", detail=problems[key]))
+        elif key in created and key not in reported:
+            reported.add(key)
+            results.append(InvoiceSyncResult(uuid=invoice.uuid, status="created", invoice_number=created[key]))
+        else:
+            number = booked.get(key) or created.get(key)
+            results.append(InvoiceSyncResult(uuid=invoice.uuid, status="duplicate", invoice_number=number))
+    return results
@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from app.core.clock import business_day
+from app.schemas.invoice import InvoiceItemInput, InvoiceItemDetail
+from app.services.catalog_cache import catalog_cache, load_products, ProductSnapshot
+from app.services.money import to_rupees
+from app.services.offers import LineOutcome, OfferBook, load_offer_book, offer_book
+
+
+class ProductNotFoundError(LookupError):
+    """Raised when a cart line references an unknown SPN Product ID"""
+
+    def __init__(self, product_id: str):
+        self.product_id = product_id
+        super().__init__(f"Product {product_id} not found")
+
+
+@dataclass
+class PricedLine:
+    product: ProductSnapshot
+    quantity: int
+    unit_price: Decimal
+    discount: Decimal
+    line_total: Decimal
+    offer_applied: str | None = None
+
+    def to_detail(self) -> InvoiceItemDetail:
+        return InvoiceItemDetail(
+            product_id=self.product.product_id,
+            product_name=self.product.name,
+            quantity=self.quantity,
+            unit_price=self.unit_price,
+            discount=self.discount,
+            line_total=self.line_total,
+            offer_applied=self.offer_applied
+        )
+
+
+@dataclass
+class PricedCart:
+    lines: list[PricedLine]
+    subtotal: Decimal
+    total_discount: Decimal
+    final_total: Decimal
+
+    def requested_quantities(self) -> dict[int, int]:
+        """Total requested quantity per Product.id (a product may appear on several lines)"""
+        requested: dict[int, int] = {}
+        for line in self.lines:
+            requested[line.product.id] = requested.get(line.product.id, 0) + line.quantity
+        return requested
+
+
+def price_line(product: ProductSnapshot, quantity: int, outcome: LineOutcome) -> PricedLine:
+    """Build a priced line from the offer engine's outcome for it (exact, to the paisa)"""
+    return PricedLine(
+        product=product,
+        quantity=quantity,
+        unit_price=to_rupees(product.price_paise),
+        discount=to_rupees(outcome.discount),
+        line_total=to_rupees(product.price_paise * quantity - outcome.discount),
+        offer_applied=outcome.description
+    )
+
+
+def price_lines(book: OfferBook, lines: list[tuple[ProductSnapshot, int]]) -> PricedCart:
+    """Price (product, quantity) lines against a compiled offer book; totals are summed in paise"""
+    outcomes = book.evaluate(lines)
+
+    priced = []
+    subtotal = 0
+    total_discount = 0
+
+    for (product, quantity), outcome in zip(lines, outcomes):
+        priced.append(price_line(product, quantity, outcome))
+        subtotal += product.price_paise * quantity
+        total_discount += outcome.discount
+
+    return PricedCart(
+        lines=priced,
+        subtotal=to_rupees(subtotal),
+        total_discount=to_rupees(total_discount),
+        final_total=to_rupees(subtotal - total_discount)
+    )
+
+
+def price_cart(db: Session, items: list[InvoiceItemInput]) -> PricedCart:
+    """
+    Price a whole cart with a constant number of queries: one for products
+    (from the catalog cache) and the compiled offer book, loaded once a day
+    or after an offer changes. A warm cart issues no queries at all.
+    The caches are per process, so this is for previews and scans; bookings
+    use price_cart_current.
+    Raises ProductNotFoundError for the first unknown Product ID.
+    """
+
+    products = catalog_cache.get_products(db, [item.product_id for item in items])
+    _check_found(items, products)
+
+    book = offer_book.get(db)
+    return price_lines(book, [(products[item.product_id], item.quantity) for item in items])
+
+
+def price_cart_current(db: Session, items: list[InvoiceItemInput]) -> PricedCart:
+    """
+    price_cart from the database, bypassing the process-local caches (which
+    other workers' edits don't invalidate): one query for the products and
+    one for the offers that can apply. Run it inside the booking transaction.
+    """
+
+    products = load_products(db, [item.product_id for item in items])
+    _check_found(items, products)
+
+    book = load_offer_book(db, [product.id for product in products.values()], business_day())
+    return price_lines(book, [(products[item.product_id], item.quantity) for item in items])
+
+
+def _check_found(items: list[InvoiceItemInput], products: dict[str, ProductSnapshot]):
+    for item in items:
+        if item.product_id not in products:
+            raise ProductNotFoundError(item.product_id)
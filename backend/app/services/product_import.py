@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import IO, Iterable, Iterator
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models.product import Product
+from app.models.barcode import Barcode
+from app.schemas.product import ProductCreate
+from app.services.sequences import reserve_product_id_blocks
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+@dataclass
+class ImportReport:
+    total_rows: int = 0
+    imported: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)  # (row number, message)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+def detect_format(filename: str | None) -> str:
+    if filename and filename.lower().endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return "csv"
+
+
+def iter_rows(stream: IO[bytes], fmt: str) -> Iterator[dict | str]:
+    """
+    Stream rows from a binary CSV (with header) or NDJSON file.
+    Rows that can't be parsed are yielded as an error message string.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        for row in csv.DictReader(text):
+            yield {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        return
+
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield f"Invalid JSON: {e.msg}"
+            continue
+        yield row if isinstance(row, dict) else "Expected a JSON object"
+
+
+def _error_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+def _import_chunk(db: Session, chunk: list[tuple[int, dict | str]], report: ImportReport):
+    valid: list[tuple[int, ProductCreate]] = []
+    for row_number, row in chunk:
+        if isinstance(row, str):
+            report.errors.append((row_number, row))
+            continue
+        try:
+            valid.append((row_number, ProductCreate.model_validate(row)))
+        except ValidationError as e:
+            report.errors.append((row_number, _error_message(e)))
+
+    if not valid:
+        return
+
+    try:
+        # One counter write for every cost bucket in the chunk
+        by_bucket: dict[int, list[ProductCreate]] = {}
+        for _, product in valid:
+            by_bucket.setdefault(int(product.cost_price), []).append(product)
+
+        product_ids = reserve_product_id_blocks(
+            db, {bucket: len(products) for bucket, products in by_bucket.items()}
+        )
+
+        product_rows = []
+        for cost_bucket, products in by_bucket.items():
+            product_rows.extend(
+                {**product.model_dump(), "product_id": product_id}
+                for product, product_id in zip(products, product_ids[cost_bucket])
+            )
+
+        inserted = db.execute(
+            insert(Product).returning(Product.id, Product.product_id),
+            product_rows
+        ).all()
+
+        db.execute(insert(Barcode), [
+            {"product_id": pk, "barcode_value": product_id, "barcode_format": "Code128"}
+            for pk, product_id in inserted
+        ])
+        db.commit()
+        report.imported += len(inserted)
+    except SQLAlchemyError as e:
+        db.rollback()
+        message = f"Chunk rolled back: {e.__class__.__name__}"
+        report.errors.extend((row_number, message) for row_number, _ in valid)
+
+
+def import_products(db: Session, rows: Iterable[dict | str], chunk_size: int = 1000) -> ImportReport:
+    """
+    Insert products (and their barcode rows) from a row stream, committing
+    once per chunk. Invalid rows are reported and skipped; they never abort the import.
+    Barcode images are not rendered here.
+    """
+    report = ImportReport()
+    numbered = enumerate(rows, start=1)
+
+    while chunk := list(islice(numbered, chunk_size)):
+        report.total_rows += len(chunk)
+        _import_chunk(db, chunk, report)
+
+    report.errors.sort()
+    return report
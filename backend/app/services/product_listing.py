@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Collection
+from sqlalchemy import Select, and_, exists, or_, select
+from sqlalchemy.orm import Session
+from app.core.clock import business_day
+from app.models.offer import Offer, OfferType
+from app.models.product import Product
+from app.schemas.product import ProductResponse
+
+LISTABLE_FIELDS = tuple(ProductResponse.model_fields)
+
+
+@dataclass
+class ProductFilter:
+    category: str | None = None
+    min_price: float | None = None  # on selling_price
+    max_price: float | None = None
+    has_offer: bool | None = None  # an active offer on the product itself or a bundle it is in (not cart-wide ones)
+
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    """
+    Sparse fieldset from a comma-separated list ("product_id,name,selling_price").
+    Returns None for the full row. The id is always included (it is the cursor).
+    Raises ValueError on unknown fields.
+    """
+    if not fields:
+        return None
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in LISTABLE_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(LISTABLE_FIELDS)}"
+        )
+
+    return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+
+
+def _active_on(today: date) -> list:
+    return [Offer.is_active == True, Offer.start_date <= today, Offer.end_date >= today]
+
+
+def active_offer_exists(today: date):
+    return exists().where(Offer.product_id == Product.id, *_active_on(today))
+
+
+def bundled_product_ids(db: Session, today: date) -> set[int]:
+    """Products in an active bundle offer (the member list is JSON, so it is read here rather than joined)"""
+    return {
+        pk
+        for members in db.scalars(select(Offer.bundle_product_ids).where(Offer.offer_type == OfferType.BUNDLE, *_active_on(today)))
+        for pk in members or ()
+    }
+
+
+def product_page_query(
+    filters: ProductFilter,
+    after: int | None,
+    limit: int,
+    fields: list[str] | None = None,
+    bundled: Collection[int] = ()
+) -> Select:
+    """
+    One page of products ordered by Product.id, starting after the `after` cursor.
+    Fetches limit + 1 rows so the caller can tell whether there is a next page.
+    `bundled` (bundled_product_ids) also count as on offer for has_offer.
+    """
+    columns = [getattr(Product, field) for field in fields] if fields else [Product]
+    query = select(*columns)
+
+    conditions = []
+    if after is not None:
+        conditions.append(Product.id > after)
+    if filters.category is not None:
+        conditions.append(Product.category == filters.category)
+    if filters.min_price is not None:
+        conditions.append(Product.selling_price >= filters.min_price)
+    if filters.max_price is not None:
+        conditions.append(Product.selling_price <= filters.max_price)
+    if filters.has_offer is not None:
+        offer = or_(active_offer_exists(business_day()), Product.id.in_(bundled)) if bundled else active_offer_exists(business_day())
+        conditions.append(offer if filters.has_offer else ~offer)
+
+    if conditions:
+        query = query.where(and_(*conditions))
+
+    return query.order_by(Product.id).limit(limit + 1)
@@ -0,0 +1,303 @@
+"""
+Sales rollups: per business day (app.core.clock) and outlet (sales_daily)
+and per business day, outlet and product (product_sales_daily), in integer
+paise. Every code path that books invoices adds them to a SalesDelta and
+applies it in the same transaction, so the report queries below read only
+the rollup tables.
+rebuild_sales_rollups() recomputes them from invoice history.
+"""
+from datetime import date, datetime
+from sqlalchemy import MetaData, Table, case, delete, func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.clock import business_day, business_day_start
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.outlet import Outlet
+from app.models.product import Product
+from app.models.sales import ProductSalesDaily, SalesDaily
+from app.services.money import to_paise, to_rupees
+from app.services.pricing import PricedCart
+
+DAILY_MEASURES = ("invoices", "units", "gross_paise", "discount_paise", "cost_paise")
+PRODUCT_MEASURES = ("units", "gross_paise", "discount_paise", "cost_paise")
+PRODUCT_SORTS = {
+    "units": func.sum(ProductSalesDaily.units),
+    "net": func.sum(ProductSalesDaily.gross_paise - ProductSalesDaily.discount_paise),
+    "margin": func.sum(ProductSalesDaily.gross_paise - ProductSalesDaily.discount_paise - ProductSalesDaily.cost_paise),
+}
+CASE_CHUNK = 500  # keys per UPDATE ... CASE statement (bound parameter limits)
+
+
+def outlet_key(outlet_id: int | None) -> int:
+    return outlet_id or 0
+
+
+class SalesDelta:
+    """Measures to add to the rollups, accumulated in memory"""
+
+    def __init__(self):
+        self.daily: dict[tuple[date, int], list[int]] = {}  # DAILY_MEASURES
+        self.products: dict[tuple[date, int, int], list[int]] = {}  # PRODUCT_MEASURES
+
+    def __bool__(self) -> bool:
+        return bool(self.daily)
+
+    def _daily(self, day: date, outlet_id: int | None) -> list[int]:
+        return self.daily.setdefault((day, outlet_key(outlet_id)), [0, 0, 0, 0, 0])
+
+    def add_invoice(self, day: date, outlet_id: int | None):
+        self._daily(day, outlet_id)[0] += 1
+
+    def add_line(self, day: date, outlet_id: int | None, product_pk: int, quantity: int, gross: int, discount: int, cost: int):
+        """One invoice line; gross, discount and cost are line amounts in paise"""
+        daily = self._daily(day, outlet_id)
+        product = self.products.setdefault((day, outlet_key(outlet_id), product_pk), [0, 0, 0, 0])
+        for offset, totals in ((1, daily), (0, product)):
+            totals[offset] += quantity
+            totals[offset + 1] += gross
+            totals[offset + 2] += discount
+            totals[offset + 3] += cost
+
+    def add_cart(self, day: date, outlet_id: int | None, cart: PricedCart):
+        """A confirmed invoice, straight from the priced cart"""
+        self.add_invoice(day, outlet_id)
+        for line in cart.lines:
+            self.add_line(
+                day,
+                outlet_id,
+                line.product.id,
+                line.quantity,
+                gross=line.product.price_paise * line.quantity,
+                discount=to_paise(line.discount),
+                cost=to_paise(line.product.cost_price) * line.quantity
+            )
+
+
+def _add_rows(db: Session, table: Table, group_columns: tuple[str, ...], key_column: str, measures: tuple[str, ...], rows: dict):
+    """
+    Add measure values to rollup rows, creating missing ones. Rows sharing
+    group_columns are bumped together by one UPDATE ... CASE key_column.
+    """
+    groups: dict[tuple, dict] = {}
+    for key, values in rows.items():
+        groups.setdefault(key[:-1], {})[key[-1]] = values
+
+    key_col = table.c[key_column]
+    for group, by_key in groups.items():
+        where = [table.c[column] == value for column, value in zip(group_columns, group)]
+        keys = list(by_key)
+        for start in range(0, len(keys), CASE_CHUNK):
+            chunk = keys[start:start + CASE_CHUNK]
+            bumped = set(db.scalars(
+                update(table)
+                .where(*where, key_col.in_(chunk))
+                .values({
+                    measure: table.c[measure] + case({key: by_key[key][i] for key in chunk}, value=key_col)
+                    for i, measure in enumerate(measures)
+                })
+                .returning(key_col)
+            ))
+            missing = [key for key in chunk if key not in bumped]
+            if not missing:
+                continue
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table), [
+                        {**dict(zip(group_columns, group)), key_column: key, **dict(zip(measures, by_key[key]))}
+                        for key in missing
+                    ])
+            except IntegrityError:
+                # Created by a concurrent transaction in the meantime: add to it instead
+                _add_rows(db, table, group_columns, key_column, measures, {(*group, key): by_key[key] for key in missing})
+
+
+def apply_sales_delta(db: Session, delta: SalesDelta, tables: tuple[Table, Table] | None = None):
+    """
+    Add a delta to the rollup tables (or to other tables of the same shape,
+    daily then per product) inside the caller's transaction
+    """
+    if not delta:
+        return
+    daily, products = tables or (SalesDaily.__table__, ProductSalesDaily.__table__)
+    _add_rows(db, daily, ("day",), "outlet_id", DAILY_MEASURES, delta.daily)
+    _add_rows(db, products, ("day", "outlet_id"), "product_id", PRODUCT_MEASURES, delta.products)
+
+
+def _history_deltas(db: Session, since_at: datetime | None, invoice_ids, chunk_size: int):
+    """
+    SalesDeltas for the booked invoices and lines matching `invoice_ids` (a
+    condition on Invoice.id), in keyset-paginated chunks. Historical costs
+    use each product's current cost_price.
+    """
+    def chunks(query, id_column):
+        after = 0
+        while True:
+            rows = db.execute(query.where(id_column > after).order_by(id_column).limit(chunk_size)).all()
+            if not rows:
+                return
+            yield rows
+            after = rows[-1][0]
+
+    invoices = select(Invoice.id, Invoice.created_at, Invoice.outlet_id).where(invoice_ids)
+    if since_at:
+        invoices = invoices.where(Invoice.created_at >= since_at)
+    for rows in chunks(invoices, Invoice.id):
+        delta = SalesDelta()
+        for _, created_at, outlet_id in rows:
+            delta.add_invoice(business_day(created_at), outlet_id)
+        yield delta, 0
+
+    costs = {pk: to_paise(cost) for pk, cost in db.execute(select(Product.id, Product.cost_price))}
+    lines = (
+        select(
+            InvoiceItem.id, Invoice.created_at, Invoice.outlet_id, InvoiceItem.product_id,
+            InvoiceItem.quantity, InvoiceItem.unit_price, InvoiceItem.discount
+        )
+        .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+        .where(invoice_ids)
+    )
+    if since_at:
+        lines = lines.where(Invoice.created_at >= since_at)
+    for rows in chunks(lines, InvoiceItem.id):
+        delta = SalesDelta()
+        for _, created_at, outlet_id, product_pk, quantity, unit_price, discount in rows:
+            delta.add_line(
+                business_day(created_at),
+                outlet_id,
+                product_pk,
+                quantity,
+                gross=to_paise(unit_price) * quantity,
+                discount=to_paise(discount),
+                cost=costs.get(product_pk, 0) * quantity
+            )
+        yield delta, len(rows)
+
+
+def rebuild_sales_rollups(db: Session, since: date | None = None, chunk_size: int = 5000) -> int:
+    """
+    Recompute the rollups from invoice history (all of it, or from `since`).
+    Invoices up to the last one booked when the rebuild starts are rolled up
+    into staging tables, committing per chunk; one final transaction adds
+    the invoices booked since then and swaps the staged rows in. Reports
+    never see a partial rebuild, and bookings made during it (which also
+    bump the live tables) are counted once.
+    Returns the number of invoice lines processed.
+    """
+    since_at = business_day_start(since) if since else None
+    last_id = db.scalar(select(func.max(Invoice.id))) or 0
+    db.commit()
+
+    metadata = MetaData()
+    live = (SalesDaily.__table__, ProductSalesDaily.__table__)
+    staging = tuple(table.to_metadata(metadata, name=f"{table.name}_rebuild") for table in live)
+    bind = db.connection()
+    metadata.drop_all(bind)  # left over from an interrupted rebuild
+    metadata.create_all(bind)
+    db.commit()
+
+    processed = 0
+    try:
+        for delta, lines in _history_deltas(db, since_at, Invoice.id <= last_id, chunk_size):
+            apply_sales_delta(db, delta, staging)
+            db.commit()
+            processed += lines
+
+        # The swap: deleting first takes the write lock (SQLite), so no booking
+        # can commit between reading the late invoices and the swap itself
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text(f"LOCK TABLE {', '.join(table.name for table in live)} IN EXCLUSIVE MODE"))
+        for table in live:
+            db.execute(delete(table).where(table.c.day >= since) if since else delete(table))
+        for delta, lines in _history_deltas(db, since_at, Invoice.id > last_id, chunk_size):
+            apply_sales_delta(db, delta, staging)
+            processed += lines
+        for table, rebuilt in zip(live, staging):
+            db.execute(insert(table).from_select(list(rebuilt.c.keys()), select(rebuilt)))
+        db.commit()
+    finally:
+        db.rollback()
+        metadata.drop_all(db.connection())
+        db.commit()
+    return processed
+
+
+# ==================== REPORTS (rollup tables only) ====================
+
+def _measures(model, with_invoices: bool = True) -> list:
+    columns = [func.sum(model.invoices)] if with_invoices else []
+    return columns + [
+        func.sum(model.units),
+        func.sum(model.gross_paise),
+        func.sum(model.discount_paise),
+        func.sum(model.cost_paise)
+    ]
+
+
+def _totals(units: int, gross: int, discount: int, cost: int, invoices: int | None = None) -> dict:
+    gross, discount, cost = int(gross or 0), int(discount or 0), int(cost or 0)
+    totals = {
+        "units": int(units or 0),
+        "gross": to_rupees(gross),
+        "discount": to_rupees(discount),
+        "net": to_rupees(gross - discount),
+        "cost": to_rupees(cost),
+        "margin": to_rupees(gross - discount - cost)
+    }
+    if invoices is not None:
+        totals["invoices"] = int(invoices)
+    return totals
+
+
+def daily_sales(db: Session, start: date, end: date, outlet_id: int | None = None) -> list[dict]:
+    query = select(SalesDaily.day, *_measures(SalesDaily)).where(SalesDaily.day.between(start, end))
+    if outlet_id is not None:
+        query = query.where(SalesDaily.outlet_id == outlet_key(outlet_id))
+    rows = db.execute(query.group_by(SalesDaily.day).order_by(SalesDaily.day))
+    return [
+        {"day": day, **_totals(units, gross, discount, cost, invoices)}
+        for day, invoices, units, gross, discount, cost in rows
+    ]
+
+
+def outlet_sales(db: Session, start: date, end: date) -> list[dict]:
+    rows = db.execute(
+        select(SalesDaily.outlet_id, Outlet.name, *_measures(SalesDaily))
+        .outerjoin(Outlet, Outlet.id == SalesDaily.outlet_id)
+        .where(SalesDaily.day.between(start, end))
+        .group_by(SalesDaily.outlet_id, Outlet.name)
+        .order_by(SalesDaily.outlet_id)
+    )
+    return [
+        {"outlet_id": outlet_id or None, "outlet_name": name, **_totals(units, gross, discount, cost, invoices)}
+        for outlet_id, name, invoices, units, gross, discount, cost in rows
+    ]
+
+
+def product_sales(
+    db: Session,
+    start: date,
+    end: date,
+    outlet_id: int | None = None,
+    sort: str = "net",
+    limit: int = 50
+) -> list[dict]:
+    """Top products by units, net sales or margin over a date range"""
+    query = (
+        select(
+            ProductSalesDaily.product_id, Product.product_id, Product.name,
+            *_measures(ProductSalesDaily, with_invoices=False)
+        )
+        .outerjoin(Product, Product.id == ProductSalesDaily.product_id)
+        .where(ProductSalesDaily.day.between(start, end))
+    )
+    if outlet_id is not None:
+        query = query.where(ProductSalesDaily.outlet_id == outlet_key(outlet_id))
+    rows = db.execute(
+        query.group_by(ProductSalesDaily.product_id, Product.product_id, Product.name)
+        .order_by(PRODUCT_SORTS[sort].desc(), ProductSalesDaily.product_id)
+        .limit(limit)
+    )
+    return [
+        {"product_pk": pk, "product_id": spn, "product_name": name, **_totals(units, gross, discount, cost)}
+        for pk, spn, name, units, gross, discount, cost in rows
+    ]
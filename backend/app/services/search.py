@@ -0,0 +1,311 @@
+"""
+In-memory typeahead index over product name, category and SPN code.
+
+Each query term is expanded against the token vocabulary: prefix matches via a
+sorted token list (bisect) or, when nothing matches, similar words by trigram
+similarity (typos). Products must match every term and are ranked by match
+quality, boosted by recent sales. The index is built on first use, picks up
+new products on every search and is updated in place when products change in
+this process; products changed by other workers (updated_at) are re-read every
+SEARCH_PRODUCT_REFRESH_SECONDS.
+"""
+import heapq
+import math
+import re
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from threading import Lock
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.product import Product
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+NAME_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.5
+FUZZY_MIN_LENGTH = 3
+FUZZY_THRESHOLD = 0.5  # minimum trigram (Dice) similarity for a misspelt word
+FUZZY_WEIGHT = 0.5  # a fuzzy match scores at most half an exact one
+SALES_BOOST = 0.5  # best seller's score is multiplied by 1 + SALES_BOOST
+CHANGE_MARGIN = timedelta(minutes=1)  # edits stamped before a refresh but committed after it
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def trigrams(token: str) -> frozenset[str]:
+    padded = f"  {token} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@dataclass(frozen=True, slots=True)
+class SearchEntry:
+    id: int
+    product_id: str
+    name: str
+    category: str | None
+    selling_price: float
+    tokens: dict[str, float]  # token -> field weight
+
+
+@dataclass
+class SearchHit:
+    entry: SearchEntry
+    score: float
+
+
+def make_entry(pk: int, product_id: str, name: str, category: str | None, selling_price) -> SearchEntry:
+    tokens = dict.fromkeys(tokenize(category), CATEGORY_WEIGHT)
+    tokens.update(dict.fromkeys(tokenize(name) + tokenize(product_id), NAME_WEIGHT))
+    return SearchEntry(
+        id=pk,
+        product_id=product_id,
+        name=name,
+        category=category,
+        selling_price=float(selling_price),
+        tokens=tokens
+    )
+
+
+class ProductSearchIndex:
+
+    def __init__(self):
+        self._lock = Lock()
+        self._reset()
+
+    def _reset(self):
+        self._entries: dict[int, SearchEntry] = {}
+        self._postings: dict[str, dict[int, float]] = {}  # token -> {Product.id: weight}
+        self._sorted_tokens: list[str] = []
+        self._word_grams: dict[str, set[str]] = {}  # trigram -> words (codes are prefix-only)
+        self._boost: dict[int, float] = {}
+        self._sales: dict[int, int] = {}
+        self._sales_norm = 1.0
+        self._sales_loaded_at = 0.0
+        self._max_id = 0
+        self._changed_since: datetime | None = None  # re-read products updated from here on
+        self._changes_loaded_at = 0.0
+        self._built = False
+
+    # ---------- maintenance ----------
+
+    def _add(self, entry: SearchEntry, keep_sorted: bool = True):
+        self._entries[entry.id] = entry
+        for token, weight in entry.tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if keep_sorted:
+                    insort(self._sorted_tokens, token)
+                if token.isalpha() and len(token) >= FUZZY_MIN_LENGTH:
+                    for gram in trigrams(token):
+                        self._word_grams.setdefault(gram, set()).add(token)
+            postings[entry.id] = weight
+
+    def _remove(self, pk: int):
+        entry = self._entries.pop(pk, None)
+        if entry is None:
+            return
+        for token in entry.tokens:
+            postings = self._postings[token]
+            del postings[pk]
+            if not postings:
+                del self._postings[token]
+                del self._sorted_tokens[bisect_left(self._sorted_tokens, token)]
+                for gram in trigrams(token):
+                    self._word_grams.get(gram, set()).discard(token)
+
+    def upsert(self, product: Product):
+        """Index a created or updated product (call after commit)"""
+        entry = make_entry(product.id, product.product_id, product.name, product.category, product.selling_price)
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(entry.id)
+            self._add(entry)
+
+    def _set_boosts(self):
+        self._sales_norm = max((math.log1p(q) for q in self._sales.values()), default=1.0) or 1.0
+        self._boost = {
+            pk: 1 + SALES_BOOST * math.log1p(quantity) / self._sales_norm
+            for pk, quantity in self._sales.items()
+        }
+
+    def record_sales(self, quantities: dict[int, int]):
+        """Add just-confirmed quantities ({Product.id: qty}) to the sales boost"""
+        with self._lock:
+            for pk, quantity in quantities.items():
+                self._sales[pk] = self._sales.get(pk, 0) + quantity
+            if any(math.log1p(self._sales[pk]) > self._sales_norm for pk in quantities):
+                self._set_boosts()
+            else:
+                for pk in quantities:
+                    self._boost[pk] = 1 + SALES_BOOST * math.log1p(self._sales[pk]) / self._sales_norm
+
+    def _add_products(self, rows):
+        bulk = not self._built
+        for row in rows:
+            # Another sync may have indexed these while we were reading
+            if bulk or row.id > self._max_id:
+                self._remove(row.id)  # upserted by this process already
+                self._add(make_entry(*row), keep_sorted=not bulk)
+                self._max_id = max(self._max_id, row.id)
+        if bulk:
+            self._sorted_tokens = sorted(self._postings)
+            self._built = True
+
+    def _update_products(self, rows):
+        for row in rows:
+            self._remove(row.id)
+            self._add(make_entry(*row))
+
+    def _sync(self, db: Session):
+        """
+        Index products added by imports or other workers since the last sync,
+        and re-read changed products and the sales boost when due. The queries
+        run without holding the lock: under AsyncSession.run_sync they yield to
+        the event loop, and a second request blocking on the lock would stall
+        the loop.
+        """
+        columns = (Product.id, Product.product_id, Product.name, Product.category, Product.selling_price)
+        started = datetime.utcnow()
+        built = self._built
+        rows = db.execute(
+            select(*columns).where(Product.id > (self._max_id if built else 0)).order_by(Product.id)
+        ).all()
+
+        changed = None
+        if built and time.monotonic() - self._changes_loaded_at > settings.SEARCH_PRODUCT_REFRESH_SECONDS:
+            changed = db.execute(select(*columns).where(Product.updated_at >= self._changed_since)).all()
+
+        sales = None
+        if time.monotonic() - self._sales_loaded_at > settings.SEARCH_SALES_REFRESH_SECONDS:
+            since = datetime.utcnow() - timedelta(days=settings.SEARCH_SALES_WINDOW_DAYS)
+            sales = db.execute(
+                select(InvoiceItem.product_id, func.sum(InvoiceItem.quantity))
+                .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+                .where(Invoice.created_at >= since)
+                .group_by(InvoiceItem.product_id)
+            ).all()
+
+        with self._lock:
+            self._add_products(rows)
+            if changed is not None:
+                self._update_products(changed)
+            if changed is not None or not built:
+                self._changed_since = started - CHANGE_MARGIN
+                self._changes_loaded_at = time.monotonic()
+            if sales is not None:
+                self._sales = {pk: int(quantity) for pk, quantity in sales}
+                self._set_boosts()
+                self._sales_loaded_at = time.monotonic()
+
+    def rebuild(self, db: Session):
+        with self._lock:
+            self._reset()
+        self._sync(db)
+
+    # ---------- queries ----------
+
+    def _expand(self, term: str) -> dict[str, float]:
+        """Vocabulary tokens a query term matches, with a match score in (0, 1]"""
+        matches = {}
+        tokens = self._sorted_tokens
+        position = bisect_left(tokens, term)
+        while position < len(tokens) and tokens[position].startswith(term):
+            token = tokens[position]
+            matches[token] = 1.0 if token == term else 0.6 + 0.4 * len(term) / len(token)
+            position += 1
+
+        if matches or len(term) < FUZZY_MIN_LENGTH:
+            return matches
+
+        # No prefix match: treat the term as a misspelt word
+        term_grams = trigrams(term)
+        candidates = set()
+        for gram in term_grams:
+            candidates |= self._word_grams.get(gram, set())
+        for token in candidates:
+            token_grams = trigrams(token)
+            similarity = 2 * len(term_grams & token_grams) / (len(term_grams) + len(token_grams))
+            if similarity >= FUZZY_THRESHOLD:
+                matches[token] = FUZZY_WEIGHT * similarity
+        return matches
+
+    def _term_scores(self, matches: dict[str, float], within: dict[int, float] | None) -> dict[int, float]:
+        """Best score per product for one term, optionally restricted to products already matched"""
+        scores: dict[int, float] = {}
+        for token, match in matches.items():
+            for pk, weight in self._postings[token].items():
+                if within is not None and pk not in within:
+                    continue
+                score = match * weight
+                if score > scores.get(pk, 0.0):
+                    scores[pk] = score
+        return scores
+
+    def _top_scores(self, matches: dict[str, float], limit: int) -> dict[int, float]:
+        """
+        Single-term query: scan tokens from best match down and stop once no
+        product under the remaining tokens could reach the current top `limit`.
+        """
+        scores: dict[int, float] = {}
+        ceiling = NAME_WEIGHT * (1 + SALES_BOOST)
+        for token, match in sorted(matches.items(), key=lambda item: -item[1]):
+            if len(scores) >= limit:
+                boost = self._boost
+                kth = heapq.nlargest(limit, (score * boost.get(pk, 1.0) for pk, score in scores.items()))[-1]
+                if match * ceiling < kth:
+                    break
+            for pk, weight in self._postings[token].items():
+                score = match * weight
+                if score > scores.get(pk, 0.0):
+                    scores[pk] = score
+        return scores
+
+    def search(self, db: Session, query: str, limit: int = 20) -> list[SearchHit]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        self._sync(db)
+        with self._lock:
+            expanded = [self._expand(term) for term in terms]
+            # Start from the most selective term so later terms only probe survivors
+            expanded.sort(key=lambda matches: sum(len(self._postings[token]) for token in matches))
+
+            if len(expanded) == 1:
+                totals = self._top_scores(expanded[0], limit)
+            else:
+                totals = None
+                for matches in expanded:
+                    scores = self._term_scores(matches, totals)
+                    totals = scores if totals is None else {pk: totals[pk] + score for pk, score in scores.items()}
+                    if not totals:
+                        return []
+
+            boost = self._boost
+            best = heapq.nlargest(
+                limit,
+                totals.items(),
+                key=lambda item: (item[1] * boost.get(item[0], 1.0), -item[0])
+            )
+            return [
+                SearchHit(self._entries[pk], total / len(terms) * boost.get(pk, 1.0))
+                for pk, total in best
+            ]
+
+    def stats(self) -> dict:
+        return {
+            "products": len(self._entries),
+            "tokens": len(self._sorted_tokens),
+            "products_with_sales": len(self._sales)
+        }
+
+
+product_search = ProductSearchIndex()
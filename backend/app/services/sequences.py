@@ -0,0 +1,259 @@
+from datetime import date
+from threading import Lock
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.clock import business_day
+from app.core.config import settings
+from app.models.invoice import Invoice
+from app.models.product import Product
+from app.models.sequence import InvoiceSequence, ProductIdSequence
+
+
+def sequence_outlet(outlet_id: int | None) -> int:
+    """Counter scope for an outlet (0 = one shared counter)"""
+    if settings.INVOICE_SEQUENCE_PER_OUTLET:
+        return outlet_id or 0
+    return 0
+
+
+def invoice_number_prefix(day: date, outlet_scope: int) -> str:
+    if outlet_scope:
+        return f"{settings.INVOICE_NUMBER_PREFIX}{day:%Y%m%d}{outlet_scope:03d}"
+    return f"{settings.INVOICE_NUMBER_PREFIX}{day:%Y%m%d}"
+
+
+def format_invoice_number(day: date, outlet_scope: int, value: int) -> str:
+    return f"{invoice_number_prefix(day, outlet_scope)}{value:04d}"
+
+
+def _highest_existing(db: Session, day: date, outlet_scope: int) -> int:
+    """Highest sequence already used for this day (only read when a day's counter is first created)"""
+    prefix = invoice_number_prefix(day, outlet_scope)
+    numbers = db.scalars(
+        select(Invoice.invoice_number).where(
+            Invoice.invoice_number >= prefix,
+            Invoice.invoice_number < prefix + "~"
+        )
+    )
+    suffixes = [int(n[len(prefix):]) for n in numbers if n[len(prefix):].isdigit()]
+    return max(suffixes, default=0)
+
+
+def _reserve(db: Session, model, keys: dict, count: int, highest_existing) -> range:
+    """
+    Reserve `count` consecutive values of the counter row identified by `keys`
+    with one UPDATE ... RETURNING. Runs in the caller's transaction, so the
+    reservation rolls back with it. A missing row is created, starting after
+    highest_existing().
+    """
+    bump = (
+        update(model)
+        .where(*(getattr(model, column) == value for column, value in keys.items()))
+        .values(last_value=model.last_value + count)
+        .returning(model.last_value)
+    )
+
+    last = db.scalar(bump)
+    if last is None:
+        try:
+            with db.begin_nested():
+                last = highest_existing() + count
+                db.add(model(**keys, last_value=last))
+        except IntegrityError:
+            # Another request created the counter first
+            last = db.scalar(bump)
+
+    return range(last - count + 1, last + 1)
+
+
+def reserve_sequence(db: Session, day: date, outlet_scope: int, count: int = 1) -> range:
+    """Reserve `count` consecutive invoice sequence values for a day and outlet scope"""
+    return _reserve(
+        db,
+        InvoiceSequence,
+        {"prefix": settings.INVOICE_NUMBER_PREFIX, "day": day, "outlet_id": outlet_scope},
+        count,
+        lambda: _highest_existing(db, day, outlet_scope)
+    )
+
+
+class InvoiceNumberAllocator:
+    """
+    Hands out invoice numbers. With a block size of 1 every number is reserved
+    inside the confirm transaction (gapless). Larger blocks are reserved in
+    their own short transaction and served from memory; unused numbers are
+    skipped after a restart.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._blocks: dict[tuple[date, int], range] = {}
+        self._lock = Lock()
+
+    def next_number(self, db: Session, outlet_id: int | None) -> str:
+        """
+        Next invoice number for an outlet. Call it before the transaction's
+        first write: a block is reserved and committed on another connection.
+        """
+        day = business_day()
+        outlet_scope = sequence_outlet(outlet_id)
+
+        if self.block_size <= 1:
+            value = reserve_sequence(db, day, outlet_scope)[0]
+            return format_invoice_number(day, outlet_scope, value)
+
+        key = (day, outlet_scope)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block:
+                self._blocks[key] = block[1:]
+                return format_invoice_number(day, outlet_scope, block[0])
+
+        # Reserve without holding the lock: under AsyncSession.run_sync the
+        # write yields to the event loop, where another request would block on it
+        with Session(bind=db.get_bind()) as block_db:
+            block = reserve_sequence(block_db, day, outlet_scope, self.block_size)
+            block_db.commit()
+
+        with self._lock:
+            # Drop blocks left over from previous days
+            self._blocks = {k: rest for k, rest in self._blocks.items() if k[0] == day}
+            # If a concurrent request refilled first, the rest of this block is skipped
+            if not self._blocks.get(key):
+                self._blocks[key] = block[1:]
+
+        return format_invoice_number(day, outlet_scope, block[0])
+
+
+invoice_numbers = InvoiceNumberAllocator(settings.INVOICE_NUMBER_BLOCK_SIZE)
+
+
+# ==================== PRODUCT IDS ====================
+
+def product_id_prefix(cost_bucket: int) -> str:
+    return f"SPN{cost_bucket:04d}"
+
+
+def _sequence_number(value: int) -> int:
+    """
+    The sequence number a counter value is printed as. Numbers whose 4-digit
+    form would read as another product's 90nn / 990n sequence (9010-9099 and
+    9901-9909, the forms of 10-99 and 1-9) are skipped.
+    """
+    if value >= 9010:
+        value += 90
+    if value >= 9901:
+        value += 9
+    return value
+
+
+def format_product_id(cost_bucket: int, value: int) -> str:
+    """SPN + 4-digit cost + sequence (990n / 90nn / 0nnn / nnnn) for a counter value"""
+    number = _sequence_number(value)
+    if 1 <= number <= 9:
+        sequence = f"990{number}"
+    elif 10 <= number <= 99:
+        sequence = f"90{number:02d}"
+    elif 100 <= number <= 999:
+        sequence = f"0{number:03d}"
+    else:
+        sequence = f"{number:04d}"
+
+    return f"{product_id_prefix(cost_bucket)}{sequence}"
+
+
+def parse_product_sequence(sequence: str) -> int:
+    """
+    The counter value a sequence was allocated from (inverse of
+    format_product_id). Four-digit sequences follow the fixed layout: 990n
+    is 1-9 and 90nn is 10-99, so 9900 and 9000-9009, which those forms
+    never produce, are the plain numbers of a full legacy bucket.
+    """
+    if len(sequence) == 4 and sequence.startswith("990") and sequence != "9900":
+        return int(sequence[3])
+    if len(sequence) == 4 and sequence.startswith("90") and int(sequence[2:]) >= 10:
+        return int(sequence[2:])
+    number = int(sequence)  # 0nnn, or nnnn (and longer) from 1000 on
+    if number >= 9910:
+        return number - 99
+    if number >= 9100:
+        return number - 90
+    return number
+
+
+def _highest_product_sequence(db: Session, cost_bucket: int) -> int:
+    """Highest sequence already used in a cost bucket (only read when its counter is first created)"""
+    prefix = product_id_prefix(cost_bucket)
+    product_ids = db.scalars(
+        select(Product.product_id).where(
+            Product.product_id >= prefix,
+            Product.product_id < prefix + "~"
+        )
+    )
+    sequences = [
+        parse_product_sequence(pid[len(prefix):])
+        for pid in product_ids
+        if len(pid) - len(prefix) >= 4 and pid[len(prefix):].isdigit()
+    ]
+    return max(sequences, default=0)
+
+
+def reserve_product_ids(db: Session, cost_price: float, count: int = 1) -> list[str]:
+    """Allocate `count` new SPN Product IDs for a cost price in one write"""
+    cost_bucket = int(cost_price)
+    values = _reserve(
+        db,
+        ProductIdSequence,
+        {"cost_bucket": cost_bucket},
+        count,
+        lambda: _highest_product_sequence(db, cost_bucket)
+    )
+    return [format_product_id(cost_bucket, value) for value in values]
+
+
+def reserve_product_id_blocks(db: Session, counts: dict[int, int]) -> dict[int, list[str]]:
+    """
+    Allocate IDs for many cost buckets at once ({cost_bucket: count}).
+    Existing counters are bumped with one UPDATE; new buckets are seeded and
+    inserted in one executemany.
+    """
+    if not counts:
+        return {}
+
+    bumped = db.execute(
+        update(ProductIdSequence)
+        .where(ProductIdSequence.cost_bucket.in_(counts.keys()))
+        .values(last_value=ProductIdSequence.last_value + case(counts, value=ProductIdSequence.cost_bucket))
+        .returning(ProductIdSequence.cost_bucket, ProductIdSequence.last_value)
+        .execution_options(synchronize_session=False)
+    ).all()
+    last_values = dict(bumped)
+
+    missing = [bucket for bucket in counts if bucket not in last_values]
+    if missing:
+        new_rows = {
+            bucket: _highest_product_sequence(db, bucket) + counts[bucket]
+            for bucket in missing
+        }
+        try:
+            with db.begin_nested():
+                db.execute(insert(ProductIdSequence), [
+                    {"cost_bucket": bucket, "last_value": last} for bucket, last in new_rows.items()
+                ])
+            last_values.update(new_rows)
+        except IntegrityError:
+            # Raced with another writer: fall back to one bucket at a time
+            for bucket in missing:
+                last_values[bucket] = _reserve(
+                    db,
+                    ProductIdSequence,
+                    {"cost_bucket": bucket},
+                    counts[bucket],
+                    lambda: _highest_product_sequence(db, bucket)
+                )[-1]
+
+    return {
+        bucket: [format_product_id(bucket, value) for value in range(last_values[bucket] - count + 1, last_values[bucket] + 1)]
+        for bucket, count in counts.items()
+    }
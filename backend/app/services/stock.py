@@ -0,0 +1,314 @@
+import json
+from typing import AsyncIterator, Iterator
+from sqlalchemy import Select, and_, case, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.outlet import Outlet, OutletStockSummary
+from app.models.product import Product
+from app.models.stock import Stock
+
+
+class InsufficientStockError(Exception):
+    """Raised when one or more cart lines can't be reserved from outlet stock"""
+
+    def __init__(self, shortages: list[tuple[str, int, int]]):
+        # (product name, available, requested) for every line that failed
+        self.shortages = shortages
+        super().__init__("; ".join(
+            f"Insufficient stock for {name}. Available: {available}, Requested: {requested}"
+            for name, available, requested in shortages
+        ))
+
+
+def load_stock(db: Session, product_pks: list[int], outlet_id: int | None) -> dict[int, Stock]:
+    """Fetch stock rows for the given products at one outlet in one query"""
+    if not product_pks:
+        return {}
+    rows = db.scalars(
+        select(Stock).where(
+            Stock.product_id.in_(set(product_pks)),
+            Stock.outlet_id == outlet_id
+        )
+    )
+    stock: dict[int, Stock] = {}
+    for row in rows:
+        stock.setdefault(row.product_id, row)
+    return stock
+
+
+def reserve_stock(db: Session, outlet_id: int | None, requested: dict[int, int]) -> dict[int, int]:
+    """
+    Decrement stock for a whole cart with one conditional UPDATE:
+    quantity = quantity - q WHERE quantity >= q, per product.
+    Returns the new quantity per reserved Product.id; any requested product
+    missing from the result could not be reserved (the caller must roll back).
+    """
+    if not requested:
+        return {}
+
+    quantity = case(requested, value=Stock.product_id)
+    reserved = db.execute(
+        update(Stock)
+        .where(
+            Stock.outlet_id == outlet_id,
+            Stock.product_id.in_(requested.keys()),
+            Stock.quantity >= quantity
+        )
+        .values(quantity=Stock.quantity - quantity)
+        .returning(Stock.product_id, Stock.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    return dict(reserved)
+
+
+def deduct_stock(db: Session, outlet_id: int | None, sold: dict[int, int]) -> dict[int, int]:
+    """
+    Decrement stock for goods that have already left the shelf (offline
+    invoices being synced), with no availability check: the quantity goes
+    below zero when the outlet sold more than the central books knew about.
+    Returns the new quantity per Product.id that has a stock row at the outlet.
+    """
+    if not sold:
+        return {}
+
+    quantity = case(sold, value=Stock.product_id)
+    deducted = db.execute(
+        update(Stock)
+        .where(Stock.outlet_id == outlet_id, Stock.product_id.in_(sold.keys()))
+        .values(quantity=Stock.quantity - quantity)
+        .returning(Stock.product_id, Stock.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    return dict(deducted)
+
+
+# Manual stock writes. Each reads the row it changes inside the caller's
+# transaction (run them through write_queue.run), so concurrent edits of the
+# same row can't overwrite each other.
+
+def add_stock(db: Session, product_pk: int, outlet_id: int | None, quantity: int) -> Stock:
+    """Add quantity to a product's stock at an outlet, creating the row if there is none"""
+    min_stock = db.scalar(select(Product.min_stock).where(Product.id == product_pk))
+    stock = db.scalars(
+        select(Stock)
+        .where(Stock.product_id == product_pk, Stock.outlet_id == outlet_id)
+        .execution_options(populate_existing=True)
+    ).first()
+
+    old_quantity = stock.quantity if stock else None
+    if stock:
+        stock.quantity += quantity
+    else:
+        stock = Stock(product_id=product_pk, outlet_id=outlet_id, quantity=quantity)
+        db.add(stock)
+    db.flush()
+
+    adjust_outlet_summary(db, outlet_id, *stock_change_delta(old_quantity, stock.quantity, min_stock))
+    return stock
+
+
+def set_stock_quantity(db: Session, stock_id: int, quantity: int) -> Stock | None:
+    """Overwrite a stock row's quantity; None if the row doesn't exist"""
+    stock = db.get(Stock, stock_id, populate_existing=True)
+    if stock is None:
+        return None
+
+    min_stock = db.scalar(select(Product.min_stock).where(Product.id == stock.product_id))
+    old_quantity = stock.quantity
+    stock.quantity = quantity
+    db.flush()
+
+    adjust_outlet_summary(db, stock.outlet_id, *stock_change_delta(old_quantity, quantity, min_stock))
+    return stock
+
+
+def delete_stock(db: Session, stock_id: int) -> bool:
+    """Delete a stock row; False if it doesn't exist"""
+    stock = db.get(Stock, stock_id, populate_existing=True)
+    if stock is None:
+        return False
+
+    min_stock = db.scalar(select(Product.min_stock).where(Product.id == stock.product_id))
+    db.delete(stock)
+    db.flush()
+
+    adjust_outlet_summary(db, stock.outlet_id, *stock_change_delta(stock.quantity, None, min_stock))
+    return True
+
+
+def low_stock_query(
+    outlet_id: int | None = None,
+    after_shortage: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = None
+) -> Select:
+    """
+    Stock rows below their product's min_stock, most severe shortage first.
+    Keyset pagination continues after (after_shortage, after_id) of the previous page's last row;
+    raises ValueError if only one of the two is given.
+    """
+    if (after_shortage is None) != (after_id is None):
+        raise ValueError("after_shortage and after_id must be given together")
+
+    shortage = (Product.min_stock - Stock.quantity).label("shortage")
+
+    query = (
+        select(
+            Stock.id.label("stock_id"),
+            Product.product_id,
+            Product.name.label("product_name"),
+            Stock.quantity.label("current_quantity"),
+            Product.min_stock,
+            func.coalesce(Outlet.name, "Godown").label("outlet_name"),
+            shortage
+        )
+        .join(Product, Product.id == Stock.product_id)
+        .outerjoin(Outlet, Outlet.id == Stock.outlet_id)
+        .where(Stock.quantity < Product.min_stock)
+        .order_by(shortage.desc(), Stock.id)
+    )
+
+    if outlet_id:
+        query = query.where(Stock.outlet_id == outlet_id)
+
+    if after_id is not None:
+        query = query.where(or_(
+            shortage < after_shortage,
+            and_(shortage == after_shortage, Stock.id > after_id)
+        ))
+
+    if limit:
+        query = query.limit(limit)
+
+    return query
+
+
+def stream_json_rows(db: Session, query: Select, batch_size: int = 1000) -> Iterator[bytes]:
+    """Stream a query's rows as a JSON array, fetching batch_size rows at a time"""
+    yield b"["
+    first = True
+    for partition in db.execute(query.execution_options(yield_per=batch_size)).mappings().partitions():
+        body = ",".join(json.dumps(dict(row), default=str) for row in partition)
+        yield (body if first else "," + body).encode()
+        first = False
+    yield b"]"
+
+
+async def stream_json_rows_async(db: AsyncSession, query: Select, batch_size: int = 1000) -> AsyncIterator[bytes]:
+    """stream_json_rows for an AsyncSession"""
+    yield b"["
+    first = True
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for partition in result.mappings().partitions():
+        body = ",".join(json.dumps(dict(row), default=str) for row in partition)
+        yield (body if first else "," + body).encode()
+        first = False
+    yield b"]"
+
+
+# ==================== OUTLET SUMMARIES ====================
+
+def stock_change_delta(old_quantity: int | None, new_quantity: int | None, min_stock: int) -> tuple[int, int, int]:
+    """
+    (products, quantity, low_stock) summary delta for one stock row changing
+    from old_quantity to new_quantity (None = row doesn't exist)
+    """
+    products = (new_quantity is not None) - (old_quantity is not None)
+    quantity = (new_quantity or 0) - (old_quantity or 0)
+    low = (new_quantity is not None and new_quantity < min_stock) - (old_quantity is not None and old_quantity < min_stock)
+    return products, quantity, low
+
+
+def compute_outlet_summaries(db: Session, outlet_ids: list[int] | None = None) -> dict[int, tuple[int, int, int]]:
+    """Full recompute from stock rows: {outlet_id: (total_products, total_quantity, low_stock_count)}"""
+    query = (
+        select(
+            Stock.outlet_id,
+            func.count(Stock.id),
+            func.coalesce(func.sum(Stock.quantity), 0),
+            func.coalesce(func.sum(case((Stock.quantity < Product.min_stock, 1), else_=0)), 0)
+        )
+        .join(Product, Product.id == Stock.product_id)
+        .where(Stock.outlet_id.is_not(None))
+        .group_by(Stock.outlet_id)
+    )
+    if outlet_ids is not None:
+        query = query.where(Stock.outlet_id.in_(outlet_ids))
+
+    return {outlet_id: (products, quantity, low) for outlet_id, products, quantity, low in db.execute(query)}
+
+
+def set_outlet_summaries(db: Session, outlet_ids: list[int]):
+    """Overwrite the summaries of the given outlets with a full recompute"""
+    totals = compute_outlet_summaries(db, outlet_ids)
+    for outlet_id in outlet_ids:
+        products, quantity, low = totals.get(outlet_id, (0, 0, 0))
+        db.merge(OutletStockSummary(
+            outlet_id=outlet_id,
+            total_products=products,
+            total_quantity=quantity,
+            low_stock_count=low
+        ))
+    db.flush()
+
+
+def adjust_outlet_summary(db: Session, outlet_id: int | None, products: int = 0, quantity: int = 0, low: int = 0):
+    """
+    Apply a delta to an outlet's summary inside the caller's transaction.
+    Call after the stock change has been flushed.
+    """
+    if outlet_id is None or not (products or quantity or low):
+        return
+
+    bump = (
+        update(OutletStockSummary)
+        .where(OutletStockSummary.outlet_id == outlet_id)
+        .values(
+            total_products=OutletStockSummary.total_products + products,
+            total_quantity=OutletStockSummary.total_quantity + quantity,
+            low_stock_count=OutletStockSummary.low_stock_count + low
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(bump).rowcount:
+        return
+
+    # No summary row yet: materialise it from the rows (which already include this change)
+    try:
+        with db.begin_nested():
+            set_outlet_summaries(db, [outlet_id])
+    except IntegrityError:
+        db.execute(bump)
+
+
+def outlets_stocking(db: Session, product_pk: int) -> list[int]:
+    return list(db.scalars(
+        select(Stock.outlet_id).where(Stock.product_id == product_pk, Stock.outlet_id.is_not(None)).distinct()
+    ))
+
+
+def rebuild_outlet_summaries(db: Session, apply: bool = True) -> list[tuple[int, tuple | None, tuple]]:
+    """
+    Verify every outlet summary against a full recompute.
+    Returns (outlet_id, stored, actual) for each mismatch and, if apply, repairs them.
+    """
+    actual = compute_outlet_summaries(db)
+    stored = {
+        row.outlet_id: (row.total_products, row.total_quantity, row.low_stock_count)
+        for row in db.scalars(select(OutletStockSummary))
+    }
+
+    mismatches = []
+    for outlet_id in db.scalars(select(Outlet.id).order_by(Outlet.id)):
+        expected = actual.get(outlet_id, (0, 0, 0))
+        if stored.get(outlet_id) != expected:
+            mismatches.append((outlet_id, stored.get(outlet_id), expected))
+
+    if apply and mismatches:
+        set_outlet_summaries(db, [outlet_id for outlet_id, _, _ in mismatches])
+        db.commit()
+
+    return mismatches
@@ -0,0 +1,151 @@
+"""
+Load test of the billing API at 200 and 1000 concurrent tills: every till
+previews and then confirms a few carts over HTTP (httpx + ASGI transport, no
+sockets). The async routes (AsyncSession, pooled) run against sync `def`
+twins built from the same services, which FastAPI runs in its threadpool.
+Reports requests/second, latency percentiles and failed requests.
+
+    python -m benchmarks.bench_async_load [carts_per_till]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, status
+from sqlalchemy.orm import Session
+from app.api.v1.routes_billing import router as billing_router
+from app.core.config import settings
+from app.db.session import get_async_db, run_in_transaction
+from app.models.product import Product
+from app.schemas.invoice import InvoiceConfirmRequest, InvoiceItemInput
+from app.services.billing import book_invoice
+from app.services.catalog_cache import catalog_cache
+from app.services.offers import offer_book
+from app.services.pricing import price_cart
+from app.services.stock import InsufficientStockError
+from benchmarks.common import make_async_session_factory, make_session_factory, seed_catalog
+
+N_PRODUCTS = 500
+CONCURRENCY = (200, 1000)
+
+
+def async_app(AsyncSessionLocal) -> FastAPI:
+    app = FastAPI()
+    app.include_router(billing_router)
+
+    async def get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = get_db
+    return app
+
+
+def sync_app(SessionLocal) -> FastAPI:
+    """The same two endpoints as plain `def` routes on a sync Session"""
+    app = FastAPI()
+
+    def get_db():
+        with SessionLocal() as db:
+            yield db
+
+    @app.post("/billing/preview")
+    def preview(items: list[InvoiceItemInput], db: Session = Depends(get_db)):
+        cart = price_cart(db, items)
+        return {"final_total": cart.final_total}
+
+    @app.post("/billing/confirm", status_code=status.HTTP_201_CREATED)
+    def confirm(request: InvoiceConfirmRequest, db: Session = Depends(get_db)):
+        try:
+            invoice, _ = run_in_transaction(db, lambda db: book_invoice(db, request))
+        except InsufficientStockError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return {"invoice_number": invoice.invoice_number}
+
+    return app
+
+
+async def run_tills(app: FastAPI, tills: int, carts_per_till: int, product_ids: list[str]) -> dict:
+    latencies, failures = [], Counter()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    transport = httpx.ASGITransport(app=app)
+
+    async def call(client, path, payload):
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, json=payload)
+            if response.status_code >= 300:
+                failures[str(response.status_code)] += 1
+        except Exception as e:
+            failures[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - start)
+
+    async def till(client, seed: int):
+        rng = random.Random(seed)
+        for _ in range(carts_per_till):
+            items = [
+                {"product_id": product_id, "quantity": rng.randint(1, 3)}
+                for product_id in rng.sample(product_ids, rng.randint(1, 6))
+            ]
+            await call(client, "/billing/preview", items)
+            await call(client, "/billing/confirm", {"outlet_id": 1, "items": items})
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(till(client, seed) for seed in range(tills)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "failed": sum(failures.values()),
+        "failures": dict(failures),
+    }
+
+
+def run(mode: str, tills: int, carts_per_till: int) -> dict:
+    catalog_cache.clear()
+    offer_book.invalidate()
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        engine, SessionLocal = make_session_factory(url)
+        with SessionLocal() as db:
+            seed_catalog(db, N_PRODUCTS)
+            product_ids = [row[0] for row in db.query(Product.product_id)]
+
+        if mode == "sync":
+            result = asyncio.run(run_tills(sync_app(SessionLocal), tills, carts_per_till, product_ids))
+        else:
+            async def async_run():
+                async_engine, AsyncSessionLocal = make_async_session_factory(url)
+                try:
+                    return await run_tills(async_app(AsyncSessionLocal), tills, carts_per_till, product_ids)
+                finally:
+                    await async_engine.dispose()
+
+            result = asyncio.run(async_run())
+        engine.dispose()
+    return result
+
+
+def main():
+    carts_per_till = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"pool_size={settings.DB_POOL_SIZE} max_overflow={settings.DB_MAX_OVERFLOW}, {carts_per_till} carts/till")
+    print(f"{'tills':>6} {'routes':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    for tills in CONCURRENCY:
+        for mode in ("sync", "async"):
+            r = run(mode, tills, carts_per_till)
+            print(
+                f"{tills:>6} {mode:>7} {r['rps']:>8.0f} {r['p50'] * 1000:>8.0f} {r['p99'] * 1000:>8.0f} "
+                f"{r['failed']:>7} {r['failures'] or ''}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Per-cart latency and query count of the batched pricing engine (cold and
+warm catalog cache) vs. the old per-line lookups, for growing cart sizes.
+
+    python -m benchmarks.bench_cart_pricing
+"""
+from datetime import date
+from app.models.product import Product
+from app.models.offer import Offer
+from app.models.stock import Stock
+from app.schemas.invoice import InvoiceItemInput
+from app.services.catalog_cache import catalog_cache, OfferSnapshot, ProductSnapshot
+from app.services.offers import OfferBook, compile_offer, offer_book
+from app.services.pricing import price_cart, price_line
+from app.services.stock import load_stock
+from benchmarks.common import make_session_factory, QueryCounter, timer, seed_catalog
+
+N_PRODUCTS = 5_000
+REPEAT = 50
+
+
+def price_cart_per_line(db, items, outlet_id):
+    """The pre-engine access pattern: product, offer and stock queried line by line"""
+    today = date.today()
+    for item in items:
+        product = ProductSnapshot.from_model(db.query(Product).filter(Product.product_id == item.product_id).first())
+        offer = db.query(Offer).filter(
+            Offer.product_id == product.id,
+            Offer.is_active == True,
+            Offer.start_date <= today,
+            Offer.end_date >= today
+        ).first()
+        db.query(Stock).filter(Stock.product_id == product.id, Stock.outlet_id == outlet_id).first()
+        book = OfferBook(today, [compile_offer(OfferSnapshot.from_model(offer))] if offer else [])
+        price_line(product, item.quantity, book.evaluate([(product, item.quantity)])[0])
+
+
+def price_cart_batched(db, items, outlet_id):
+    cart = price_cart(db, items)
+    load_stock(db, list(cart.requested_quantities()), outlet_id)
+
+
+def price_cart_cold(db, items, outlet_id):
+    catalog_cache.clear()
+    offer_book.invalidate()
+    price_cart_batched(db, items, outlet_id)
+
+
+def main():
+    engine, SessionLocal = make_session_factory()
+    counter = QueryCounter(engine)
+    with SessionLocal() as db:
+        seed_catalog(db, N_PRODUCTS)
+        product_ids = [row[0] for row in db.query(Product.product_id).order_by(Product.id)]
+
+    print(f"{'lines':>6} {'per-line ms':>12} {'queries':>8} {'cold ms':>8} {'queries':>8} {'warm ms':>8} {'queries':>8}")
+    for n_lines in (1, 5, 10, 20, 40, 80, 160):
+        items = [InvoiceItemInput(product_id=pid, quantity=2) for pid in product_ids[:n_lines]]
+        results = []
+        for fn in (lambda db: price_cart_per_line(db, items, 1),
+                   lambda db: price_cart_cold(db, items, 1),
+                   lambda db: price_cart_batched(db, items, 1)):
+            counter.count = 0
+            with timer() as t:
+                for _ in range(REPEAT):
+                    with SessionLocal() as db:
+                        fn(db)
+            results.append((t["elapsed"] / REPEAT * 1000, counter.count // REPEAT))
+        (slow_ms, slow_q), (cold_ms, cold_q), (warm_ms, warm_q) = results
+        print(f"{n_lines:>6} {slow_ms:>12.2f} {slow_q:>8} {cold_ms:>8.2f} {cold_q:>8} {warm_ms:>8.2f} {warm_q:>8}")
+
+
+if __name__ == "__main__":
+    main()
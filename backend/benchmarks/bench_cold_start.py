@@ -0,0 +1,78 @@
+"""
+Worker cold start against an up-to-date database: the old startup step
+(Base.metadata.create_all, which inspects every table) vs. the schema
+version check. Each run is a fresh interpreter importing app.main.
+
+    python -m benchmarks.bench_cold_start [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+STEPS = ("create_all", "version check")
+
+
+def child(step: str):
+    """One worker boot: import the app, then run the startup schema step"""
+    started = time.perf_counter()
+    from app.main import app  # noqa: F401
+    from app.db.base import Base
+    from app.db.migrations import ensure_schema
+    from app.db.session import engine
+    from benchmarks.common import QueryCounter
+    imported = time.perf_counter()
+    engine.connect().close()  # first connection and its PRAGMAs, the same for both steps
+    connected = time.perf_counter()
+
+    counter = QueryCounter(engine)
+    if step == "create_all":
+        Base.metadata.create_all(bind=engine)
+    else:
+        ensure_schema(engine, auto_migrate=False)
+    done = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "connect_ms": (connected - imported) * 1000,
+        "step_ms": (done - connected) * 1000,
+        "statements": counter.count,
+    }))
+
+
+def boot(step: str, url: str) -> dict:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_cold_start", "--child", step],
+        env=os.environ | {"DATABASE_URL": url}, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings | {"process_ms": (time.perf_counter() - start) * 1000}
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{directory}/cold_start.db"
+        subprocess.run([sys.executable, "manage.py", "migrate"], env=os.environ | {"DATABASE_URL": url},
+                       capture_output=True, check=True)
+
+        print(f"{runs} worker boots per step (medians)")
+        print(f"{'startup step':<16}{'statements':>12}{'step':>10}{'connect':>10}{'imports':>10}{'process':>10}")
+        for step in STEPS:
+            boot(step, url)  # warm the OS file cache
+            samples = [boot(step, url) for _ in range(runs)]
+            median = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+            print(
+                f"{step:<16}{median['statements']:>12.0f}{median['step_ms']:>8.2f}ms{median['connect_ms']:>8.1f}ms"
+                f"{median['import_ms']:>8.0f}ms{median['process_ms']:>8.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2])
+    else:
+        main()
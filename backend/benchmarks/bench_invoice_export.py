@@ -0,0 +1,139 @@
+"""
+Invoice history export: the columnar path (chunked Core reads into Arrow
+record batches, written as a Parquet dataset partitioned by day and outlet)
+vs. the ORM path (load InvoiceItem / Invoice objects, serialize to JSON).
+Each path runs in its own process so peak RSS is comparable.
+
+    python -m benchmarks.bench_invoice_export [n_lines]   (default 5M)
+"""
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app.models.invoice import Invoice, InvoiceItem
+from app.services.invoice_export import write_invoice_dataset
+from benchmarks.common import make_session_factory, seed_catalog, timer
+
+N_PRODUCTS = 5_000
+N_OUTLETS = 10
+N_DAYS = 90
+LINES_PER_INVOICE = 5
+SEED_BATCH = 100_000
+
+
+def seed_invoices(engine, n_lines: int):
+    rng = random.Random(19)
+    start = datetime(2024, 1, 1, 9)
+    n_invoices = n_lines // LINES_PER_INVOICE
+    with engine.begin() as conn:
+        for first in range(1, n_invoices + 1, SEED_BATCH):
+            ids = range(first, min(first + SEED_BATCH, n_invoices + 1))
+            conn.execute(Invoice.__table__.insert(), [
+                {
+                    "id": i,
+                    "invoice_number": f"INV{i:012d}",
+                    "total_amount": 500,
+                    "discount_amount": 25,
+                    "final_amount": 475,
+                    "outlet_id": rng.randint(1, N_OUTLETS),
+                    "created_at": start + timedelta(seconds=i * N_DAYS * 86_400 // n_invoices),
+                }
+                for i in ids
+            ])
+            conn.execute(InvoiceItem.__table__.insert(), [
+                {
+                    "invoice_id": i,
+                    "product_id": rng.randint(1, N_PRODUCTS),
+                    "quantity": 2,
+                    "unit_price": 50,
+                    "discount": 5,
+                    "line_total": 95,
+                    "offer_applied": "10.00% Off" if line == 0 else None,
+                }
+                for i in ids
+                for line in range(LINES_PER_INVOICE)
+            ])
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss survives exec, so a spawned worker would report the seeding parent's peak
+    try:
+        with open("/proc/self/status") as status:
+            return next(int(line.split()[1]) for line in status if line.startswith("VmHWM:")) / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def columnar(url: str, out_dir: str) -> int:
+    engine, SessionLocal = make_session_factory(url)
+    with SessionLocal() as db:
+        return write_invoice_dataset(db, out_dir)
+
+
+def orm(url: str, out_dir: str) -> int:
+    engine, SessionLocal = make_session_factory(url)
+    with SessionLocal() as db:
+        items = db.scalars(select(InvoiceItem).options(joinedload(InvoiceItem.invoice))).all()
+        rows = [
+            {
+                "invoice_number": item.invoice.invoice_number,
+                "created_at": item.invoice.created_at.isoformat(),
+                "outlet_id": item.invoice.outlet_id,
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "unit_price": str(item.unit_price),
+                "discount": str(item.discount),
+                "line_total": str(item.line_total),
+                "offer_applied": item.offer_applied,
+            }
+            for item in items
+        ]
+    with open(os.path.join(out_dir, "invoice_lines.json"), "w") as out:
+        json.dump(rows, out)
+    return len(rows)
+
+
+def measure(path, url: str, out_dir: str, results):
+    with timer() as t:
+        lines = path(url, out_dir)
+    results.put((lines, t["elapsed"], peak_rss_mb()))
+
+
+def dir_size_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files) / 2**20
+
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/history.db"
+        engine, SessionLocal = make_session_factory(url)
+        with SessionLocal() as db:
+            seed_catalog(db, N_PRODUCTS, outlet_ids=tuple(range(1, N_OUTLETS + 1)))
+        with timer() as t_seed:
+            seed_invoices(engine, n_lines)
+        engine.dispose()
+        print(f"Seeded {n_lines} invoice lines in {t_seed['elapsed']:.0f} s ({N_DAYS} days x {N_OUTLETS} outlets)")
+
+        context = multiprocessing.get_context("spawn")
+        print(f"{'path':<22} {'lines':>9} {'seconds':>8} {'lines/s':>10} {'peak RSS MB':>12} {'output MB':>10}")
+        for name, path in (("columnar (parquet)", columnar), ("ORM + JSON", orm)):
+            out_dir = os.path.join(tmp, name.split()[0])
+            os.makedirs(out_dir)
+            results = context.Queue()
+            worker = context.Process(target=measure, args=(path, url, out_dir, results))
+            worker.start()
+            lines, elapsed, rss = results.get()
+            worker.join()
+            print(f"{name:<22} {lines:>9} {elapsed:>8.1f} {lines / elapsed:>10.0f} {rss:>12.0f} {dir_size_mb(out_dir):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
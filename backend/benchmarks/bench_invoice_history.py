@@ -0,0 +1,101 @@
+"""
+Invoice history listing: GET /billing/invoices paged through n invoices
+(selectinload items + joined products, keyset on created_at/id) vs. the
+naive ORM listing that lazy-loads Invoice.items and InvoiceItem.product per
+row. Reports wall time and statements executed.
+
+    python -m benchmarks.bench_invoice_history [n_invoices]
+"""
+import asyncio
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from fastapi import Response
+from sqlalchemy import select
+from app.api.v1.routes_billing import list_invoices
+from app.models.invoice import Invoice, InvoiceItem
+from benchmarks.common import QueryCounter, make_async_session_factory, make_session_factory, seed_catalog, timer
+
+N_PRODUCTS = 2_000
+PAGE_SIZE = 1_000
+
+
+def seed_invoices(db, n_invoices: int):
+    rng = random.Random(20)
+    start = datetime(2024, 1, 1, 9)
+    db.execute(Invoice.__table__.insert(), [
+        {
+            "id": i,
+            "invoice_number": f"INV{i:010d}",
+            "total_amount": 100,
+            "discount_amount": 0,
+            "final_amount": 100,
+            "outlet_id": 1,
+            "created_at": start + timedelta(minutes=i),
+        }
+        for i in range(1, n_invoices + 1)
+    ])
+    db.execute(InvoiceItem.__table__.insert(), [
+        {
+            "invoice_id": i,
+            "product_id": product_id,
+            "quantity": 1,
+            "unit_price": 20,
+            "discount": 0,
+            "line_total": 20,
+        }
+        for i in range(1, n_invoices + 1)
+        for product_id in rng.sample(range(1, N_PRODUCTS + 1), 5)
+    ])
+    db.commit()
+
+
+async def paged(async_engine, AsyncSessionLocal) -> int:
+    listed, cursor = 0, None
+    async with AsyncSessionLocal() as db:
+        while True:
+            response = Response()
+            page = await list_invoices(response, cursor=cursor, limit=PAGE_SIZE, outlet_id=None, start=None, end=None, db=db)
+            listed += len(page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+    await async_engine.dispose()
+    return listed
+
+
+def lazy(SessionLocal) -> int:
+    with SessionLocal() as db:
+        invoices = db.scalars(select(Invoice).order_by(Invoice.created_at.desc(), Invoice.id.desc())).all()
+        for invoice in invoices:
+            for item in invoice.items:
+                item.product.name
+        return len(invoices)
+
+
+def main():
+    n_invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        engine, SessionLocal = make_session_factory(url)
+        with SessionLocal() as db:
+            seed_catalog(db, N_PRODUCTS)
+            seed_invoices(db, n_invoices)
+        async_engine, AsyncSessionLocal = make_async_session_factory(url)
+
+        counters = (QueryCounter(async_engine.sync_engine), QueryCounter(engine))
+        paths = (
+            (f"paged selectinload ({PAGE_SIZE}/page)", lambda: asyncio.run(paged(async_engine, AsyncSessionLocal))),
+            ("lazy-loaded ORM", lambda: lazy(SessionLocal)),
+        )
+        print(f"{'listing':<34} {'invoices':>9} {'ms':>8} {'queries':>8}")
+        for (name, path), counter in zip(paths, counters):
+            with timer() as t:
+                listed = path()
+            print(f"{name:<34} {listed:>9} {t['elapsed'] * 1000:>8.0f} {counter.count:>8}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
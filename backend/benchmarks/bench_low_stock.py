@@ -0,0 +1,69 @@
+"""
+Low-stock report over a synthetic multi-outlet dataset: the old per-row ORM
+traversal vs. the single joined, streamed query.
+
+    python -m benchmarks.bench_low_stock [skus_per_outlet]
+"""
+import random
+import sys
+import tracemalloc
+from app.models.outlet import Outlet
+from app.models.product import Product
+from app.models.stock import Stock
+from app.services.stock import low_stock_query, stream_json_rows
+from benchmarks.common import make_session_factory, QueryCounter, timer
+
+OUTLETS = 20
+
+
+def seed(db, skus: int):
+    rng = random.Random(42)
+    db.add_all([Outlet(id=i, name=f"Outlet {i}") for i in range(1, OUTLETS + 1)])
+    db.execute(Product.__table__.insert(), [
+        {"id": i, "product_id": f"SPN{i:08d}", "name": f"Product {i}", "cost_price": 10,
+         "mrp": 20, "selling_price": 18, "min_stock": rng.choice((5, 10, 20))}
+        for i in range(1, skus + 1)
+    ])
+    db.execute(Stock.__table__.insert(), [
+        {"product_id": i, "outlet_id": outlet, "quantity": rng.randint(0, 60)}
+        for outlet in range(1, OUTLETS + 1)
+        for i in range(1, skus + 1)
+    ])
+    db.commit()
+
+
+def low_stock_orm(db):
+    """The previous implementation: load every Stock row, lazy-load product and outlet"""
+    rows = []
+    for stock in db.query(Stock).all():
+        product = stock.product
+        if stock.quantity < product.min_stock:
+            rows.append((product.product_id, product.name, stock.quantity, product.min_stock,
+                         stock.outlet.name if stock.outlet else "Godown"))
+    return len(rows)
+
+
+def low_stock_sql(db):
+    return sum(len(chunk) for chunk in stream_json_rows(db, low_stock_query()))
+
+
+def main():
+    skus = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    engine, SessionLocal = make_session_factory()
+    counter = QueryCounter(engine)
+    with SessionLocal() as db:
+        seed(db, skus)
+    print(f"{OUTLETS} outlets x {skus} SKUs = {OUTLETS * skus} stock rows")
+
+    for label, fn in (("ORM traversal", low_stock_orm), ("joined stream", low_stock_sql)):
+        counter.count = 0
+        tracemalloc.start()
+        with SessionLocal() as db, timer() as t:
+            fn(db)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>14}: {t['elapsed'] * 1000:9.1f} ms  {counter.count:6} queries  peak {peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
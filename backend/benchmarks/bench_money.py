@@ -0,0 +1,112 @@
+"""
+Exact (integer paise) pricing vs. the previous float arithmetic on synthetic
+carts: throughput of each path and how many carts the float path gets wrong.
+
+A cart "drifts" when the float invoice total, rounded to the paisa the way the
+Numeric(10, 2) column stores it, differs from the exact total, or when the
+rounded line totals stored on the invoice items do not add up to it.
+
+    python -m benchmarks.bench_money [n_carts]
+"""
+import random
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+from app.models.offer import OfferType
+from app.services.catalog_cache import OfferSnapshot, ProductSnapshot
+from app.services.offers import OfferBook, compile_offer
+from app.services.pricing import price_lines
+from benchmarks.common import timer
+
+N_PRODUCTS = 5_000
+
+
+def float_line(quantity: int, unit_price: float, offer: OfferSnapshot | None) -> tuple[float, float]:
+    """(line_total, discount) as the pricing code computed them before money was exact"""
+    if offer is None:
+        return unit_price * quantity, 0.0
+    if offer.offer_type == OfferType.BUY_X_GET_Y:
+        x, y = offer.x_quantity, offer.y_quantity
+        chargeable = (quantity // (x + y)) * x + quantity % (x + y)
+        return chargeable * unit_price, (quantity - chargeable) * unit_price
+    if offer.offer_type == OfferType.PERCENTAGE:
+        discount = unit_price * (float(offer.discount_percent) / 100) * quantity
+    else:
+        discount = min(float(offer.discount_flat), unit_price) * quantity
+    return unit_price * quantity - discount, discount
+
+
+def float_cart(cart, offers) -> tuple[float, list[float]]:
+    final_total, line_totals = 0.0, []
+    for product, quantity in cart:
+        line_total, _ = float_line(quantity, float(product.selling_price), offers.get(product.id))
+        final_total += line_total
+        line_totals.append(line_total)
+    return final_total, line_totals
+
+
+def make_catalog(rng: random.Random) -> tuple[list[ProductSnapshot], dict[int, OfferSnapshot]]:
+    today = date.today()
+    products = [
+        ProductSnapshot(id=pk, product_id=f"SPN{pk:08d}", name=f"Product {pk}", category=None,
+                        cost_price=Decimal(1), mrp=Decimal(999),
+                        selling_price=Decimal(rng.randint(100, 99_999)).scaleb(-2),
+                        min_stock=10, created_at=None)
+        for pk in range(1, N_PRODUCTS + 1)
+    ]
+    offers = {}
+    for pk in rng.sample(range(1, N_PRODUCTS + 1), N_PRODUCTS // 2):
+        kind = rng.random()
+        fields = dict(x_quantity=None, y_quantity=None, discount_percent=None, discount_flat=None)
+        if kind < 0.2:
+            offer_type = OfferType.BUY_X_GET_Y
+            fields.update(x_quantity=rng.choice((1, 2)), y_quantity=1)
+        elif kind < 0.7:
+            offer_type = OfferType.PERCENTAGE
+            fields.update(discount_percent=Decimal(rng.choice(("5", "7.5", "12.5", "15", "33"))))
+        else:
+            offer_type = OfferType.FLAT
+            fields.update(discount_flat=Decimal(rng.choice(("0.99", "1.10", "2.35", "5"))))
+        offers[pk] = OfferSnapshot(
+            id=pk, product_id=pk, offer_type=offer_type, start_date=today - timedelta(days=1),
+            end_date=today + timedelta(days=30), is_active=True, **fields
+        )
+    return products, offers
+
+
+def main():
+    n_carts = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(15)
+    products, offers = make_catalog(rng)
+    book = OfferBook(date.today(), [compile_offer(offer) for offer in offers.values()])
+    carts = [
+        [(rng.choice(products), rng.randint(1, 7)) for _ in range(rng.randint(1, 12))]
+        for _ in range(n_carts)
+    ]
+    n_lines = sum(len(cart) for cart in carts)
+    print(f"{n_carts} carts, {n_lines} lines, {len(offers)} offers")
+
+    with timer() as t_float:
+        float_results = [float_cart(cart, offers) for cart in carts]
+    with timer() as t_exact:
+        exact_results = [price_lines(book, cart) for cart in carts]
+
+    total_drift = lines_drift = 0
+    max_error = Decimal(0)
+    for (float_total, float_lines), priced in zip(float_results, exact_results):
+        stored_total = Decimal(repr(round(float_total, 2)))
+        if stored_total != priced.final_total:
+            total_drift += 1
+            max_error = max(max_error, abs(stored_total - priced.final_total))
+        if sum(Decimal(repr(round(line, 2))) for line in float_lines) != stored_total:
+            lines_drift += 1
+
+    print(f"{'path':<14} {'total s':>8} {'us/cart':>8} {'us/line':>8}")
+    for name, elapsed in (("float", t_float["elapsed"]), ("paise/Decimal", t_exact["elapsed"])):
+        print(f"{name:<14} {elapsed:8.2f} {elapsed / n_carts * 1e6:8.1f} {elapsed / n_lines * 1e6:8.2f}")
+    print(f"float totals off by >= 1 paisa: {total_drift} carts ({total_drift / n_carts:.2%}), max error {max_error}")
+    print(f"float line totals not adding up to the invoice total: {lines_drift} carts ({lines_drift / n_carts:.2%})")
+
+
+if __name__ == "__main__":
+    main()
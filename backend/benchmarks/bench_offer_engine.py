@@ -0,0 +1,85 @@
+"""
+Offer engine throughput: carts of growing size evaluated against a book of
+thousands of active offers of every type (line offers, stackable extras,
+tiers, mix-and-match bundles and cart thresholds).
+
+    python -m benchmarks.bench_offer_engine [n_offers]
+"""
+import random
+import sys
+from datetime import date, timedelta
+from app.models.offer import OfferType
+from app.services.catalog_cache import OfferSnapshot, ProductSnapshot
+from app.services.offers import OfferBook, compile_offer
+from benchmarks.common import timer
+
+N_PRODUCTS = 20_000
+REPEAT = 200
+
+
+def make_offers(n: int, rng: random.Random) -> list[OfferSnapshot]:
+    today = date.today()
+
+    def offer(offer_id: int, offer_type: OfferType, **fields) -> OfferSnapshot:
+        values = dict(
+            id=offer_id, product_id=rng.randint(1, N_PRODUCTS), offer_type=offer_type,
+            x_quantity=None, y_quantity=None, discount_percent=None, discount_flat=None,
+            start_date=today - timedelta(days=1), end_date=today + timedelta(days=30), is_active=True,
+            priority=rng.randint(0, 3), stackable=rng.random() < 0.1
+        )
+        values.update(fields)
+        return OfferSnapshot(**values)
+
+    offers = []
+    for offer_id in range(1, n + 1):
+        kind = rng.random()
+        if kind < 0.25:
+            offers.append(offer(offer_id, OfferType.BUY_X_GET_Y, x_quantity=2, y_quantity=1))
+        elif kind < 0.5:
+            offers.append(offer(offer_id, OfferType.PERCENTAGE, discount_percent=rng.choice((5, 10, 15))))
+        elif kind < 0.7:
+            offers.append(offer(offer_id, OfferType.FLAT, discount_flat=rng.choice((2, 5, 10))))
+        elif kind < 0.9:
+            offers.append(offer(offer_id, OfferType.TIERED, tiers=((3, 5), (6, 10), (12, 15))))
+        elif kind < 0.99:
+            members = tuple(rng.randint(1, N_PRODUCTS) for _ in range(rng.randint(2, 8)))
+            offers.append(offer(offer_id, OfferType.BUNDLE, bundle_product_ids=members, bundle_quantity=3, bundle_price=99))
+        else:
+            offers.append(offer(offer_id, OfferType.CART_THRESHOLD, product_id=None, stackable=False,
+                                discount_percent=5, min_cart_total=rng.choice((500, 1000, 2000))))
+    return offers
+
+
+def main():
+    n_offers = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    rng = random.Random(3)
+    offers = make_offers(n_offers, rng)
+
+    with timer() as t:
+        book = OfferBook(date.today(), [compile_offer(offer) for offer in offers])
+    print(f"{n_offers} offers compiled and indexed in {t['elapsed'] * 1000:.1f} ms")
+
+    # Bias carts towards products that have offers so most lines hit the engine
+    offered = sorted({offer.product_id for offer in offers if offer.product_id})
+    products = [
+        ProductSnapshot(id=pk, product_id=f"SPN{pk:08d}", name=f"Product {pk}", category=None, cost_price=10,
+                        mrp=60, selling_price=rng.choice((20, 35, 50)), min_stock=10, created_at=None)
+        for pk in range(1, N_PRODUCTS + 1)
+    ]
+
+    print(f"{'lines':>6} {'per cart ms':>12} {'per line us':>12}")
+    for n_lines in (1, 10, 50, 100, 500):
+        carts = [
+            [(products[(rng.choice(offered) if rng.random() < 0.8 else rng.randint(1, N_PRODUCTS)) - 1],
+              rng.randint(1, 12)) for _ in range(n_lines)]
+            for _ in range(REPEAT)
+        ]
+        with timer() as t:
+            for cart in carts:
+                book.evaluate(cart)
+        per_cart = t["elapsed"] / REPEAT
+        print(f"{n_lines:>6} {per_cart * 1000:12.3f} {per_cart / n_lines * 1e6:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Offline till: confirm latency against the local snapshot and queue (fsync per
+sale) vs. a central /billing/confirm on the same machine (no network), and
+bulk sync throughput of the queued invoices for several batch sizes.
+
+    python -m benchmarks.bench_offline_pos [n_sales]
+"""
+import asyncio
+import random
+import shutil
+import sys
+import tempfile
+from fastapi import Response
+from app.api.v1.routes_billing import confirm_invoice
+from app.db.session import run_in_transaction
+from app.models.product import Product
+from app.schemas.invoice import InvoiceConfirmRequest, InvoiceItemInput
+from app.schemas.pos import InvoiceSyncRequest
+from app.services.catalog_cache import catalog_cache
+from app.services.offers import offer_book
+from app.services.offline_pos import CentralClient, OfflineTill
+from app.services.pos_sync import build_pos_snapshot, sync_offline_invoices
+from benchmarks.common import make_async_session_factory, make_session_factory, timer, seed_catalog
+
+N_PRODUCTS = 2_000
+
+
+class DirectClient(CentralClient):
+    """Calls the central services in-process instead of over HTTP"""
+
+    def __init__(self, SessionLocal):
+        super().__init__("in-process", 0)
+        self.SessionLocal = SessionLocal
+
+    def fetch_snapshot(self, outlet_id):
+        with self.SessionLocal() as db:
+            return build_pos_snapshot(db, outlet_id)
+
+    def push_invoices(self, outlet_id, invoices):
+        request = InvoiceSyncRequest.model_validate_json(f'{{"outlet_id": {outlet_id}, "invoices": [{",".join(invoices)}]}}')
+        with self.SessionLocal() as db:
+            return run_in_transaction(db, lambda db: sync_offline_invoices(db, outlet_id, request.invoices))
+
+
+def central(tmp: str):
+    catalog_cache.clear()
+    offer_book.invalidate()
+    engine, SessionLocal = make_session_factory(f"sqlite:///{tmp}/central.db")
+    with SessionLocal() as db:
+        seed_catalog(db, N_PRODUCTS)
+        product_ids = [row[0] for row in db.query(Product.product_id).order_by(Product.id)]
+    return SessionLocal, product_ids
+
+
+def main():
+    n_sales = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    rng = random.Random(16)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        SessionLocal, product_ids = central(tmp)
+        carts = [
+            [InvoiceItemInput(product_id=product_id, quantity=rng.randint(1, 3))
+             for product_id in rng.sample(product_ids, rng.randint(1, 8))]
+            for _ in range(n_sales)
+        ]
+
+        async def confirm_centrally():
+            engine, AsyncSessionLocal = make_async_session_factory(f"sqlite:///{tmp}/central.db")
+            for items in carts:
+                async with AsyncSessionLocal() as db:
+                    request = InvoiceConfirmRequest(items=items, outlet_id=1)
+                    await confirm_invoice(request, Response(), idempotency_key=None, db=db)
+            await engine.dispose()
+
+        with timer() as t_central:
+            asyncio.run(confirm_centrally())
+
+        till = OfflineTill(DirectClient(SessionLocal), 1, f"{tmp}/till")
+        with timer() as t_snapshot:
+            till.refresh_snapshot()
+        with timer() as t_offline:
+            for items in carts:
+                till.confirm(items)
+
+        print(f"{n_sales} sales, snapshot of {N_PRODUCTS} products pulled in {t_snapshot['elapsed'] * 1000:.0f} ms")
+        print(f"{'confirm':<22} {'ms/sale':>8}")
+        print(f"{'central (local DB)':<22} {t_central['elapsed'] / n_sales * 1000:8.2f}")
+        print(f"{'offline till':<22} {t_offline['elapsed'] / n_sales * 1000:8.2f}")
+
+        print(f"\n{'sync batch':>10} {'invoices/s':>11} {'requests':>9}")
+        for batch_size in (1, 50, 200, 1000):
+            run_dir = f"{tmp}/run{batch_size}"
+            shutil.copytree(f"{tmp}/till", f"{run_dir}/till")
+            SessionLocal, _ = central(run_dir)
+            replay = OfflineTill(DirectClient(SessionLocal), 1, f"{run_dir}/till")
+            with timer() as t:
+                report = replay.sync(batch_size)
+            assert report.created == n_sales and not report.pending, report
+            print(f"{batch_size:>10} {n_sales / t['elapsed']:>11.0f} {-(-n_sales // batch_size):>9}")
+
+
+if __name__ == "__main__":
+    main()
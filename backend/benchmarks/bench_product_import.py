@@ -0,0 +1,56 @@
+"""
+Rows/second of the bulk product import vs. one POST /products/ per row.
+
+    python -m benchmarks.bench_product_import
+"""
+import asyncio
+import csv
+import io
+import random
+import tempfile
+from app.api.v1.routes_products import create_product
+from app.schemas.product import ProductCreate
+from app.services.product_import import import_products, iter_rows
+from benchmarks.common import make_async_session_factory, make_session_factory, timer
+
+ONE_AT_A_TIME_SAMPLE = 1_000
+
+
+def make_csv(n_rows: int) -> bytes:
+    rng = random.Random(n_rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["name", "category", "cost_price", "mrp", "selling_price", "min_stock"])
+    for i in range(n_rows):
+        cost = rng.randint(5, 900)
+        writer.writerow([f"Item {i}", f"Category {i % 40}", cost, cost * 2, cost * 1.8, 10])
+    return buffer.getvalue().encode()
+
+
+async def one_at_a_time(url: str, rows: list[dict]):
+    engine, AsyncSessionLocal = make_async_session_factory(url)
+    async with AsyncSessionLocal() as db:
+        for row in rows:
+            await create_product(ProductCreate.model_validate(row), db)
+    await engine.dispose()
+
+
+def main():
+    rows = list(iter_rows(io.BytesIO(make_csv(ONE_AT_A_TIME_SAMPLE)), "csv"))
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        make_session_factory(url)[0].dispose()
+        with timer() as t:
+            asyncio.run(one_at_a_time(url, rows))
+    print(f"one-at-a-time: {len(rows) / t['elapsed']:10.0f} rows/s  ({len(rows)} rows)")
+
+    for n_rows in (10_000, 100_000):
+        _, SessionLocal = make_session_factory()
+        data = make_csv(n_rows)
+        with SessionLocal() as db, timer() as t:
+            report = import_products(db, iter_rows(io.BytesIO(data), "csv"))
+        print(f"bulk import:   {report.imported / t['elapsed']:10.0f} rows/s  ({report.imported} rows, {report.failed} failed)")
+
+
+if __name__ == "__main__":
+    main()
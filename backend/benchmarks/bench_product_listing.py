@@ -0,0 +1,72 @@
+"""
+Product listing latency by page number: OFFSET pagination vs. the keyset
+cursor on products.id, unfiltered and with a category filter.
+
+    python -m benchmarks.bench_product_listing [n_products] [page_size]
+"""
+import sys
+from sqlalchemy import select
+from app.models.product import Product
+from app.services.product_listing import ProductFilter, parse_fields, product_page_query
+from benchmarks.common import make_session_factory, seed_catalog, timer
+
+PAGES = (1, 10, 100, 1000, 2500, 5000)
+REPEAT = 5
+
+
+def offset_page(db, filters: ProductFilter, page: int, page_size: int):
+    query = select(Product).order_by(Product.id)
+    if filters.category is not None:
+        query = query.where(Product.category == filters.category)
+    return db.scalars(query.offset((page - 1) * page_size).limit(page_size)).all()
+
+
+def keyset_page(db, filters: ProductFilter, after: int | None, page_size: int, fields=None):
+    return db.execute(product_page_query(filters, after, page_size, fields)).all()
+
+
+def cursor_for(db, filters: ProductFilter, page: int, page_size: int) -> int | None:
+    """The cursor a client would hold when asking for `page` (not timed)"""
+    if page == 1:
+        return None
+    previous = offset_page(db, filters, page - 1, page_size)
+    return previous[-1].id if previous else None
+
+
+def best_of(fn) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        with timer() as t:
+            fn()
+        best = min(best, t["elapsed"])
+    return best * 1000
+
+
+def main():
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    n_products = int(sys.argv[1]) if len(sys.argv) > 1 else page_size * max(PAGES)
+    engine, SessionLocal = make_session_factory()
+    with SessionLocal() as db:
+        seed_catalog(db, n_products, quantity=100)
+    print(f"{n_products} products, {page_size} per page (best of {REPEAT}, ms)")
+
+    sparse = parse_fields("product_id,name,selling_price")
+    scenarios = (
+        ("all", ProductFilter()),
+        ("category", ProductFilter(category="Category 7")),
+    )
+    with SessionLocal() as db:
+        for label, filters in scenarios:
+            print(f"\n{label:>8} {'page':>6} {'offset':>10} {'keyset':>10} {'sparse':>10}")
+            for page in PAGES:
+                after = cursor_for(db, filters, page, page_size)
+                if page > 1 and after is None:
+                    break
+                offset_ms = best_of(lambda: offset_page(db, filters, page, page_size))
+                keyset_ms = best_of(lambda: keyset_page(db, filters, after, page_size))
+                sparse_ms = best_of(lambda: keyset_page(db, filters, after, page_size, sparse))
+                print(f"{'':>8} {page:>6} {offset_ms:10.2f} {keyset_ms:10.2f} {sparse_ms:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Typeahead search latency on a synthetic catalog with realistic-looking names:
+prefix, multi-term, SPN code and misspelled (fuzzy) queries.
+
+    python -m benchmarks.bench_search [n_products]
+"""
+import random
+import statistics
+import sys
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.product import Product
+from app.services.search import ProductSearchIndex
+from benchmarks.common import make_session_factory, timer
+
+BRANDS = ["Camlin", "Classmate", "Faber", "Apsara", "Doms", "Natraj", "Reynolds", "Cello", "Luxor", "Kores",
+          "Funskool", "Hasbro", "Mattel", "Lego", "Archies", "Hallmark", "Milton", "Tupperware", "Borosil", "Prestige"]
+ITEMS = ["pencil", "pen", "eraser", "sharpener", "notebook", "marker", "crayons", "geometry box", "stapler", "glue stick",
+         "puzzle", "teddy bear", "board game", "water bottle", "lunch box", "greeting card", "photo frame", "gift wrap",
+         "keychain", "diary", "calculator", "scissors", "sticky notes", "highlighter", "sketch pens", "tiffin", "mug"]
+COLOURS = ["red", "blue", "black", "green", "pink", "yellow", "multicolour", "silver", "gold", "white"]
+SIZES = ["small", "medium", "large", "pack of 5", "pack of 10", "a4", "a5", "200 pages", "500ml", "1l"]
+CATEGORIES = ["Stationery", "Toys", "Gifts", "Kitchenware", "Art Supplies", "Office", "Party", "Books"]
+
+QUERIES = ["pen", "penc", "camlin pen", "note", "notebook a4", "teddy", "glue", "bottle 500", "SPN0010",
+           "pencl", "sharpner", "tupperwre", "giftt wrap", "x"]
+
+
+def seed(db, n: int):
+    rng = random.Random(7)
+    rows = []
+    for i in range(1, n + 1):
+        name = f"{rng.choice(BRANDS)} {rng.choice(ITEMS)} {rng.choice(COLOURS)} {rng.choice(SIZES)}"
+        rows.append({"id": i, "product_id": f"SPN{i % 1000:04d}{i:05d}", "name": name.title(),
+                     "category": rng.choice(CATEGORIES), "cost_price": 10, "mrp": 20, "selling_price": 18})
+    db.execute(Product.__table__.insert(), rows)
+    db.add(Invoice(id=1, invoice_number="INV1", total_amount=0, final_amount=0))
+    db.execute(InvoiceItem.__table__.insert(), [
+        {"invoice_id": 1, "product_id": rng.randint(1, n), "quantity": rng.randint(1, 20),
+         "unit_price": 18, "line_total": 18}
+        for _ in range(n // 5)
+    ])
+    db.commit()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    engine, SessionLocal = make_session_factory()
+    with SessionLocal() as db:
+        seed(db, n)
+
+    index = ProductSearchIndex()
+    with SessionLocal() as db:
+        with timer() as t:
+            index.search(db, "warmup")
+        print(f"{n} products: index built in {t['elapsed']:.2f}s {index.stats()}\n")
+
+        print(f"{'query':>14} {'hits':>5} {'median ms':>10} {'p95 ms':>8}  top result")
+        for query in QUERIES:
+            samples = []
+            for _ in range(30):
+                with timer() as t:
+                    hits = index.search(db, query)
+                samples.append(t["elapsed"] * 1000)
+            samples.sort()
+            top = hits[0].entry.name if hits else "-"
+            print(f"{query:>14} {len(hits):>5} {statistics.median(samples):10.2f} {samples[int(len(samples) * 0.95)]:8.2f}  {top}")
+
+
+if __name__ == "__main__":
+    main()
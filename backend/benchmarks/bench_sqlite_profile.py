@@ -0,0 +1,163 @@
+"""
+Mixed read/write load on SQLite: concurrent tills issue mostly reads (cart
+preview, product lookup, invoice history, low-stock list) with a share of
+confirms, over HTTP against the async API routes. Compares today's setup
+(SQLite defaults, writers contend for the lock) with the production profile
+(WAL + pragmas), with and without the single writer queue.
+
+    python -m benchmarks.bench_sqlite_profile [tills] [ops_per_till]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import func, select
+from app.api.v1.routes_billing import router as billing_router
+from app.api.v1.routes_products import router as products_router
+from app.api.v1.routes_stock import router as stock_router
+from app.db.session import apply_sqlite_profile, get_async_db, write_queue
+from app.models.invoice import InvoiceItem
+from app.models.product import Product
+from app.models.stock import Stock
+from app.services.catalog_cache import catalog_cache
+from app.services.offers import offer_book
+from benchmarks.common import make_async_session_factory, make_session_factory, seed_catalog
+
+N_PRODUCTS = 2_000
+STOCK = 1_000_000
+WRITE_SHARE = 0.2
+MODES = (
+    ("default (today)", "default", False),
+    ("production pragmas", "production", False),
+    ("production + write queue", "production", True),
+)
+
+
+def make_app(AsyncSessionLocal) -> FastAPI:
+    app = FastAPI()
+    for router in (billing_router, products_router, stock_router):
+        app.include_router(router)
+
+    async def get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = get_db
+    return app
+
+
+async def run_tills(app: FastAPI, tills: int, ops_per_till: int, product_ids: list[str]) -> dict:
+    latencies = {"read": [], "write": []}
+    failures = Counter()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    async def call(client, kind, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            if response.status_code >= 300:
+                failures[f"{kind} {response.status_code}"] += 1
+        except Exception as e:
+            failures[f"{kind} {type(e).__name__}"] += 1
+        latencies[kind].append(time.perf_counter() - start)
+
+    async def till(client, seed: int):
+        rng = random.Random(seed)
+        for _ in range(ops_per_till):
+            items = [
+                {"product_id": product_id, "quantity": rng.randint(1, 3)}
+                for product_id in rng.sample(product_ids, rng.randint(1, 6))
+            ]
+            if rng.random() < WRITE_SHARE:
+                await call(client, "write", "POST", "/billing/confirm", json={"outlet_id": 1, "items": items})
+                continue
+            read = rng.randrange(4)
+            if read == 0:
+                await call(client, "read", "POST", "/billing/preview", json=items)
+            elif read == 1:
+                await call(client, "read", "GET", f"/products/{items[0]['product_id']}")
+            elif read == 2:
+                await call(client, "read", "GET", "/billing/invoices", params={"limit": 20})
+            else:
+                await call(client, "read", "GET", "/stock/low", params={"limit": 50})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(till(client, seed) for seed in range(tills)))
+        elapsed = time.perf_counter() - start
+
+    summary = {"elapsed": elapsed, "failures": dict(failures)}
+    for kind, values in latencies.items():
+        values.sort()
+        summary[kind] = {
+            "per_second": len(values) / elapsed,
+            "p50": statistics.median(values) if values else 0,
+            "p99": values[int(len(values) * 0.99) - 1] if values else 0,
+        }
+    return summary
+
+
+def run(profile: str, serialize: bool, tills: int, ops_per_till: int) -> dict:
+    catalog_cache.clear()
+    offer_book.invalidate()
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        engine, SessionLocal = make_session_factory(url)
+        with SessionLocal() as db:
+            # A few products below min_stock so /stock/low has rows to stream
+            seed_catalog(db, N_PRODUCTS, quantity=STOCK)
+            db.execute(Stock.__table__.update().where(Stock.product_id <= 50).values(quantity=5))
+            db.commit()
+            product_ids = [row[0] for row in db.execute(select(Product.product_id).where(Product.id > 50))]
+        engine.dispose()
+
+        async def mixed():
+            async_engine, AsyncSessionLocal = make_async_session_factory(url)
+            apply_sqlite_profile(async_engine, profile)
+            try:
+                return await run_tills(make_app(AsyncSessionLocal), tills, ops_per_till, product_ids)
+            finally:
+                await async_engine.dispose()
+
+        serialize_before = write_queue.serialize
+        write_queue.serialize = serialize
+        try:
+            result = asyncio.run(mixed())
+        finally:
+            write_queue.serialize = serialize_before
+
+        with SessionLocal() as db:
+            sold = db.scalar(select(func.sum(InvoiceItem.quantity))) or 0
+            remaining = db.scalar(select(func.sum(Stock.quantity).filter(Stock.product_id > 50)))
+        engine.dispose()
+
+    result["consistent"] = sold + remaining == (N_PRODUCTS - 50) * STOCK
+    return result
+
+
+def main():
+    tills = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ops_per_till = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"{tills} tills x {ops_per_till} requests, {WRITE_SHARE:.0%} confirms")
+    print(
+        f"{'setup':<26} {'reads/s':>8} {'read p50':>9} {'read p99':>9} "
+        f"{'writes/s':>9} {'write p50':>10} {'write p99':>10}  failed"
+    )
+    for name, profile, serialize in MODES:
+        r = run(profile, serialize, tills, ops_per_till)
+        read, write = r["read"], r["write"]
+        print(
+            f"{name:<26} {read['per_second']:>8.0f} {read['p50'] * 1000:>7.0f}ms {read['p99'] * 1000:>7.0f}ms "
+            f"{write['per_second']:>9.1f} {write['p50'] * 1000:>8.0f}ms {write['p99'] * 1000:>8.0f}ms  "
+            f"{sum(r['failures'].values())} {r['failures'] or ''}{'' if r['consistent'] else '  STOCK MISMATCH'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
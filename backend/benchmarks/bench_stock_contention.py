@@ -0,0 +1,89 @@
+"""
+Concurrent confirm stress test: several tills (asyncio tasks) confirm carts
+against the same outlet until stock runs out. Checks that nothing is oversold and compares
+confirmed invoices/second with atomic reservation vs. a lock around the whole request.
+
+    python -m benchmarks.bench_stock_contention
+"""
+import asyncio
+import random
+import tempfile
+from fastapi import HTTPException, Response
+from sqlalchemy import func
+from app.api.v1.routes_billing import confirm_invoice
+from app.models.product import Product
+from app.models.stock import Stock
+from app.models.invoice import InvoiceItem
+from app.schemas.invoice import InvoiceConfirmRequest, InvoiceItemInput
+from app.services.catalog_cache import catalog_cache
+from benchmarks.common import make_async_session_factory, make_session_factory, timer, seed_catalog
+
+N_PRODUCTS = 20
+STOCK_PER_PRODUCT = 300
+TILLS = 8
+CARTS_PER_TILL = 150
+
+
+def run(mode: str):
+    catalog_cache.clear()
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        engine, SessionLocal = make_session_factory(url)
+        with SessionLocal() as db:
+            seed_catalog(db, N_PRODUCTS, quantity=STOCK_PER_PRODUCT)
+            product_ids = [row[0] for row in db.query(Product.product_id)]
+
+        counts = {"confirmed": 0, "rejected": 0, "errors": 0}
+
+        async def tills():
+            async_engine, AsyncSessionLocal = make_async_session_factory(url)
+            request_lock = asyncio.Lock()
+
+            async def till(seed: int):
+                rng = random.Random(seed)
+                for _ in range(CARTS_PER_TILL):
+                    request = InvoiceConfirmRequest(outlet_id=1, items=[
+                        InvoiceItemInput(product_id=pid, quantity=rng.randint(1, 3))
+                        for pid in rng.sample(product_ids, 4)
+                    ])
+                    outcome = "confirmed"
+                    async with AsyncSessionLocal() as db:
+                        try:
+                            if mode == "locked":
+                                async with request_lock:
+                                    await confirm_invoice(request, Response(), idempotency_key=None, db=db)
+                            else:
+                                await confirm_invoice(request, Response(), idempotency_key=None, db=db)
+                        except HTTPException:
+                            outcome = "rejected"
+                        except Exception:
+                            outcome = "errors"
+                    counts[outcome] += 1
+
+            await asyncio.gather(*(till(i) for i in range(TILLS)))
+            await async_engine.dispose()
+
+        with timer() as t:
+            asyncio.run(tills())
+
+        with SessionLocal() as db:
+            remaining = db.query(func.sum(Stock.quantity)).scalar()
+            negative = db.query(Stock).filter(Stock.quantity < 0).count()
+            sold = db.query(func.sum(InvoiceItem.quantity)).scalar() or 0
+        engine.dispose()
+
+    oversold = negative > 0 or sold + remaining != N_PRODUCTS * STOCK_PER_PRODUCT
+    print(
+        f"{mode:>8}: {counts['confirmed'] / t['elapsed']:8.1f} invoices/s  "
+        f"confirmed={counts['confirmed']} rejected={counts['rejected']} errors={counts['errors']}  "
+        f"sold={sold} remaining={remaining} oversold={'YES' if oversold else 'no'}"
+    )
+
+
+def main():
+    for mode in ("locked", "atomic"):
+        run(mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Shared helpers for the benchmark scripts (run from backend/: python -m benchmarks.<name>)"""
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.db.base import Base
+from app.db.session import async_database_url, pool_options
+import app.models  # noqa: F401  (register all tables)
+
+
+def make_session_factory(url: str = "sqlite://"):
+    """Fresh database with all tables created; returns (engine, SessionLocal)"""
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **pool_options(url))
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def make_async_session_factory(url: str):
+    """Async engine (same pool settings) over a file database made by make_session_factory; returns (engine, AsyncSessionLocal)"""
+    engine = create_async_engine(async_database_url(url), **pool_options(url, poolclass=AsyncAdaptedQueuePool))
+    return engine, async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+class QueryCounter:
+    """Counts statements executed on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+@contextmanager
+def timer():
+    result = {}
+    start = time.perf_counter()
+    yield result
+    result["elapsed"] = time.perf_counter() - start
+
+
+def seed_catalog(db, n_products: int, outlet_ids: tuple = (1,), quantity: int = 1_000_000, offer_every: int = 3):
+    """Insert n products (with stock at each outlet and an offer on every Nth product)"""
+    from app.models.product import Product
+    from app.models.outlet import Outlet
+    from app.models.stock import Stock
+    from app.models.offer import Offer, OfferType
+
+    today = date.today()
+    db.add_all([Outlet(id=outlet_id, name=f"Outlet {outlet_id}") for outlet_id in outlet_ids])
+    db.execute(Product.__table__.insert(), [
+        {
+            "id": i,
+            "product_id": f"SPN{i % 10000:04d}{i:04d}"[:15],
+            "name": f"Product {i}",
+            "category": f"Category {i % 25}",
+            "cost_price": 10 + i % 500,
+            "mrp": 20 + i % 500,
+            "selling_price": 18 + i % 500,
+            "min_stock": 10,
+        }
+        for i in range(1, n_products + 1)
+    ])
+    db.execute(Stock.__table__.insert(), [
+        {"product_id": i, "outlet_id": outlet_id, "quantity": quantity}
+        for outlet_id in outlet_ids
+        for i in range(1, n_products + 1)
+    ])
+    db.execute(Offer.__table__.insert(), [
+        {
+            "product_id": i,
+            "offer_type": OfferType.PERCENTAGE.name,
+            "discount_percent": 10,
+            "start_date": today - timedelta(days=1),
+            "end_date": today + timedelta(days=30),
+            "is_active": True,
+        }
+        for i in range(1, n_products + 1, offer_every)
+    ])
+    db.commit()
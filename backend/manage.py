@@ -0,0 +1,157 @@
+"""
+Maintenance commands for the SPN Billing backend.
+
+    python manage.py migrate
+    python manage.py import-products catalog.csv
+    python manage.py rebuild-outlet-summary --check
+    python manage.py archive-offers
+    python manage.py pos-sync
+    python manage.py backfill-sales --since 2024-04-01
+    python manage.py export-invoices exports/ --start 2024-04-01 --end 2024-06-30
+"""
+import argparse
+import sys
+from app.core.config import settings
+from app.db.migrations import HEAD, MIGRATIONS, current_version, ensure_schema, migrate
+from app.db.session import SessionLocal, engine
+import app.models  # noqa: F401  (register all tables)
+
+
+def migrate_command(args):
+    with engine.connect() as conn:
+        version = current_version(conn)
+    pending = [m for m in MIGRATIONS if version is None or m.version > version]
+    if args.check:
+        for migration in pending:
+            print(f"  pending {migration.version}: {migration.description}", file=sys.stderr)
+        print(f"{'❌' if pending else '✅'} Schema at version {version or 0}, this build needs {HEAD}")
+        sys.exit(1 if pending else 0)
+
+    applied = migrate(engine, log=lambda message: print(f"  {message}"))
+    print(f"✅ Schema at version {HEAD} ({len(applied)} migrations applied)")
+
+
+def import_products_command(args):
+    from app.services.product_import import detect_format, import_products, iter_rows
+
+    fmt = args.format or detect_format(args.path)
+    with open(args.path, "rb") as stream, SessionLocal() as db:
+        report = import_products(db, iter_rows(stream, fmt), chunk_size=args.chunk_size)
+
+    for row, error in report.errors:
+        print(f"  row {row}: {error}", file=sys.stderr)
+    print(f"✅ Imported {report.imported} of {report.total_rows} rows ({report.failed} failed)")
+
+
+def rebuild_outlet_summary_command(args):
+    from app.services.stock import rebuild_outlet_summaries
+
+    with SessionLocal() as db:
+        mismatches = rebuild_outlet_summaries(db, apply=not args.check)
+
+    for outlet_id, stored, actual in mismatches:
+        print(f"  outlet {outlet_id}: stored {stored}, actual {actual} (products, quantity, low stock)", file=sys.stderr)
+    if args.check:
+        print(f"{'❌' if mismatches else '✅'} {len(mismatches)} outlet summaries out of date")
+        sys.exit(1 if mismatches else 0)
+    print(f"✅ Rebuilt {len(mismatches)} outlet summaries")
+
+
+def archive_offers_command(args):
+    from datetime import timedelta
+    from app.core.clock import business_day
+    from app.services.offer_archive import archive_expired_offers
+
+    ended_before = business_day() - timedelta(days=args.after_days) if args.after_days is not None else None
+    with SessionLocal() as db:
+        archived = archive_expired_offers(db, ended_before, batch_size=args.batch_size)
+    print(f"✅ Archived {archived} expired offers")
+
+
+def pos_sync_command(args):
+    from app.services.offline_pos import pos_till
+
+    if pos_till is None:
+        sys.exit("POS_CENTRAL_URL is not set: this is not an outlet till")
+    report = pos_till.sync(args.batch_size)
+    if report.error:
+        print(f"❌ Central API error: {report.error}", file=sys.stderr)
+    print(
+        f"{'✅' if not report.error else '⚠️ '} Sent {report.sent} offline invoices "
+        f"({report.created} new, {report.duplicates} duplicate, {report.rejected} rejected), {report.pending} pending"
+    )
+    sys.exit(1 if report.error else 0)
+
+
+def backfill_sales_command(args):
+    from datetime import date
+    from app.services.sales_rollup import rebuild_sales_rollups
+
+    since = date.fromisoformat(args.since) if args.since else None
+    with SessionLocal() as db:
+        processed = rebuild_sales_rollups(db, since, chunk_size=args.chunk_size)
+    print(f"✅ Rebuilt sales rollups from {processed} invoice lines" + (f" since {since}" if since else ""))
+
+
+def export_invoices_command(args):
+    from datetime import date
+    from app.services.invoice_export import write_invoice_dataset
+
+    start = date.fromisoformat(args.start) if args.start else None
+    end = date.fromisoformat(args.end) if args.end else None
+    with SessionLocal() as db:
+        written = write_invoice_dataset(
+            db, args.output_dir, args.format, start, end, args.outlet_id, chunk_size=args.chunk_size
+        )
+    print(f"✅ Exported {written} invoice lines to {args.output_dir} ({args.format}, partitioned by day and outlet)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPN Billing System maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("migrate", help="Apply pending schema migrations")
+    cmd.add_argument("--check", action="store_true", help="Only report pending migrations (exit 1 if any)")
+    cmd.set_defaults(handler=migrate_command)
+
+    cmd = commands.add_parser("import-products", help="Bulk import products from CSV or NDJSON")
+    cmd.add_argument("path")
+    cmd.add_argument("--format", choices=["csv", "ndjson"])
+    cmd.add_argument("--chunk-size", type=int, default=1000)
+    cmd.set_defaults(handler=import_products_command)
+
+    cmd = commands.add_parser("rebuild-outlet-summary", help="Verify outlet stock summaries against a full recompute")
+    cmd.add_argument("--check", action="store_true", help="Only report mismatches (exit 1 if any)")
+    cmd.set_defaults(handler=rebuild_outlet_summary_command)
+
+    cmd = commands.add_parser("archive-offers", help="Move expired offers to offer_history")
+    cmd.add_argument("--after-days", type=int, help="Archive offers that ended more than N days ago (default from settings)")
+    cmd.add_argument("--batch-size", type=int, default=1000)
+    cmd.set_defaults(handler=archive_offers_command)
+
+    cmd = commands.add_parser("pos-sync", help="Outlet till: push queued offline invoices to the central API")
+    cmd.add_argument("--batch-size", type=int)
+    cmd.set_defaults(handler=pos_sync_command)
+
+    cmd = commands.add_parser("backfill-sales", help="Rebuild the daily sales rollups from invoice history")
+    cmd.add_argument("--since", help="Only rebuild days from this date (YYYY-MM-DD)")
+    cmd.add_argument("--chunk-size", type=int, default=5000)
+    cmd.set_defaults(handler=backfill_sales_command)
+
+    cmd = commands.add_parser("export-invoices", help="Export invoice lines as a Parquet / Arrow dataset partitioned by day and outlet")
+    cmd.add_argument("output_dir")
+    cmd.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    cmd.add_argument("--start", help="First day to export (YYYY-MM-DD)")
+    cmd.add_argument("--end", help="Last day to export (YYYY-MM-DD)")
+    cmd.add_argument("--outlet-id", type=int, help="Only this outlet (0 = invoices without an outlet)")
+    cmd.add_argument("--chunk-size", type=int, default=50_000)
+    cmd.set_defaults(handler=export_invoices_command)
+
+    args = parser.parse_args()
+    if args.handler is not migrate_command:
+        ensure_schema(engine, settings.DB_AUTO_MIGRATE)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
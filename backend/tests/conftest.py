@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+# Before app.db.session is imported: every test run gets its own database file
+_directory = tempfile.mkdtemp(prefix="spn-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_directory}/test.db"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def kolkata(monkeypatch):
+    """Business days in IST, 05:30 ahead of the UTC timestamps"""
+    from app.core import clock
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "BUSINESS_TIMEZONE", "Asia/Kolkata")
+    clock.business_timezone.cache_clear()
+    yield
+    clock.business_timezone.cache_clear()
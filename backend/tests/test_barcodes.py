@@ -0,0 +1,36 @@
+from uuid import uuid4
+from app.services import barcodes
+from app.services.barcodes import BarcodeImageCache, BarcodeRender
+
+
+def test_barcode_endpoint_serves_etags_and_304s(client):
+    product = client.post(
+        "/api/v1/products/", json={"name": f"Barcode pen {uuid4().hex[:6]}", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    url = f"/api/v1/products/{product['product_id']}/barcode"
+
+    png = client.get(url)
+    assert png.status_code == 200
+    assert png.headers["content-type"] == "image/png" and png.content.startswith(b"\x89PNG")
+
+    again = client.get(url, headers={"If-None-Match": png.headers["ETag"]})
+    assert again.status_code == 304 and again.headers["ETag"] == png.headers["ETag"]
+
+    svg = client.get(url, params={"format": "svg"})
+    assert svg.headers["content-type"] == "image/svg+xml" and svg.headers["ETag"] != png.headers["ETag"]
+    assert client.get("/api/v1/products/SPN99999999/barcode").status_code == 404
+
+
+def test_images_are_rendered_once_and_reused_from_disk(tmp_path, monkeypatch):
+    renders = []
+    generate = barcodes.generate_barcode_image
+    monkeypatch.setattr(barcodes, "generate_barcode_image", lambda *args: renders.append(args) or generate(*args))
+    render = BarcodeRender(format="svg")
+
+    cache = BarcodeImageCache(maxsize=4, cache_dir=str(tmp_path))
+    etag, image = cache.get("SPN00059901", render)
+    assert cache.get("SPN00059901", render) == (etag, image)
+
+    # A restarted worker finds the image on disk
+    assert BarcodeImageCache(maxsize=4, cache_dir=str(tmp_path)).get("SPN00059901", render) == (etag, image)
+    assert len(renders) == 1
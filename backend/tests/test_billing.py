@@ -0,0 +1,66 @@
+import uuid
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import update
+from app.db.session import SessionLocal, write_queue
+from app.models.offer import Offer, OfferType
+from app.models.product import Product
+from app.services.sequences import invoice_numbers
+
+
+@pytest.fixture
+def product(client):
+    product = client.post(
+        "/api/v1/products/", json={"name": f"Pen {uuid.uuid4().hex[:6]}", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    client.post("/api/v1/stock/", json={"product_id": product["id"], "quantity": 100})
+    return product
+
+
+@pytest.mark.parametrize("serialize", [True, False], ids=["write-queue", "no-write-queue"])
+def test_confirm_with_idempotency_key_and_number_blocks(client, product, monkeypatch, serialize):
+    monkeypatch.setattr(invoice_numbers, "block_size", 2)
+    monkeypatch.setattr(invoice_numbers, "_blocks", {})
+    monkeypatch.setattr(write_queue, "serialize", serialize)
+    body = {"items": [{"product_id": product["product_id"], "quantity": 1}]}
+
+    keys = [str(uuid.uuid4()) for _ in range(3)]
+    responses = [client.post("/api/v1/billing/confirm", json=body, headers={"Idempotency-Key": key}) for key in keys]
+    assert [response.status_code for response in responses] == [201, 201, 201]
+    numbers = [response.json()["invoice_number"] for response in responses]
+    assert len(set(numbers)) == 3
+
+    replay = client.post("/api/v1/billing/confirm", json=body, headers={"Idempotency-Key": keys[0]})
+    assert replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["invoice_number"] == numbers[0]
+
+
+def test_confirm_prices_from_the_database_not_the_worker_cache(client, product):
+    body = {"items": [{"product_id": product["product_id"], "quantity": 2}]}
+    assert client.post("/api/v1/billing/preview", json=body["items"]).json()["final_total"] == 20.0
+
+    # Another worker's edit: this worker's catalog cache and offer book are not told
+    with SessionLocal() as db:
+        db.execute(update(Product).where(Product.id == product["id"]).values(selling_price=12))
+        db.add(Offer(
+            product_id=product["id"], offer_type=OfferType.FLAT, discount_flat=1,
+            start_date=date.today(), end_date=date.today() + timedelta(days=1)
+        ))
+        db.commit()
+
+    invoice = client.post("/api/v1/billing/confirm", json=body).json()
+    assert invoice["total_amount"] == 24.0
+    assert invoice["discount_amount"] > 0
+
+
+def test_idempotency_key_reused_for_another_cart_is_422(client, product):
+    key = str(uuid.uuid4())
+    body = {"items": [{"product_id": product["product_id"], "quantity": 1}]}
+    assert client.post("/api/v1/billing/confirm", json=body, headers={"Idempotency-Key": key}).status_code == 201
+
+    body["items"][0]["quantity"] = 2
+    response = client.post("/api/v1/billing/confirm", json=body, headers={"Idempotency-Key": key})
+
+    assert response.status_code == 422
+    assert client.get("/api/v1/stock/", params={"product_id": product["id"]}).json()[0]["quantity"] == 99
@@ -0,0 +1,36 @@
+from uuid import uuid4
+from app.core.clock import business_day
+from app.services.catalog_cache import LRUCache
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put_many({"a": 1, "b": 2})
+    cache.get_many(["a"])
+    cache.put_many({"c": 3})
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_product_and_offer_writes_reach_the_cached_preview(client):
+    product = client.post(
+        "/api/v1/products/", json={"name": f"Cached pen {uuid4().hex[:6]}", "cost_price": 5, "mrp": 20, "selling_price": 10}
+    ).json()
+    items = [{"product_id": product["product_id"], "quantity": 1}]
+
+    def final_total() -> float:
+        return client.post("/api/v1/billing/preview", json=items).json()["final_total"]
+
+    assert final_total() == 10.0
+    assert client.get(f"/api/v1/products/{product['product_id']}").json()["selling_price"] == 10.0
+
+    client.put(f"/api/v1/products/{product['product_id']}", json={"selling_price": 12})
+    assert final_total() == 12.0
+    assert client.get(f"/api/v1/products/{product['product_id']}").json()["selling_price"] == 12.0
+
+    today = str(business_day())
+    client.post("/api/v1/offers/", json={
+        "product_id": product["id"], "offer_type": "FLAT", "discount_flat": 2, "start_date": today, "end_date": today
+    })
+    assert final_total() == 10.0
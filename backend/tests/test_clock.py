@@ -0,0 +1,15 @@
+from datetime import date, datetime
+from app.core.clock import business_day, business_day_start
+from app.core.config import settings
+
+
+def test_business_day_of_a_utc_timestamp(kolkata):
+    # 00:00 to 05:30 IST is still the previous day in UTC
+    assert business_day(datetime(2026, 3, 31, 18, 29)) == date(2026, 3, 31)
+    assert business_day(datetime(2026, 3, 31, 18, 30)) == date(2026, 4, 1)
+    assert business_day_start(date(2026, 4, 1)) == datetime(2026, 3, 31, 18, 30)
+
+
+def test_invoice_numbers_carry_the_business_day(client, kolkata):
+    block = client.post("/api/v1/billing/invoice-numbers", json={"count": 1}).json()
+    assert block["numbers"][0].startswith(f"{settings.INVOICE_NUMBER_PREFIX}{business_day():%Y%m%d}")
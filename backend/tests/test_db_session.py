@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app.db.session import (
+    WriteQueue,
+    apply_sqlite_profile,
+    async_database_url,
+    pool_options,
+    run_in_transaction,
+    run_in_transaction_async,
+    sqlite_pragmas
+)
+
+
+@pytest.mark.parametrize("url, async_url", [
+    ("sqlite:///./spn_billing.db", "sqlite+aiosqlite:///./spn_billing.db"),
+    ("postgresql://spn@db/spn", "postgresql+asyncpg://spn@db/spn"),
+    ("postgresql+psycopg2://spn@db/spn", "postgresql+asyncpg://spn@db/spn"),
+])
+def test_async_database_url(url, async_url):
+    assert async_database_url(url) == async_url
+
+
+def test_async_database_url_rejects_unknown_backends():
+    with pytest.raises(ValueError, match="mysql"):
+        async_database_url("mysql://spn@db/spn")
+
+
+def test_in_memory_sqlite_keeps_the_default_pool():
+    assert pool_options("sqlite:///:memory:") == {}
+    assert pool_options("sqlite://") == {}
+    assert "pool_size" in pool_options("sqlite:///./spn_billing.db")
+
+
+def locked() -> OperationalError:
+    return OperationalError("UPDATE stock", {}, Exception("database is locked"))
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeAsyncSession(FakeSession):
+    async def run_sync(self, work):
+        return work(self)
+
+    async def commit(self):
+        super().commit()
+
+    async def rollback(self):
+        super().rollback()
+
+
+def flaky(failures: int):
+    attempts = []
+
+    def work(db):
+        attempts.append(db)
+        if len(attempts) <= failures:
+            raise locked()
+        return len(attempts)
+    return work
+
+
+def test_lock_conflicts_are_retried():
+    db = FakeSession()
+    assert run_in_transaction(db, flaky(2), backoff=0) == 3
+    assert (db.rollbacks, db.commits) == (2, 1)
+
+    with pytest.raises(OperationalError):
+        run_in_transaction(FakeSession(), flaky(5), retries=2, backoff=0)
+
+
+def test_lock_conflicts_are_retried_without_blocking_the_loop():
+    db = FakeAsyncSession()
+    assert asyncio.run(run_in_transaction_async(db, flaky(1), backoff=0)) == 2
+    assert (db.rollbacks, db.commits) == (1, 1)
+
+
+def test_production_profile_turns_on_wal(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/profile.db")
+    apply_sqlite_profile(engine, "production")
+    with engine.connect() as conn:
+        assert conn.scalar(text("PRAGMA journal_mode")) == "wal"
+        assert conn.scalar(text("PRAGMA synchronous")) == 1  # NORMAL
+    engine.dispose()
+
+    assert not any("journal_mode" in pragma for pragma in sqlite_pragmas("default"))
+    with pytest.raises(ValueError, match="fast"):
+        sqlite_pragmas("fast")
+
+
+def test_write_queue_runs_jobs_one_at_a_time_in_order():
+    queue = WriteQueue(serialize=True)
+    log = []
+
+    class SlowSession(FakeAsyncSession):
+        async def run_sync(self, work):
+            log.append(("start", work))
+            await asyncio.sleep(0.01)
+            log.append(("end", work))
+            return work
+
+    async def main():
+        return await asyncio.gather(*(queue.run(SlowSession(), job) for job in range(4)))
+
+    assert asyncio.run(main()) == [0, 1, 2, 3]
+    assert log == [(event, job) for job in range(4) for event in ("start", "end")]
+    assert queue.waiting == 0
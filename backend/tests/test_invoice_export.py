@@ -0,0 +1,51 @@
+import io
+from datetime import date
+from uuid import uuid4
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy.dialects import postgresql
+from app.db.session import SessionLocal
+from app.services.invoice_export import invoice_lines_query, write_invoice_dataset
+
+
+def offline_invoice(product: dict, created_at: str) -> dict:
+    line = {"product_id": product["product_id"], "quantity": 3, "unit_price": "10.25", "discount": "0.75", "line_total": "30.00"}
+    return {
+        "uuid": str(uuid4()), "created_at": created_at, "items": [line],
+        "subtotal": "30.75", "total_discount": "0.75", "final_total": "30.00"
+    }
+
+
+def test_export_query_compiles_for_postgresql():
+    sql = str(invoice_lines_query(date(2026, 1, 1), date(2026, 1, 31), 0).compile(dialect=postgresql.dialect()))
+    assert "date(" not in sql.lower()
+
+
+def test_export_is_partitioned_by_business_day_and_outlet(client, kolkata, tmp_path):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Export pen", "cost_price": 5, "mrp": 15, "selling_price": 10.25}
+    ).json()
+    outlet = client.post("/api/v1/stock/outlets/", json={"name": f"Export {uuid4().hex[:6]}"}).json()
+    invoices = [offline_invoice(product, "2025-06-30T17:00:00"), offline_invoice(product, "2025-06-30T19:00:00")]
+    assert client.post("/api/v1/billing/sync", json={"outlet_id": outlet["id"], "invoices": invoices}).status_code == 200
+
+    with SessionLocal() as db:
+        written = write_invoice_dataset(db, str(tmp_path), start=date(2025, 6, 30), end=date(2025, 7, 1), outlet_id=outlet["id"])
+
+    assert written == 2
+    assert sorted(path.parent.parent.name for path in tmp_path.glob("day=*/outlet_id=*/*.parquet")) == [
+        "day=2025-06-30", "day=2025-07-01"  # 19:00 UTC is past midnight in IST
+    ]
+    rows = ds.dataset(tmp_path, format="parquet", partitioning="hive").to_table().to_pylist()
+    assert {(row["quantity"], row["unit_price_paise"], row["discount_paise"], row["line_total_paise"]) for row in rows} == {
+        (3, 1025, 75, 3000)
+    }
+    assert {row["outlet_id"] for row in rows} == {outlet["id"]}
+
+    response = client.get(
+        "/api/v1/reports/export/invoice-lines",
+        params={"start": "2025-06-30", "end": "2025-07-01", "outlet_id": outlet["id"]}
+    )
+    assert response.status_code == 200
+    streamed = pq.read_table(io.BytesIO(response.content))
+    assert sorted(str(day) for day in streamed["day"].to_pylist()) == ["2025-06-30", "2025-07-01"]
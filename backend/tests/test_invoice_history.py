@@ -0,0 +1,61 @@
+from uuid import uuid4
+import pytest
+from sqlalchemy import event
+from app.db.session import SessionLocal, engine
+from app.services.invoice_history import invoice_page_query, to_invoice_detail
+
+
+@pytest.fixture(scope="module")
+def outlet_invoices(client) -> tuple[int, list[str]]:
+    outlet = client.post("/api/v1/stock/outlets/", json={"name": f"History {uuid4().hex[:6]}"}).json()["id"]
+    product = client.post(
+        "/api/v1/products/", json={"name": "History pen", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    client.post("/api/v1/stock/", json={"product_id": product["id"], "outlet_id": outlet, "quantity": 100})
+    numbers = []
+    for quantity in range(1, 6):
+        body = {"outlet_id": outlet, "items": [{"product_id": product["product_id"], "quantity": quantity}]}
+        numbers.append(client.post("/api/v1/billing/confirm", json=body).json()["invoice_number"])
+    return outlet, numbers
+
+
+def test_history_pages_newest_first_with_items(client, outlet_invoices):
+    outlet, numbers = outlet_invoices
+
+    pages, params = [], {"outlet_id": outlet, "limit": 2}
+    while True:
+        response = client.get("/api/v1/billing/invoices", params=params)
+        pages.append([(invoice["invoice_number"], invoice["items"][0]["quantity"]) for invoice in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    newest_first = list(zip(reversed(numbers), range(5, 0, -1)))
+    assert pages == [newest_first[:2], newest_first[2:4], newest_first[4:]]
+
+
+def test_a_page_costs_the_same_queries_however_long(client, outlet_invoices):
+    outlet, _ = outlet_invoices
+
+    def queries_for(limit: int) -> int:
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        with SessionLocal() as db:
+            event.listen(engine, "before_cursor_execute", count)
+            try:
+                [to_invoice_detail(invoice) for invoice in db.scalars(invoice_page_query(outlet, limit=limit))]
+            finally:
+                event.remove(engine, "before_cursor_execute", count)
+        return len(statements)
+
+    assert queries_for(1) == queries_for(5) == 2
+
+
+def test_invoice_lookup_and_bad_cursors(client, outlet_invoices):
+    _, numbers = outlet_invoices
+    assert client.get(f"/api/v1/billing/invoices/{numbers[0]}").json()["items"][0]["product_name"] == "History pen"
+    assert client.get("/api/v1/billing/invoices/INV-NOPE").status_code == 404
+    assert client.get("/api/v1/billing/invoices", params={"cursor": "yesterday"}).status_code == 400
@@ -0,0 +1,46 @@
+import re
+from uuid import uuid4
+import pytest
+
+
+@pytest.fixture(scope="module")
+def products(client):
+    return [
+        client.post(
+            "/api/v1/products/", json={"name": f"Label pen {uuid4().hex[:6]}", "cost_price": 5, "mrp": 15, "selling_price": price}
+        ).json()
+        for price in (10, 12)
+    ]
+
+
+def test_pdf_sheet_has_a_page_per_24_labels_and_a_valid_xref(client, products):
+    items = [{"product_id": products[0]["product_id"], "copies": 20}, {"product_id": products[1]["product_id"], "copies": 5}]
+
+    response = client.post("/api/v1/products/labels", json={"items": items})
+
+    assert response.status_code == 200 and response.headers["content-type"] == "application/pdf"
+    pdf = response.content
+    assert pdf.startswith(b"%PDF-1.4") and pdf.endswith(b"%%EOF\n")
+    assert b"/Type /Pages /Kids [5 0 R 8 0 R] /Count 2" in pdf
+
+    xref = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    offsets = re.findall(rb"(\d{10}) 00000 n", pdf[xref:])
+    for obj_id, offset in enumerate(offsets, start=1):
+        assert pdf[int(offset):].startswith(f"{obj_id} 0 obj".encode())
+
+
+def test_svg_sheet_places_every_copy(client, products):
+    items = [{"product_id": products[0]["product_id"], "copies": 3}, {"product_id": products[1]["product_id"], "copies": 2}]
+
+    svg = client.post("/api/v1/products/labels", json={"items": items, "format": "svg"}).text
+
+    assert svg.count("SPN Novelty</text>") == 5
+    assert svg.count("Price: 10.00") == 3 and svg.count("Price: 12.00") == 2
+    assert svg.rstrip().endswith("</svg>")
+
+
+def test_label_sheet_errors(client, products):
+    too_many = [{"product_id": products[0]["product_id"], "copies": 1000}] * 6
+    assert client.post("/api/v1/products/labels", json={"items": too_many}).status_code == 400
+    unknown = [{"product_id": "SPN99999999"}]
+    assert client.post("/api/v1/products/labels", json={"items": unknown}).status_code == 404
@@ -0,0 +1,33 @@
+import re
+from app.core.metrics import Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("db_queries_per_request", "Statements", (1, 5), ("route",))
+    for value in (0, 1, 3, 9):
+        histogram.observe(("/api/v1/products/",), value)
+
+    assert histogram.render()[2:] == [
+        'db_queries_per_request_bucket{route="/api/v1/products/",le="1"} 2',
+        'db_queries_per_request_bucket{route="/api/v1/products/",le="5"} 3',
+        'db_queries_per_request_bucket{route="/api/v1/products/",le="+Inf"} 4',
+        'db_queries_per_request_sum{route="/api/v1/products/"} 13.0',
+        'db_queries_per_request_count{route="/api/v1/products/"} 4',
+    ]
+
+
+def test_requests_report_server_timing_and_route_metrics(client):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Metered pen", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+
+    response = client.get(f"/api/v1/products/{product['product_id']}/barcode", params={"format": "svg"})
+    timing = re.fullmatch(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries"', response.headers["Server-Timing"])
+    assert timing
+
+    body = client.get("/metrics").text
+    # Labelled by the route template, never the raw path
+    assert 'db_queries_per_request_count{method="GET",route="/api/v1/products/{product_id}/barcode"}' in body
+    assert product["product_id"] not in body
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/v1/products/",status="201"}' in body
+    assert "db_pool_checked_out" in body
@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from app.db.migrations import HEAD, SchemaOutOfDate, current_version, ensure_schema, migrate
+
+# What create_all made of the first release's models (schema version 0)
+LEGACY_SCHEMA = """
+CREATE TABLE products (
+    id INTEGER NOT NULL PRIMARY KEY, product_id VARCHAR(15) NOT NULL UNIQUE, name VARCHAR(255) NOT NULL,
+    category VARCHAR(100), cost_price NUMERIC(10, 2) NOT NULL, mrp NUMERIC(10, 2) NOT NULL,
+    selling_price NUMERIC(10, 2) NOT NULL, min_stock INTEGER, created_at DATETIME
+);
+CREATE TABLE outlets (
+    id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(255) NOT NULL, location VARCHAR(255), phone VARCHAR(20),
+    email VARCHAR(255), manager_name VARCHAR(255), is_active BOOLEAN
+);
+CREATE TABLE invoices (
+    id INTEGER NOT NULL PRIMARY KEY, invoice_number VARCHAR(50) NOT NULL UNIQUE, total_amount NUMERIC(10, 2) NOT NULL,
+    discount_amount NUMERIC(10, 2), final_amount NUMERIC(10, 2) NOT NULL, created_at DATETIME, notes TEXT
+);
+CREATE TABLE invoice_items (
+    id INTEGER NOT NULL PRIMARY KEY, invoice_id INTEGER REFERENCES invoices (id) ON DELETE CASCADE,
+    product_id INTEGER REFERENCES products (id), quantity INTEGER NOT NULL, unit_price NUMERIC(10, 2) NOT NULL,
+    discount NUMERIC(10, 2), line_total NUMERIC(10, 2) NOT NULL, offer_applied VARCHAR(255)
+);
+CREATE TABLE stock (
+    id INTEGER NOT NULL PRIMARY KEY, product_id INTEGER REFERENCES products (id) ON DELETE CASCADE,
+    outlet_id INTEGER REFERENCES outlets (id) ON DELETE SET NULL, quantity INTEGER
+);
+CREATE TABLE barcodes (
+    id INTEGER NOT NULL PRIMARY KEY, product_id INTEGER UNIQUE REFERENCES products (id) ON DELETE CASCADE,
+    barcode_value VARCHAR(15) NOT NULL UNIQUE, barcode_format VARCHAR(20), barcode_image BLOB
+);
+CREATE TABLE offers (
+    id INTEGER NOT NULL PRIMARY KEY, product_id INTEGER NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+    offer_type VARCHAR(11) NOT NULL, x_quantity INTEGER, y_quantity INTEGER, discount_percent NUMERIC(5, 2),
+    discount_flat NUMERIC(10, 2), start_date DATE NOT NULL, end_date DATE NOT NULL, is_active BOOLEAN
+);
+CREATE UNIQUE INDEX ix_products_product_id ON products (product_id);
+CREATE INDEX ix_products_id ON products (id);
+CREATE INDEX ix_outlets_id ON outlets (id);
+CREATE INDEX ix_invoices_id ON invoices (id);
+CREATE INDEX ix_invoice_items_id ON invoice_items (id);
+CREATE INDEX ix_stock_id ON stock (id);
+CREATE INDEX ix_barcodes_id ON barcodes (id);
+CREATE INDEX ix_offers_id ON offers (id);
+INSERT INTO products VALUES (1, 'SPN00059901', 'Old pen', NULL, 5, 15, 10, 10, '2024-01-01 10:00:00');
+INSERT INTO outlets VALUES (1, 'Main', NULL, NULL, NULL, NULL, 1);
+INSERT INTO stock VALUES (1, 1, 1, 4), (2, 1, 1, 6), (3, 1, NULL, 2);
+INSERT INTO offers VALUES (7, 1, 'PERCENTAGE', NULL, NULL, 10, NULL, '2024-01-01', '2024-01-31', 1);
+"""
+
+
+def sqlite_engine(path):
+    return create_engine(f"sqlite:///{path}")
+
+
+@pytest.fixture
+def legacy(tmp_path):
+    engine = sqlite_engine(tmp_path / "legacy.db")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA.split(";"):
+            if statement.strip():
+                conn.exec_driver_sql(statement)
+    yield engine
+    engine.dispose()
+
+
+def schema(engine) -> dict[str, tuple]:
+    inspector = inspect(engine)
+    return {
+        table: (
+            {column["name"]: column["nullable"] for column in inspector.get_columns(table)},
+            sorted(tuple(index["column_names"]) for index in inspector.get_indexes(table))
+        )
+        for table in inspector.get_table_names()
+        if table != "sqlite_sequence"
+    }
+
+
+def test_legacy_database_migrates_to_the_head_schema(legacy, tmp_path):
+    with legacy.connect() as conn:
+        assert current_version(conn) == 0
+
+    applied = migrate(legacy)
+
+    assert [migration.version for migration in applied] == list(range(1, HEAD + 1))
+    fresh = sqlite_engine(tmp_path / "fresh.db")
+    migrate(fresh)
+    expected = schema(fresh)
+    migrated = schema(legacy)
+    for table in migrated.keys() & expected.keys():
+        assert migrated[table][0].keys() == expected[table][0].keys(), table
+        assert set(expected[table][1]) <= set(migrated[table][1]), table
+    assert expected.keys() - migrated.keys() <= {"users"}
+
+    with legacy.connect() as conn:
+        # Duplicate stock rows merged, the offer kept its id and got the new columns' defaults
+        assert conn.execute(text("SELECT outlet_id, quantity FROM stock ORDER BY id")).all() == [(1, 10), (None, 2)]
+        assert conn.execute(text("SELECT id, priority, stackable FROM offers")).all() == [(7, 0, 0)]
+        assert conn.execute(text("SELECT updated_at FROM products")).scalar() == "2024-01-01 10:00:00"
+        assert conn.execute(text("SELECT total_quantity FROM outlet_stock_summaries WHERE outlet_id = 1")).scalar() == 10
+    assert migrate(legacy) == []
+
+
+def test_ensure_schema_only_migrates_when_allowed(legacy, tmp_path):
+    with pytest.raises(SchemaOutOfDate, match="manage.py migrate"):
+        ensure_schema(legacy, auto_migrate=False)
+    assert ensure_schema(legacy, auto_migrate=True) == HEAD
+    assert ensure_schema(legacy, auto_migrate=False) == HEAD
+
+    empty = sqlite_engine(tmp_path / "empty.db")
+    assert ensure_schema(empty, auto_migrate=True) == HEAD
+    with empty.begin() as conn:
+        conn.execute(text("INSERT INTO schema_version VALUES (:version, 'From a newer build', '2030-01-01')"), {"version": HEAD + 1})
+    with pytest.raises(SchemaOutOfDate, match="newer"):
+        ensure_schema(empty, auto_migrate=True)
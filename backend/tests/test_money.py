@@ -0,0 +1,45 @@
+from decimal import Decimal
+import pytest
+from app.services.money import allocate, apply_rate, to_basis_points, to_paise, to_rupees
+
+
+@pytest.mark.parametrize("amount, paise", [
+    (Decimal("12.50"), 1250), ("0.125", 13), (0.1 + 0.2, 30), (19.995, 2000), (7, 700),
+])
+def test_to_paise_rounds_half_up(amount, paise):
+    assert to_paise(amount) == paise
+
+
+def test_rates_and_rupees():
+    assert to_rupees(1250) == Decimal("12.50") and str(to_rupees(5)) == "0.05"
+    assert to_basis_points(12.5) == 1250
+    assert apply_rate(999, 1250) == 125  # 124.875
+    assert apply_rate(4, 1250) == 1  # 0.5 rounds up
+
+
+@pytest.mark.parametrize("total, weights, shares", [
+    (100, [1, 1, 1], [34, 33, 33]),
+    (800, [2000, 800], [571, 229]),
+    (10, [0, 5], [0, 10]),
+    (7, [0, 0], [0, 0]),
+])
+def test_allocate_adds_up_exactly(total, weights, shares):
+    assert allocate(total, weights) == shares
+
+
+def test_invoice_totals_are_exact_to_the_paisa(client):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Paisa pen", "cost_price": 0.05, "mrp": 0.5, "selling_price": 0.1}
+    ).json()
+    client.post("/api/v1/stock/", json={"product_id": product["id"], "quantity": 10})
+    client.post("/api/v1/offers/", json={
+        "product_id": product["id"], "offer_type": "PERCENTAGE", "discount_percent": 33.33,
+        "start_date": "2020-01-01", "end_date": "2099-12-31"
+    })
+    body = {"items": [{"product_id": product["product_id"], "quantity": 3}]}
+
+    invoice = client.post("/api/v1/billing/confirm", json=body).json()
+
+    # 0.30 less 33.33% (0.09999) is 0.10 off
+    assert (invoice["total_amount"], invoice["discount_amount"], invoice["final_amount"]) == (0.3, 0.1, 0.2)
+    assert invoice["items"][0]["line_total"] == 0.2
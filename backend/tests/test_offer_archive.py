@@ -0,0 +1,21 @@
+from datetime import date
+from app.db.session import SessionLocal
+from app.services.offer_archive import archive_expired_offers
+
+
+def test_archived_offer_ids_are_not_reused(client):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Archived offer pen", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    offer = {
+        "product_id": product["id"], "offer_type": "PERCENTAGE", "discount_percent": 10,
+        "start_date": "2020-01-01", "end_date": "2020-01-31"
+    }
+
+    ids = []
+    for _ in range(2):
+        ids.append(client.post("/api/v1/offers/", json=offer).json()["id"])
+        with SessionLocal() as db:
+            assert archive_expired_offers(db, date(2021, 1, 1)) == 1
+
+    assert ids[1] > ids[0]
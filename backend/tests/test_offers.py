@@ -0,0 +1,123 @@
+from datetime import date, datetime, timedelta
+from app.models.offer import OfferType
+from app.services.catalog_cache import OfferSnapshot, ProductSnapshot
+from app.core.clock import business_day
+from app.services.offers import OfferBook, OfferCalendar, compile_offer
+
+DAY = date(2026, 6, 1)
+
+
+def product(pk: int, price: float) -> ProductSnapshot:
+    return ProductSnapshot(
+        id=pk, product_id=f"SPN0001{pk:04d}", name=f"Item {pk}", category=None, cost_price=1,
+        mrp=price, selling_price=price, min_stock=0, created_at=datetime(2026, 1, 1)
+    )
+
+
+def offer(offer_id: int, offer_type: OfferType, product_id: int | None = None, **fields) -> OfferSnapshot:
+    values = dict(x_quantity=None, y_quantity=None, discount_percent=None, discount_flat=None, start_date=DAY, end_date=DAY)
+    values.update(fields)
+    return OfferSnapshot(id=offer_id, product_id=product_id, offer_type=offer_type, is_active=True, **values)
+
+
+def evaluate(offers: list[OfferSnapshot], lines: list[tuple[ProductSnapshot, int]]) -> list[tuple[int, list[str]]]:
+    book = OfferBook(DAY, [compile_offer(o) for o in offers])
+    return [(outcome.discount, outcome.offers) for outcome in book.evaluate(lines)]
+
+
+def test_buy_x_get_y_frees_whole_groups():
+    offers = [offer(1, OfferType.BUY_X_GET_Y, 1, x_quantity=2, y_quantity=1)]
+    assert evaluate(offers, [(product(1, 10), 7)]) == [(2000, ["Buy 2 Get 1 Free"])]
+
+
+def test_best_exclusive_offer_wins_and_ties_go_to_priority():
+    pen = product(1, 10)
+    offers = [
+        offer(1, OfferType.PERCENTAGE, 1, discount_percent=20, priority=1),
+        offer(2, OfferType.FLAT, 1, discount_flat=2, priority=5),
+        offer(3, OfferType.PERCENTAGE, 1, discount_percent=15)
+    ]
+    assert evaluate(offers, [(pen, 3)]) == [(600, ["₹2 Off per item"])]
+
+
+def test_stackable_offers_apply_to_what_is_left():
+    offers = [
+        offer(1, OfferType.PERCENTAGE, 1, discount_percent=10),
+        offer(2, OfferType.PERCENTAGE, 1, discount_percent=5, stackable=True)
+    ]
+    assert evaluate(offers, [(product(1, 100), 1)]) == [(1000 + 450, ["10% Off", "5% Off"])]
+
+
+def test_tiered_offer_uses_the_highest_tier_reached():
+    offers = [offer(1, OfferType.TIERED, 1, tiers=((5, 10), (10, 20)))]
+    pen = product(1, 10)
+    assert evaluate(offers, [(pen, 4)]) == [(0, [])]
+    assert evaluate(offers, [(pen, 12)]) == [(2400, ["20% Off on 10+"])]
+
+
+def test_bundle_takes_the_most_expensive_units_and_splits_exactly():
+    offers = [offer(1, OfferType.BUNDLE, bundle_product_ids=(1, 2), bundle_quantity=3, bundle_price=20)]
+
+    (pen_discount, pen_offers), (pad_discount, _) = evaluate(offers, [(product(1, 10), 2), (product(2, 8), 2)])
+
+    # 10 + 10 + 8 for 20; the second pad is charged in full
+    assert pen_discount + pad_discount == 800
+    assert (pen_discount, pad_discount) == (571, 229)
+    assert pen_offers == ["Any 3 for ₹20"]
+
+
+def test_bundle_is_skipped_when_the_line_offer_it_displaces_is_better():
+    offers = [
+        offer(1, OfferType.PERCENTAGE, 1, discount_percent=50),
+        offer(2, OfferType.BUNDLE, bundle_product_ids=(1,), bundle_quantity=2, bundle_price=18)
+    ]
+    assert evaluate(offers, [(product(1, 10), 2)]) == [(1000, ["50% Off"])]
+
+
+def test_cart_threshold_is_spread_over_the_lines():
+    offers = [offer(1, OfferType.CART_THRESHOLD, discount_percent=10, min_cart_total=100)]
+    lines = [(product(1, 60), 1), (product(2, 30), 1)]
+
+    assert evaluate(offers, lines) == [(0, []), (0, [])]
+    assert [discount for discount, _ in evaluate(offers, lines + [(product(3, 30), 1)])] == [600, 300, 300]
+
+
+def test_calendar_answers_any_day_from_its_load_day():
+    days = [DAY + timedelta(days=n) for n in range(10)]
+    offers = [
+        offer(1, OfferType.PERCENTAGE, 1, discount_percent=10, start_date=days[0], end_date=days[3]),
+        offer(2, OfferType.FLAT, 1, discount_flat=1, start_date=days[5], end_date=days[9]),
+        offer(3, OfferType.BUNDLE, bundle_product_ids=(1, 2), start_date=days[2], end_date=days[6]),
+        offer(4, OfferType.CART_THRESHOLD, discount_percent=5, start_date=days[0], end_date=days[9])
+    ]
+    calendar = OfferCalendar(DAY, offers)
+
+    def active(pk: int, day: date) -> list[int]:
+        return [o.id for o in calendar.active_for([pk], day).get(pk, [])]
+
+    assert active(1, days[0]) == [1]
+    assert active(1, days[3]) == [1, 3]
+    assert active(1, days[4]) == [3]
+    assert active(1, days[6]) == [3, 2]
+    assert active(2, days[1]) == [] and active(2, days[2]) == [3]
+    assert [o.id for o in calendar.active_for([None], days[9])[None]] == [4]
+    assert [o.id for o in calendar.active_on(days[5])] == [4, 3, 2]
+
+
+def test_active_offers_endpoint_for_a_future_day(client):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Calendar pen", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    today = business_day()
+    next_week = today + timedelta(days=7)
+    client.post("/api/v1/offers/", json={
+        "product_id": product["id"], "offer_type": "PERCENTAGE", "discount_percent": 10,
+        "start_date": str(next_week), "end_date": str(next_week)
+    })
+
+    def active(on: date) -> dict:
+        return client.get("/api/v1/offers/active", params={"product_ids": str(product["id"]), "on": str(on)})
+
+    assert active(today).json() == {}
+    assert [o["discount_percent"] for o in active(next_week).json()[str(product["id"])]] == [10]
+    assert active(today - timedelta(days=1)).status_code == 400
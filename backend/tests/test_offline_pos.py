@@ -0,0 +1,83 @@
+import io
+import json
+import urllib.error
+import urllib.request
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+import pytest
+from app.schemas.pos import InvoiceSyncResponse, InvoiceSyncResult, OfflineInvoice, OfflineInvoiceLine, PosSnapshot
+from app.services.offline_pos import CentralClient, OfflineTill
+
+
+def offline_invoice() -> str:
+    line = OfflineInvoiceLine(
+        product_id="SPN00059901", quantity=1, unit_price=Decimal(10), discount=Decimal(0), line_total=Decimal(10)
+    )
+    return OfflineInvoice(
+        uuid=uuid4(), created_at=datetime.utcnow(), items=[line],
+        subtotal=Decimal(10), total_discount=Decimal(0), final_total=Decimal(10)
+    ).model_dump_json()
+
+
+class FakeCentral:
+    """Stands in for urlopen: answers the snapshot and /billing/sync with `sync(invoices)`"""
+
+    def __init__(self, sync):
+        self.sync = sync
+        self.pushed: list[int] = []
+
+    def __call__(self, request, timeout):
+        if request.full_url.endswith("/billing/offline-snapshot"):
+            snapshot = PosSnapshot(generated_at=datetime.utcnow(), products=[], offers=[], stock={})
+            return io.BytesIO(snapshot.model_dump_json().encode())
+        invoices = json.loads(request.data)["invoices"]
+        self.pushed.append(len(invoices))
+        status = self.sync(invoices)
+        if status != 200:
+            raise urllib.error.HTTPError(request.full_url, status, "Refused", {}, io.BytesIO(b'{"detail": "no"}'))
+        results = [InvoiceSyncResult(uuid=invoice["uuid"], status="created") for invoice in invoices]
+        return io.BytesIO(InvoiceSyncResponse(results=results).model_dump_json().encode())
+
+
+@pytest.fixture
+def till(tmp_path):
+    return OfflineTill(CentralClient("http://central/api/v1", 1), None, str(tmp_path))
+
+
+def rejected_invoices(till: OfflineTill) -> list[dict]:
+    try:
+        with open(till.queue.rejected_path) as f:
+            return [json.loads(line)["invoice"] for line in f]
+    except FileNotFoundError:
+        return []
+
+
+def test_sync_keeps_the_queue_when_the_central_url_is_wrong(till, monkeypatch):
+    central = FakeCentral(lambda invoices: 404)
+    monkeypatch.setattr(urllib.request, "urlopen", central)
+    for _ in range(3):
+        till.queue.append(offline_invoice())
+
+    report = till.sync(batch_size=2)
+
+    assert central.pushed == [2]
+    assert (report.sent, report.rejected, report.pending) == (0, 0, 3)
+    assert "HTTP 404" in report.error and "HTTP 404" in till.last_sync_error
+    assert till.queue.synced == 0
+    assert rejected_invoices(till) == []
+
+
+def test_sync_rejects_only_the_invoice_the_central_api_refuses(till, monkeypatch):
+    records = [offline_invoice() for _ in range(5)]
+    bad = json.loads(records[3])
+    central = FakeCentral(lambda invoices: 422 if bad in invoices else 200)
+    monkeypatch.setattr(urllib.request, "urlopen", central)
+    for record in records:
+        till.queue.append(record)
+
+    report = till.sync(batch_size=4)
+
+    assert (report.sent, report.created, report.rejected, report.pending, report.error) == (5, 4, 1, 0, None)
+    assert rejected_invoices(till) == [bad]
+    assert "HTTP 422" in till.last_sync_error
@@ -0,0 +1,55 @@
+from uuid import uuid4
+from app.core.config import settings
+
+
+def test_offline_invoice_is_numbered_by_business_day(client, kolkata):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Night pen", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    invoice = {
+        "uuid": str(uuid4()),
+        "created_at": "2026-03-31T19:00:00",  # 00:30 IST on 1 April
+        "items": [{
+            "product_id": product["product_id"], "quantity": 1,
+            "unit_price": "10", "discount": "0", "line_total": "10"
+        }],
+        "subtotal": "10", "total_discount": "0", "final_total": "10"
+    }
+
+    [result] = client.post("/api/v1/billing/sync", json={"invoices": [invoice]}).json()["results"]
+    assert result["status"] == "created"
+    assert result["invoice_number"].startswith(f"{settings.INVOICE_NUMBER_PREFIX}20260401")
+
+
+def offline_invoice(product_id: str, quantity: int = 1, final_total: str | None = None) -> dict:
+    total = str(10 * quantity)
+    return {
+        "uuid": str(uuid4()),
+        "created_at": "2026-04-02T10:00:00",
+        "items": [{
+            "product_id": product_id, "quantity": quantity,
+            "unit_price": "10", "discount": "0", "line_total": total
+        }],
+        "subtotal": total, "total_discount": "0", "final_total": final_total or total
+    }
+
+
+def test_sync_books_each_invoice_once_and_rejects_bad_ones(client):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Synced pen", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    client.post("/api/v1/stock/", json={"product_id": product["id"], "quantity": 2})
+    good = offline_invoice(product["product_id"], quantity=3)
+    batch = [good, good, offline_invoice(product["product_id"], final_total="5"), offline_invoice("SPN99999999")]
+
+    results = client.post("/api/v1/billing/sync", json={"invoices": batch}).json()["results"]
+
+    assert [result["status"] for result in results] == ["created", "duplicate", "rejected", "rejected"]
+    assert results[1]["invoice_number"] == results[0]["invoice_number"]
+    assert "totals" in results[2]["detail"] and "SPN99999999" in results[3]["detail"]
+
+    [again] = client.post("/api/v1/billing/sync", json={"invoices": [good]}).json()["results"]
+    assert (again["status"], again["invoice_number"]) == ("duplicate", results[0]["invoice_number"])
+
+    # The goods have left the shelf: stock goes negative rather than refusing the sale
+    assert client.get("/api/v1/stock/", params={"product_id": product["id"]}).json()[0]["quantity"] == -1
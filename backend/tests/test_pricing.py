@@ -0,0 +1,55 @@
+from uuid import uuid4
+from sqlalchemy import event
+from app.db.session import SessionLocal, engine
+from app.schemas.invoice import InvoiceItemInput
+from app.services.pricing import price_cart
+
+
+def new_product(client, selling_price: float) -> dict:
+    return client.post(
+        "/api/v1/products/",
+        json={"name": f"Cart pen {uuid4().hex[:6]}", "cost_price": 1, "mrp": 100, "selling_price": selling_price}
+    ).json()
+
+
+def test_preview_prices_every_line_of_a_cart(client):
+    pen, pad = new_product(client, 12.5), new_product(client, 40)
+    items = [
+        {"product_id": pen["product_id"], "quantity": 2},
+        {"product_id": pad["product_id"], "quantity": 1},
+        {"product_id": pen["product_id"], "quantity": 1}
+    ]
+
+    preview = client.post("/api/v1/billing/preview", json=items).json()
+
+    assert [line["line_total"] for line in preview["items"]] == [25.0, 40.0, 12.5]
+    assert (preview["subtotal"], preview["total_discount"], preview["final_total"]) == (77.5, 0.0, 77.5)
+
+
+def test_preview_of_an_unknown_product_is_404(client):
+    pen = new_product(client, 10)
+    items = [{"product_id": pen["product_id"], "quantity": 1}, {"product_id": "SPN99999999", "quantity": 1}]
+
+    response = client.post("/api/v1/billing/preview", json=items)
+
+    assert response.status_code == 404
+    assert "SPN99999999" in response.json()["detail"]
+
+
+def test_a_warm_cart_is_priced_without_queries(client):
+    items = [InvoiceItemInput(product_id=new_product(client, price)["product_id"], quantity=1) for price in (5, 6, 7)]
+    statements = []
+
+    def count(*args):
+        statements.append(args[2])
+
+    with SessionLocal() as db:
+        price_cart(db, items)
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            cart = price_cart(db, items)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+    assert statements == []
+    assert cart.final_total == 18
@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def imported(client, category: str) -> dict[str, dict]:
+    products = client.get("/api/v1/products/", params={"category": category}).json()
+    return {product["name"]: product for product in products}
+
+
+def test_csv_import_reports_bad_rows_and_keeps_the_rest(client):
+    category = f"Import {uuid4().hex[:6]}"
+    body = "\n".join([
+        "name,category,cost_price,mrp,selling_price,min_stock",
+        f"Blue pen,{category},12,20,18,5",
+        f"Free pen,{category},12,20,0,5",
+        f"Red pen,{category},12,20,18,",
+        f"Big file,{category},250,400,350,2"
+    ])
+
+    response = client.post(
+        "/api/v1/products/import", params={"chunk_size": 2}, files={"file": ("catalog.csv", body.encode())}
+    )
+
+    report = response.json()
+    assert (report["total_rows"], report["imported"], report["failed"]) == (4, 3, 1)
+    assert report["errors"][0]["row"] == 2 and "selling_price" in report["errors"][0]["error"]
+
+    products = imported(client, category)
+    assert sorted(products) == ["Big file", "Blue pen", "Red pen"]
+    assert products["Red pen"]["min_stock"] == 10
+    assert products["Big file"]["product_id"].startswith("SPN0250")
+    assert client.get(f"/api/v1/products/{products['Blue pen']['product_id']}").json()["barcode_value"]
+
+
+def test_ndjson_import_skips_lines_that_are_not_objects(client):
+    category = f"Import {uuid4().hex[:6]}"
+    lines = [json.dumps({"name": "Stapler", "category": category, "cost_price": 80, "mrp": 150, "selling_price": 120}), "{oops", "[1, 2]"]
+
+    response = client.post("/api/v1/products/import", files={"file": ("catalog.ndjson", "\n".join(lines).encode())})
+
+    report = response.json()
+    assert (report["total_rows"], report["imported"]) == (3, 1)
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert list(imported(client, category)) == ["Stapler"]
+
+
+def test_import_rejects_an_unknown_format(client):
+    response = client.post("/api/v1/products/import", params={"format": "xlsx"}, files={"file": ("catalog.xlsx", b"")})
+    assert response.status_code == 400
+
+
+def test_import_command(client, tmp_path):
+    category = f"Import {uuid4().hex[:6]}"
+    path = tmp_path / "catalog.csv"
+    path.write_text(f"name,category,cost_price,mrp,selling_price\nGlue,{category},30,50,45\nTape,{category},-1,50,45\n")
+
+    result = subprocess.run(
+        [sys.executable, "manage.py", "import-products", str(path)], cwd=BACKEND, capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "Imported 1 of 2 rows (1 failed)" in result.stdout
+    assert "row 2: cost_price" in result.stderr
+    assert list(imported(client, category)) == ["Glue"]
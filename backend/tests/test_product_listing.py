@@ -0,0 +1,58 @@
+from datetime import timedelta
+from uuid import uuid4
+from app.core.clock import business_day
+
+
+def new_product(client, name: str, category: str = "Listing", selling_price: float = 10) -> dict:
+    return client.post(
+        "/api/v1/products/",
+        json={"name": name, "cost_price": 5, "mrp": 50, "selling_price": selling_price, "category": category}
+    ).json()
+
+
+def listed_ids(client, **params) -> set[int]:
+    response = client.get("/api/v1/products/", params={"category": "Listing", "fields": "id", **params})
+    assert response.status_code == 200
+    return {row["id"] for row in response.json()}
+
+
+def test_has_offer_counts_bundle_members(client):
+    single, bundled, plain = (new_product(client, name)["id"] for name in ("Offer pen", "Bundle pen", "Plain pen"))
+    today = business_day()
+    window = {"start_date": str(today - timedelta(days=1)), "end_date": str(today + timedelta(days=1))}
+    offers = [
+        {"product_id": single, "offer_type": "PERCENTAGE", "discount_percent": 10, **window},
+        {"offer_type": "BUNDLE", "bundle_product_ids": [bundled], "bundle_quantity": 2, "bundle_price": 15, **window}
+    ]
+    for offer in offers:
+        assert client.post("/api/v1/offers/", json=offer).status_code == 201
+
+    assert {single, bundled} <= listed_ids(client, has_offer=True)
+    assert plain not in listed_ids(client, has_offer=True)
+    assert listed_ids(client, has_offer=False) & {single, bundled, plain} == {plain}
+
+
+def test_listing_pages_with_the_next_cursor_and_filters(client):
+    category = f"Paged {uuid4().hex[:6]}"
+    created = [new_product(client, f"Paged pen {price}", category, price)["id"] for price in (5, 10, 15, 20, 25)]
+
+    pages, params = [], {"category": category, "min_price": 10, "max_price": 25, "limit": 2}
+    while True:
+        response = client.get("/api/v1/products/", params=params)
+        pages.append([product["id"] for product in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after"] = response.headers["X-Next-Cursor"]
+
+    assert pages == [created[1:3], created[3:5]]
+
+
+def test_listing_returns_only_the_requested_fields(client):
+    category = f"Sparse {uuid4().hex[:6]}"
+    product = new_product(client, "Sparse pen", category)
+
+    rows = client.get("/api/v1/products/", params={"category": category, "fields": "name,selling_price"}).json()
+    assert rows == [{"id": product["id"], "name": "Sparse pen", "selling_price": 10.0}]
+
+    response = client.get("/api/v1/products/", params={"fields": "name,cost"})
+    assert response.status_code == 400 and "cost" in response.json()["detail"]
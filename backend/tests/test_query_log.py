@@ -0,0 +1,79 @@
+import json
+import logging
+from sqlalchemy import create_engine, text
+from app.db.query_log import QueryLog, logger, statement_shape
+from app.db.session import engine as app_engine
+
+
+def test_statement_shape_collapses_placeholder_lists():
+    assert statement_shape("SELECT * FROM products\n WHERE id IN (?, ?,  ?)") == "SELECT * FROM products WHERE id IN (?...)"
+    assert statement_shape("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (?...), ..."
+
+
+class Captured(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def run_statements(log: QueryLog, statements: list[str], **params) -> list[logging.LogRecord]:
+    engine = create_engine("sqlite://")
+    log.attach(engine)
+    captured = Captured()
+    logger.addHandler(captured)
+    try:
+        with engine.connect() as conn:
+            for statement in statements:
+                conn.execute(text(statement), params)
+    finally:
+        logger.removeHandler(captured)
+    return captured.records
+
+
+def test_slow_statements_are_logged_and_grouped_by_shape():
+    log = QueryLog(sample_rate=0, slow_ms=0, keep=10)
+
+    records = run_statements(log, ["SELECT 1 WHERE 1 IN (:a, :b)", "SELECT 1 WHERE 1 IN (:a, :b, :c)"], a=1, b=2, c=3)
+
+    assert [record.levelno for record in records] == [logging.WARNING] * 2
+    assert json.loads(records[0].getMessage())["event"] == "slow_query"
+    [slow] = log.slow_statements()
+    assert slow["count"] == 2 and slow["statement"] == "SELECT 1 WHERE 1 IN (?...)"
+
+
+def test_fast_statements_are_only_sampled():
+    quiet = QueryLog(sample_rate=0, slow_ms=60_000, keep=10)
+    assert run_statements(quiet, ["SELECT 1", "SELECT 2"]) == []
+    assert quiet.stats()["statements"] == 2
+
+    chatty = QueryLog(sample_rate=1, slow_ms=60_000, keep=10)
+    records = run_statements(chatty, ["SELECT 1"])
+    assert [json.loads(record.getMessage())["event"] for record in records] == ["query"]
+    assert chatty.slow_statements() == []
+
+
+def test_slow_query_aggregate_keeps_the_costliest_statements():
+    log = QueryLog(sample_rate=0, slow_ms=0, keep=2)
+    run_statements(log, [f"SELECT {n}" for n in range(5)])
+    assert len(log.slow_statements()) == 2 and log.stats()["slow"] == 5
+
+
+def test_sql_echo_is_off_by_default():
+    assert app_engine.echo is False
+
+
+def test_slow_queries_endpoint_and_reset(client, monkeypatch):
+    from app.db.query_log import query_log
+
+    monkeypatch.setattr(query_log, "slow_ms", 0)
+    client.get("/api/v1/products/", params={"limit": 1})
+
+    body = client.get("/api/v1/admin/slow-queries", params={"sort": "count"}).json()
+    assert body["log"]["slow"] > 0 and body["slow_queries"]
+
+    assert client.delete("/api/v1/admin/slow-queries").status_code == 204
+    monkeypatch.setattr(query_log, "slow_ms", 60_000)
+    assert client.get("/api/v1/admin/slow-queries").json()["slow_queries"] == []
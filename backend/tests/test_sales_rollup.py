@@ -0,0 +1,97 @@
+from datetime import date
+from uuid import uuid4
+from app.db.session import SessionLocal
+from app.services import sales_rollup
+from app.services.sales_rollup import daily_sales, rebuild_sales_rollups
+
+
+def test_rebuild_counts_invoices_booked_during_it_once(client, monkeypatch):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Rollup pen", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    client.post("/api/v1/stock/", json={"product_id": product["id"], "quantity": 100})
+    body = {"items": [{"product_id": product["product_id"], "quantity": 1}]}
+    for _ in range(3):
+        assert client.post("/api/v1/billing/confirm", json=body).status_code == 201
+
+    today = date.today()
+    with SessionLocal() as db:
+        before = daily_sales(db, today, today)[0]
+
+    history_deltas = sales_rollup._history_deltas
+    booked_midway = []
+
+    def booking_midway(*args):
+        for delta, lines in history_deltas(*args):
+            yield delta, lines
+            if not booked_midway:
+                booked_midway.append(True)
+                assert client.post("/api/v1/billing/confirm", json=body).status_code == 201
+                with SessionLocal() as db:
+                    # Reports keep reading the old rollups (plus the new invoice) until the swap
+                    assert daily_sales(db, today, today)[0]["invoices"] == before["invoices"] + 1
+
+    monkeypatch.setattr(sales_rollup, "_history_deltas", booking_midway)
+    with SessionLocal() as db:
+        rebuild_sales_rollups(db, chunk_size=1)
+        during = daily_sales(db, today, today)[0]
+    monkeypatch.undo()
+
+    with SessionLocal() as db:
+        rebuild_sales_rollups(db)
+        after = daily_sales(db, today, today)[0]
+
+    assert booked_midway
+    assert during["invoices"] == before["invoices"] + 1
+    assert during == after
+
+
+def test_rollups_use_the_business_day(client, kolkata):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Midnight pen", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    invoice = {
+        "uuid": str(uuid4()),
+        "created_at": "2026-02-28T20:00:00",  # 01:30 IST on 1 March
+        "items": [{
+            "product_id": product["product_id"], "quantity": 1,
+            "unit_price": "10", "discount": "0", "line_total": "10"
+        }],
+        "subtotal": "10", "total_discount": "0", "final_total": "10"
+    }
+    assert client.post("/api/v1/billing/sync", json={"invoices": [invoice]}).json()["results"][0]["status"] == "created"
+
+    def days(db):
+        return {row["day"]: row["invoices"] for row in daily_sales(db, date(2026, 2, 28), date(2026, 3, 1))}
+
+    with SessionLocal() as db:
+        assert days(db) == {date(2026, 3, 1): 1}
+        rebuild_sales_rollups(db, since=date(2026, 3, 1))
+        assert days(db) == {date(2026, 3, 1): 1}
+
+
+def test_sales_reports_for_an_outlet(client):
+    outlet = client.post("/api/v1/stock/outlets/", json={"name": f"Report {uuid4().hex[:6]}"}).json()["id"]
+    pen, pad = (
+        client.post("/api/v1/products/", json={"name": name, "cost_price": cost, "mrp": 50, "selling_price": price}).json()
+        for name, cost, price in (("Report pen", 4, 10), ("Report pad", 15, 30))
+    )
+    for product in (pen, pad):
+        client.post("/api/v1/stock/", json={"product_id": product["id"], "outlet_id": outlet, "quantity": 50})
+    sales = [[(pen, 3)], [(pen, 2), (pad, 1)]]
+    for lines in sales:
+        body = {"outlet_id": outlet, "items": [{"product_id": p["product_id"], "quantity": q} for p, q in lines]}
+        assert client.post("/api/v1/billing/confirm", json=body).status_code == 201
+
+    [day] = client.get("/api/v1/reports/sales/daily", params={"outlet_id": outlet}).json()
+    assert (day["invoices"], day["units"], day["net"], day["cost"], day["margin"]) == (2, 6, 80.0, 35.0, 45.0)
+
+    by_outlet = {row["outlet_id"]: row for row in client.get("/api/v1/reports/sales/outlets").json()}
+    assert by_outlet[outlet]["net"] == 80.0
+
+    top = client.get("/api/v1/reports/sales/products", params={"outlet_id": outlet, "sort": "units"}).json()
+    assert [(row["product_id"], row["units"], row["margin"]) for row in top] == [
+        (pen["product_id"], 5, 30.0), (pad["product_id"], 1, 15.0)
+    ]
+
+    assert client.get("/api/v1/reports/sales/daily", params={"start": "2026-02-02", "end": "2026-02-01"}).status_code == 400
@@ -0,0 +1,50 @@
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.product import Product
+
+
+def search(client, q: str) -> list[str]:
+    return [hit["product_id"] for hit in client.get("/api/v1/products/search", params={"q": q}).json()]
+
+
+def new_product(client, name: str, category: str | None = None) -> dict:
+    return client.post(
+        "/api/v1/products/", json={"name": name, "category": category, "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+
+
+def test_search_matches_prefixes_typos_categories_and_codes(client):
+    pencil = new_product(client, "Zephyrine pencil", "Writingware")
+    eraser = new_product(client, "Zephyrine eraser", "Writingware")
+
+    assert set(search(client, "zeph")) == {pencil["product_id"], eraser["product_id"]}
+    assert search(client, "zephyrine pen") == [pencil["product_id"]]
+    assert pencil["product_id"] in search(client, "zefyrine")
+    assert eraser["product_id"] in search(client, "writingw")
+    assert search(client, pencil["product_id"].lower()) == [pencil["product_id"]]
+    assert search(client, "zephyrine stapler") == []
+
+
+def test_best_sellers_rank_first(client):
+    slow, fast = new_product(client, "Quorble notebook"), new_product(client, "Quorble diary")
+    client.post("/api/v1/stock/", json={"product_id": fast["id"], "quantity": 10})
+    sale = {"items": [{"product_id": fast["product_id"], "quantity": 3}]}
+    assert client.post("/api/v1/billing/confirm", json=sale).status_code == 201
+
+    assert search(client, "quorble") == [fast["product_id"], slow["product_id"]]
+
+
+def test_search_picks_up_products_edited_by_other_workers(client, monkeypatch):
+    product = client.post(
+        "/api/v1/products/", json={"name": "Quillpen", "category": "Stationery", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    assert product["product_id"] in search(client, "quillpen")
+
+    # Renamed through another worker: this one's index is not told
+    with SessionLocal() as db:
+        db.get(Product, product["id"]).name = "Featherpen"
+        db.commit()
+
+    monkeypatch.setattr(settings, "SEARCH_PRODUCT_REFRESH_SECONDS", 0)
+    assert product["product_id"] in search(client, "featherpen")
+    assert product["product_id"] not in search(client, "quillpen")
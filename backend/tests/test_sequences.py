@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import pytest
+from app.db.session import SessionLocal
+from app.models.invoice import Invoice
+from app.models.product import Product
+from app.services.sequences import format_invoice_number, format_product_id, parse_product_sequence, reserve_sequence
+
+
+def test_invoice_counter_starts_after_the_days_existing_numbers(client):
+    day = date(2031, 5, 6)
+    with SessionLocal() as db:
+        db.add(Invoice(invoice_number=format_invoice_number(day, 0, 41), total_amount=10, final_amount=10))
+        db.commit()
+
+    def reserve(count: int) -> range:
+        with SessionLocal() as db:
+            block = reserve_sequence(db, day, 0, count)
+            db.commit()
+            return block
+
+    assert reserve(3) == range(42, 45)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        blocks = list(pool.map(reserve, [2] * 8))
+    values = sorted(value for block in blocks for value in block)
+    assert values == list(range(45, 61))
+
+
+def test_product_ids_are_unique_and_parse_back():
+    ids = [format_product_id(55, value) for value in range(1, 20001)]
+    assert len(set(ids)) == len(ids)
+    assert [parse_product_sequence(pid[len("SPN0055"):]) for pid in ids] == list(range(1, 20001))
+    assert ids[:3] == ["SPN00559901", "SPN00559902", "SPN00559903"]
+    assert ids[9] == "SPN00559010" and ids[99] == "SPN00550100" and ids[999] == "SPN00551000"
+
+
+@pytest.mark.parametrize("sequence, value", [
+    ("9905", 5), ("9050", 50), ("0123", 123), ("1000", 1000),
+    # Legacy nnnn sequences that look like the short forms
+    ("9000", 9000), ("9009", 9009), ("9900", 9810), ("9950", 9851),
+])
+def test_parse_product_sequence(sequence, value):
+    assert parse_product_sequence(sequence) == value
+
+
+def test_counter_seeded_from_a_legacy_bucket_does_not_collide(client):
+    legacy = [f"SPN4321{n:04d}" for n in (9901, 9010, 8999, 9000, 9009)]
+    with SessionLocal() as db:
+        db.add_all(
+            Product(product_id=pid, name=f"Legacy {pid}", cost_price=4321, mrp=5000, selling_price=4500)
+            for pid in legacy
+        )
+        db.commit()
+
+    created = client.post(
+        "/api/v1/products/", json={"name": "After legacy", "cost_price": 4321, "mrp": 5000, "selling_price": 4500}
+    )
+    assert created.status_code == 201
+    assert created.json()["product_id"] == "SPN43219100"
@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+from app.db.session import SessionLocal
+from app.services.stock import rebuild_outlet_summaries
+
+
+def test_low_stock_pages_by_shortage_then_id(client):
+    outlet = client.post("/api/v1/stock/outlets/", json={"name": f"Low {uuid4().hex[:6]}"}).json()["id"]
+    for quantity in (0, 5, 5, 8):
+        product = client.post(
+            "/api/v1/products/", json={"name": "Low pen", "cost_price": 5, "mrp": 15, "selling_price": 10, "min_stock": 10}
+        ).json()
+        client.post("/api/v1/stock/", json={"product_id": product["id"], "outlet_id": outlet, "quantity": quantity})
+
+    rows, params = [], {"outlet_id": outlet, "limit": 3}
+    while page := client.get("/api/v1/stock/low", params=params).json():
+        rows += page
+        params.update(after_shortage=page[-1]["shortage"], after_id=page[-1]["stock_id"])
+
+    assert [row["shortage"] for row in rows] == [10, 5, 5, 2]
+    assert rows[1]["stock_id"] < rows[2]["stock_id"]
+
+
+def test_low_stock_rejects_half_a_cursor(client):
+    for params in ({"after_shortage": 3}, {"after_id": 7}):
+        response = client.get("/api/v1/stock/low", params=params)
+        assert response.status_code == 400
+        assert "together" in response.json()["detail"]
+
+
+def stocked_product(client, quantity: int) -> dict:
+    product = client.post(
+        "/api/v1/products/", json={"name": f"Shelf pen {uuid4().hex[:6]}", "cost_price": 5, "mrp": 15, "selling_price": 10}
+    ).json()
+    client.post("/api/v1/stock/", json={"product_id": product["id"], "quantity": quantity})
+    return product
+
+
+def quantity_of(client, product: dict) -> int:
+    return client.get("/api/v1/stock/", params={"product_id": product["id"]}).json()[0]["quantity"]
+
+
+def test_confirm_reserves_the_whole_cart_or_nothing(client):
+    pen, pad = stocked_product(client, 3), stocked_product(client, 1)
+    body = {"items": [{"product_id": pen["product_id"], "quantity": 2}, {"product_id": pad["product_id"], "quantity": 2}]}
+
+    response = client.post("/api/v1/billing/confirm", json=body)
+
+    assert response.status_code == 400
+    assert "Available: 1, Requested: 2" in response.json()["detail"]
+    assert (quantity_of(client, pen), quantity_of(client, pad)) == (3, 1)
+
+
+def test_concurrent_confirms_never_oversell(client):
+    pen = stocked_product(client, 4)
+    body = {"items": [{"product_id": pen["product_id"], "quantity": 1}]}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = list(pool.map(lambda _: client.post("/api/v1/billing/confirm", json=body).status_code, range(10)))
+
+    assert sorted(statuses) == [201] * 4 + [400] * 6
+    assert quantity_of(client, pen) == 0
+
+
+def test_outlet_summary_follows_every_stock_change(client):
+    outlet = client.post("/api/v1/stock/outlets/", json={"name": f"Summary {uuid4().hex[:6]}"}).json()["id"]
+    pen, pad = (
+        client.post(
+            "/api/v1/products/", json={"name": name, "cost_price": 5, "mrp": 15, "selling_price": 10, "min_stock": 10}
+        ).json()
+        for name in ("Summary pen", "Summary pad")
+    )
+
+    def summary() -> tuple[int, int, int]:
+        body = client.get(f"/api/v1/stock/outlets/{outlet}").json()
+        return body["total_products"], body["total_quantity"], body["low_stock_count"]
+
+    pen_stock = client.post("/api/v1/stock/", json={"product_id": pen["id"], "outlet_id": outlet, "quantity": 20}).json()
+    pad_stock = client.post("/api/v1/stock/", json={"product_id": pad["id"], "outlet_id": outlet, "quantity": 4}).json()
+    assert summary() == (2, 24, 1)
+
+    client.put(f"/api/v1/stock/{pad_stock['id']}", json={"quantity": 12})
+    assert summary() == (2, 32, 0)
+
+    sale = {"outlet_id": outlet, "items": [{"product_id": pen["product_id"], "quantity": 15}]}
+    assert client.post("/api/v1/billing/confirm", json=sale).status_code == 201
+    assert summary() == (2, 17, 1)
+
+    client.put(f"/api/v1/products/{pad['product_id']}", json={"min_stock": 20})
+    assert summary() == (2, 17, 2)
+
+    client.delete(f"/api/v1/stock/{pen_stock['id']}")
+    assert summary() == (1, 12, 1)
+
+    with SessionLocal() as db:
+        assert outlet not in [outlet_id for outlet_id, _, _ in rebuild_outlet_summaries(db, apply=False)]
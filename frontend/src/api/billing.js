@@ -5,11 +5,44 @@ export const previewBill = async (items, outlet_id = 1) => {
   return response.data;
 };
 
-export const confirmBill = async (items, outlet_id = 1, notes = '') => {
+// Pass the same idempotencyKey when retrying a confirm so the bill is only created once
+export const confirmBill = async (items, outlet_id = 1, notes = '', idempotencyKey = crypto.randomUUID()) => {
   const response = await axiosClient.post('/billing/confirm', {
     items,
     outlet_id,
     notes
+  }, {
+    headers: { 'Idempotency-Key': idempotencyKey }
   });
   return response.data;
-};
\ No newline at end of file
+};
+
+// Outlet till (offline mode): priced and queued locally, synced to the central API later
+export const previewBillOffline = async (items) => {
+  const response = await axiosClient.post('/pos/preview', items);
+  return response.data;
+};
+
+export const confirmBillOffline = async (items, notes = '') => {
+  const response = await axiosClient.post('/pos/confirm', { items, notes });
+  return response.data;
+};
+
+export const getPosStatus = async () => {
+  const response = await axiosClient.get('/pos/status');
+  return response.data;
+};
+
+// Invoice history, newest first; pass nextCursor back as params.cursor for the next page
+export const listInvoicesPage = async (params = {}) => {
+  const response = await axiosClient.get('/billing/invoices', { params });
+  return {
+    items: response.data,
+    nextCursor: response.headers['x-next-cursor'] ?? null,
+  };
+};
+
+export const getInvoice = async (invoiceNumber) => {
+  const response = await axiosClient.get(`/billing/invoices/${encodeURIComponent(invoiceNumber)}`);
+  return response.data;
+};
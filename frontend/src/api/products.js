@@ -10,7 +10,34 @@ export const createProduct = async (data) => {
   return response.data;
 };
 
-export const listProducts = async () => {
-  const response = await axiosClient.get('/products/');
+// params: { after, limit, category, min_price, max_price, has_offer, fields }
+// The next page's cursor comes back as nextCursor (null on the last page).
+export const listProducts = async (params = {}) => {
+  const response = await axiosClient.get('/products/', { params });
   return response.data;
-};
\ No newline at end of file
+};
+
+export const listProductsPage = async (params = {}) => {
+  const response = await axiosClient.get('/products/', { params });
+  return {
+    items: response.data,
+    nextCursor: response.headers['x-next-cursor'] ?? null,
+  };
+};
+
+export const searchProducts = async (q, limit = 20) => {
+  const response = await axiosClient.get('/products/search', { params: { q, limit } });
+  return response.data;
+};
+
+export const getBarcodeImageUrl = (product_id) =>
+  `${axiosClient.defaults.baseURL}/products/${product_id}/barcode`;
+
+export const printLabelSheet = async (items, format = 'pdf') => {
+  const response = await axiosClient.post(
+    '/products/labels',
+    { items, format },
+    { responseType: 'blob' }
+  );
+  return response.data;
+};
@@ -0,0 +1,16 @@
+import axiosClient from './axiosClient';
+
+export const getDailySales = async (params = {}) => {
+  const response = await axiosClient.get('/reports/sales/daily', { params });
+  return response.data;
+};
+
+export const getOutletSales = async (params = {}) => {
+  const response = await axiosClient.get('/reports/sales/outlets', { params });
+  return response.data;
+};
+
+export const getProductSales = async (params = {}) => {
+  const response = await axiosClient.get('/reports/sales/products', { params });
+  return response.data;
+};
@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { getProductByBarcode } from '../api/products';
+import { getProductByBarcode, getBarcodeImageUrl, printLabelSheet } from '../api/products';
 import './BarcodePrintPage.css';
 
 const BarcodePrintPage = () => {
@@ -7,6 +7,7 @@ const BarcodePrintPage = () => {
   const [product, setProduct] = useState(null);
   const [copies, setCopies] = useState(1);
   const [searching, setSearching] = useState(false);
+  const [printing, setPrinting] = useState(false);
 
   const handleSearch = async (e) => {
     e.preventDefault();
@@ -28,8 +29,18 @@ const BarcodePrintPage = () => {
     }
   };
 
-  const handlePrint = () => {
-    window.print();
+  const handlePrint = async () => {
+    setPrinting(true);
+    try {
+      const sheet = await printLabelSheet([{ product_id: product.product_id, copies }]);
+      const url = URL.createObjectURL(sheet);
+      window.open(url, '_blank');
+      setTimeout(() => URL.revokeObjectURL(url), 60000);
+    } catch (error) {
+      alert('Failed to generate label sheet');
+    } finally {
+      setPrinting(false);
+    }
   };
 
   const renderStickers = () => {
@@ -43,21 +54,11 @@ const BarcodePrintPage = () => {
             <h3>{product.name}</h3>
           </div>
           <div className="sticker-barcode">
-            <div className="barcode-lines">
-              {/* Simulated barcode visual */}
-              {Array.from({ length: 30 }).map((_, idx) => (
-                <div
-                  key={idx}
-                  className="barcode-line"
-                  style={{
-                    width: `${Math.random() * 3 + 1}px`,
-                    height: '60px',
-                    backgroundColor: '#000'
-                  }}
-                />
-              ))}
-            </div>
-            <div className="barcode-text">{product.product_id}</div>
+            <img
+              className="barcode-image"
+              src={getBarcodeImageUrl(product.product_id)}
+              alt={product.product_id}
+            />
           </div>
           <div className="sticker-details">
             <div className="price-row">
@@ -135,12 +136,12 @@ const BarcodePrintPage = () => {
                 value={copies}
                 onChange={(e) => setCopies(Math.max(1, parseInt(e.target.value) || 1))}
                 min="1"
-                max="100"
+                max="1000"
               />
             </div>
 
-            <button onClick={handlePrint} className="print-btn">
-              🖨️ Print {copies} Label{copies > 1 ? 's' : ''}
+            <button onClick={handlePrint} disabled={printing} className="print-btn">
+              {printing ? 'Generating...' : `🖨️ Print ${copies} Label${copies > 1 ? 's' : ''}`}
             </button>
           </div>
         )}
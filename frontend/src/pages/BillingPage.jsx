@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import BarcodeInput from '../components/BarcodeInput';
 import CartTable from '../components/CartTable';
 import { getProductByBarcode } from '../api/products';
@@ -10,9 +10,12 @@ const BillingPage = () => {
   const [preview, setPreview] = useState(null);
   const [loading, setLoading] = useState(false);
   const [confirming, setConfirming] = useState(false);
+  // One Idempotency-Key per cart, so retrying a failed confirm can't bill twice
+  const confirmKey = useRef(crypto.randomUUID());
 
   // Update preview whenever cart changes
   useEffect(() => {
+    confirmKey.current = crypto.randomUUID();
     if (cart.length > 0) {
       fetchPreview();
     } else {
@@ -105,7 +108,7 @@ const BillingPage = () => {
         quantity: item.quantity
       }));
 
-      const result = await confirmBill(items, 1);
+      const result = await confirmBill(items, 1, '', confirmKey.current);
       
       alert(`Bill confirmed!\nInvoice Number: ${result.invoice_number}\nTotal: ₹${result.final_amount.toFixed(2)}`);
       